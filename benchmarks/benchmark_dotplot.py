@@ -0,0 +1,47 @@
+import numpy as np
+
+from hubbleds.binning import DotStacker, stack_dots
+
+
+def loop_dot_positions(values, x_min, x_max, nbin):
+    # The per-bin loop used by the glue-plotly dotplot layer artist
+    counts, edges = np.histogram(values, range=(x_min, x_max), bins=nbin)
+    x = []
+    y = []
+    for i in range(len(edges) - 1):
+        x_i = (edges[i] + edges[i + 1]) / 2
+        x.extend([x_i] * counts[i])
+        y.extend(range(1, counts[i] + 1))
+    return x, y
+
+
+class TimeDotStacking:
+    """
+    Dot stacking for velocity dotplots of increasing size, comparing the
+    per-bin loop with the vectorized engine, a cached zoom and an appended
+    student measurement.
+    """
+
+    params = [100, 10_000, 100_000]
+    param_names = ["npoints"]
+
+    def setup(self, npoints):
+        rng = np.random.default_rng(42)
+        self.values = rng.normal(10000, 4000, npoints)
+        self.appended = np.append(self.values, 10500.0)
+        self.stacker = DotStacker()
+        self.stacker.stack(self.values, 0, 20000, 75, version=0)
+
+    def time_loop(self, npoints):
+        loop_dot_positions(self.values, 0, 20000, 75)
+
+    def time_vectorized(self, npoints):
+        stack_dots(self.values, 0, 20000, 75)
+
+    def time_cached(self, npoints):
+        self.stacker.stack(self.values, 0, 20000, 75, version=0)
+
+    def time_append_one(self, npoints):
+        stacker = DotStacker()
+        stacker._cache = self.stacker._cache.copy()
+        stacker.stack(self.appended, 0, 20000, 75, version=1)
@@ -0,0 +1,50 @@
+from types import SimpleNamespace
+
+import solara
+from glue.core import Data, DataCollection
+
+from hubbleds.components import IdSlider
+
+from .common import SIZES, population
+
+
+class TimeIdSliderRefresh:
+    """
+    Rendering the stage 5 age slider over the student summaries, and
+    refreshing it when the summaries change.
+    """
+
+    params = SIZES
+    param_names = ["size"]
+    timeout = 300
+
+    def setup(self, size):
+        summaries = population(size).student_summaries
+        self.ids = [s.student_id for s in summaries]
+        self.ages = [s.age_value for s in summaries]
+        self.data = Data(label="student_summaries", id=self.ids, age_value=self.ages)
+        self.gjapp = SimpleNamespace(data_collection=DataCollection([self.data]))
+        self.rendered = self.render()
+
+    def teardown(self, size):
+        self.rendered[1].close()
+
+    def render(self):
+        return solara.render(
+            IdSlider(
+                gjapp=self.gjapp,
+                data=self.data,
+                id_component="id",
+                value_component="age_value",
+                on_id=None,
+                highlight_ids=self.ids[:1],
+            ),
+            handle_error=False,
+        )
+
+    def time_render(self, size):
+        self.render()[1].close()
+
+    def time_refresh(self, size):
+        self.ages.reverse()
+        self.data.update_components({self.data.id["age_value"]: self.ages})
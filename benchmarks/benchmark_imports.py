@@ -0,0 +1,67 @@
+import re
+import subprocess
+import sys
+from typing import Dict
+
+# The modules that a server imports before it can show the intro page
+MODULES = [
+    "hubbleds.state",
+    "hubbleds.utils",
+    "hubbleds.components",
+    "hubbleds.remote",
+    "hubbleds.layout",
+    "hubbleds.pages",
+]
+
+IMPORT_TIME_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)$")
+
+
+def import_times(module: str) -> Dict[str, int]:
+    """
+    The cumulative import time (in microseconds) of ``module`` and of every
+    module that it imports, from ``python -X importtime`` in a new process.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        match = IMPORT_TIME_LINE.match(line)
+        if match is not None:
+            times[match.group(4)] = int(match.group(2))
+    return times
+
+
+class TrackImportTime:
+    """
+    The cold import time of the modules that the server needs for the intro
+    page, and the number of modules each of them pulls in.
+    """
+
+    params = MODULES
+    param_names = ["module"]
+    timeout = 120
+
+    def track_import_time(self, module):
+        return import_times(module)[module] / 1000
+
+    track_import_time.unit = "ms"
+
+    def track_modules_imported(self, module):
+        return len(import_times(module))
+
+    track_modules_imported.unit = "modules"
+
+
+def timeraw_intro_page():
+    # Importing the intro page and rendering it for the first time, in a new
+    #  interpreter
+    return """
+import solara
+import hubbleds.pages
+
+solara.render(hubbleds.pages.Page(), handle_error=False)
+"""
@@ -0,0 +1,32 @@
+from glue.core import DataCollection
+
+from hubbleds.data_management import HUBBLE_1929_DATA_LABEL, HUBBLE_KEY_DATA_LABEL
+from hubbleds.reference_data import (
+    add_hubble_reference_data,
+    clear_reference_data,
+    load_reference_csv,
+)
+
+SESSIONS = 20
+
+
+class TimeHubbleReferenceData:
+    """
+    Adding the HST Key Project and Hubble (1929) data to a number of
+    sessions, loading the CSV files for each session versus wrapping the
+    shared reference datasets.
+    """
+
+    def setup(self):
+        clear_reference_data()
+        add_hubble_reference_data(DataCollection())
+
+    def time_load_per_session(self):
+        for _ in range(SESSIONS):
+            data_collection = DataCollection()
+            for label in (HUBBLE_KEY_DATA_LABEL, HUBBLE_1929_DATA_LABEL):
+                data_collection.append(load_reference_csv(label))
+
+    def time_shared(self):
+        for _ in range(SESSIONS):
+            add_hubble_reference_data(DataCollection())
@@ -0,0 +1,190 @@
+import json
+import tempfile
+from pathlib import Path
+
+import solara
+from cosmicds.state import GLOBAL_STATE
+
+from hubbleds.api_metrics import API_METRICS
+from hubbleds.remote import LocalAPI
+from hubbleds.stand_in_api import FaultConfig, StandInAPI, StandInStore
+from hubbleds.state import GalaxyData, LocalState
+from hubbleds.write_journal import WriteJournal
+
+SPECTRA_ROOT = Path(__file__).parent.parent / "tests" / "data"
+SPECTRA = sorted(p.name for p in SPECTRA_ROOT.glob("*.fits"))
+
+
+def _galaxy(spectrum: str) -> GalaxyData:
+    return GalaxyData(
+        id=1, name=spectrum, ra=180, decl=20, z=0.02, type="Sp", element="H-α",
+    )
+
+
+def _answered_state(n_questions: int) -> LocalState:
+    state = LocalState()
+    for i in range(n_questions):
+        tag = f"question-{i}"
+        state.mc_scoring.add(tag)
+        state.mc_scoring.update_mc_score(tag, score=10, choice=1, tries=2, wrong_attempts=1)
+        state.free_responses.add(tag)
+        state.free_responses.update(tag, response="The galaxies that are farther away " * 4)
+    return state
+
+
+class TimeSpectrumLoading:
+    """
+    Loading a spectrum that isn't cached yet, from the stand-in API, and
+    parsing the spectrum file alone.
+    """
+
+    params = SPECTRA
+    param_names = ["spectrum"]
+
+    def setup(self, spectrum):
+        self.server = StandInAPI(StandInStore.synthetic("student"), spectra_root=SPECTRA_ROOT).start()
+        self.api = LocalAPI()
+        self.api.API_URL = self.server.url
+        self.local_state = solara.reactive(LocalState())
+        self.galaxy = _galaxy(spectrum)
+        self.content = (SPECTRA_ROOT / spectrum).read_bytes()
+
+    def teardown(self, spectrum):
+        self.server.stop()
+
+    def time_parse(self, spectrum):
+        self.api._parse_spectrum(self.galaxy, self.content)
+
+    def time_load_spectrum_data(self, spectrum):
+        self.api.spectrum_cache.clear()
+        self.api.load_spectrum_data(self.galaxy, self.local_state)
+
+
+class TimeStoryState:
+    """
+    Serializing the story state written by `put_story_state`, as more of the
+    story's questions are answered.
+    """
+
+    params = [0, 100, 400]
+    param_names = ["questions"]
+
+    def setup(self, questions):
+        self.local_state = solara.reactive(_answered_state(questions))
+
+    def time_serialize(self, questions):
+        LocalAPI._story_state_json(GLOBAL_STATE, self.local_state)
+
+    def time_round_trip(self, questions):
+        LocalState(**json.loads(LocalAPI._story_state_json(GLOBAL_STATE, self.local_state))["story"])
+
+    def track_size(self, questions):
+        return len(LocalAPI._story_state_json(GLOBAL_STATE, self.local_state))
+
+    track_size.unit = "bytes"
+
+
+class TimeStoryStateWrite:
+    """
+    Writing a story state to a stand-in API that takes 50 ms per request,
+    directly and through a write journal.
+    """
+
+    params = [False, True]
+    param_names = ["journal"]
+
+    def setup(self, journal):
+        self.server = StandInAPI(StandInStore.synthetic("student"), faults=FaultConfig(latency=0.05)).start()
+        self.api = LocalAPI()
+        self.api.API_URL = self.server.url
+        self.url = f"{self.server.url}/story-state/1/hubbles_law"
+        self.state_json = LocalAPI._story_state_json(GLOBAL_STATE, solara.reactive(_answered_state(100)))
+        self.directory = tempfile.TemporaryDirectory()
+        self.api._write_journal = None
+        if journal:
+            self.api._write_journal = WriteJournal(Path(self.directory.name) / "writes.sqlite")
+            self.api.write_journal.start(self.api._send_journal_entry)
+
+    def teardown(self, journal):
+        if self.api.write_journal is not None:
+            self.api.write_journal.close()
+        self.server.stop()
+        self.directory.cleanup()
+
+    def time_put_story_state(self, journal):
+        self.api._put(self.url, data=self.state_json)
+
+
+class TimeCompression:
+    """
+    Reading all of the data of a school, and writing a story state with 400
+    answered questions, with and without compressed bodies.
+    """
+
+    params = [False, True]
+    param_names = ["compressed"]
+
+    def setup(self, compressed):
+        self.server = StandInAPI(
+            StandInStore.synthetic("school"),
+            compress_min_bytes=1024 if compressed else None,
+        ).start()
+        self.api = LocalAPI()
+        self.api.API_URL = self.server.url
+        self.api._write_journal = None
+        self.api.request_session.session.compress_requests = compressed
+        self.local_state = solara.reactive(_answered_state(400))
+        self.state_json = LocalAPI._story_state_json(GLOBAL_STATE, self.local_state)
+        self.url = f"{self.server.url}/story-state/1/hubbles_law"
+
+    def teardown(self, compressed):
+        self.server.stop()
+
+    def time_get_all_data(self, compressed):
+        self.api.get_all_data(self.local_state)
+
+    def time_put_story_state(self, compressed):
+        self.api._put(self.url, data=self.state_json)
+
+    def track_all_data_bytes(self, compressed):
+        self.api.get_all_data(self.local_state)
+        return self.server.bytes_sent["all_data"]
+
+    track_all_data_bytes.unit = "bytes"
+
+    def track_story_state_bytes(self, compressed):
+        self.api._put(self.url, data=self.state_json)
+        return self.server.bytes_received["put_story_state"]
+
+    track_story_state_bytes.unit = "bytes"
+
+
+class TimeInstrumentation:
+    """
+    The overhead of the API metrics on a cached spectrum, where the call
+    itself does the least work.
+    """
+
+    def setup(self):
+        self.api = LocalAPI()
+        self.local_state = solara.reactive(LocalState())
+        self.galaxy = _galaxy(SPECTRA[0])
+        content = (SPECTRA_ROOT / SPECTRA[0]).read_bytes()
+        self.api._cache_spectrum(
+            self.api._spectrum_path(self.galaxy),
+            self.api._parse_spectrum(self.galaxy, content),
+        )
+
+    def teardown(self):
+        API_METRICS.disable()
+        API_METRICS.reset()
+
+    def time_cached_spectrum_disabled(self):
+        API_METRICS.disable()
+        for _ in range(1000):
+            self.api.load_spectrum_data(self.galaxy, self.local_state)
+
+    def time_cached_spectrum_enabled(self):
+        API_METRICS.enable()
+        for _ in range(1000):
+            self.api.load_spectrum_data(self.galaxy, self.local_state)
@@ -0,0 +1,24 @@
+from pathlib import Path
+
+from hubbleds.coadd_reader import read_coadd_spectrum, read_coadd_spectrum_astropy
+
+SPECTRA_ROOT = Path(__file__).parent.parent / "tests" / "data"
+
+
+class TimeCoaddParsing:
+    """
+    Parse time per spectrum for the bundled sample spectra, comparing the
+    column-selective reader with opening the full file through astropy.
+    """
+
+    params = sorted(p.name for p in SPECTRA_ROOT.glob("*.fits"))
+    param_names = ["spectrum"]
+
+    def setup(self, spectrum):
+        self.content = (SPECTRA_ROOT / spectrum).read_bytes()
+
+    def time_astropy(self, spectrum):
+        read_coadd_spectrum_astropy(self.content, name=spectrum)
+
+    def time_coadd_reader(self, spectrum):
+        read_coadd_spectrum(self.content)
@@ -0,0 +1,50 @@
+import solara
+
+from hubbleds.state import LocalState
+
+from .common import SIZES, population
+
+
+class TimeMeasurementLookup:
+    """
+    Finding a galaxy's measurement by its ID, in a student's own
+    measurements and in every measurement of the given size.
+    """
+
+    params = SIZES
+    param_names = ["size"]
+
+    def setup(self, size):
+        pop = population(size)
+        student_id = pop.measurements[0].student_id
+        self.state = LocalState(
+            measurements=[m for m in pop.measurements if m.student_id == student_id],
+        )
+        self.first = self.state.measurements[0].galaxy_id
+        self.last = self.state.measurements[-1].galaxy_id
+        self.missing = -1
+        self.all_state = LocalState(measurements=pop.measurements)
+        self.all_last = pop.measurements[-1].galaxy_id
+
+    def time_get_measurement_index(self, size):
+        self.state.get_measurement_index(self.first)
+        self.state.get_measurement_index(self.last)
+        self.state.get_measurement_index(self.missing)
+
+    def time_get_measurement_index_all(self, size):
+        self.all_state.get_measurement_index(self.all_last)
+        self.all_state.get_measurement_index(self.missing)
+
+    def time_get_measurement_index_new_state(self, size):
+        # The first lookup in a new state value builds its index
+        self.all_state.model_copy().get_measurement_index(self.all_last)
+
+    def time_update_measurement(self, size):
+        # The way the stage pages replace a measurement in the local state
+        local_state = solara.reactive(self.all_state)
+        index = local_state.value.get_measurement_index(self.all_last)
+        measurements = local_state.value.measurements
+        updated = measurements[index].model_copy(update={"velocity_value": 1000})
+        local_state.set(local_state.value.model_copy(
+            update={"measurements": measurements[:index] + [updated] + measurements[index + 1:]}
+        ))
@@ -0,0 +1,36 @@
+from ipyvue.Template import get_template
+
+from hubbleds.templates import PACKAGE_ROOT, TemplateRegistry
+
+GUIDELINE = next(PACKAGE_ROOT.glob("pages/01-*/guidelines/*.vue"))
+
+
+class TimeTemplateLookup:
+    """
+    Looking up the template of a guideline, as happens each time one is
+    rendered: by ipyvue, which reads the file again, and by the registry.
+    """
+
+    def setup(self):
+        self.registry = TemplateRegistry()
+        self.registry.load()
+        self.path = str(GUIDELINE)
+        get_template(self.path)
+
+    def time_ipyvue(self):
+        get_template(self.path)
+
+    def time_registry(self):
+        self.registry.get_template(self.path)
+
+
+class TimeTemplateLoad:
+    """Reading and validating every template of the app."""
+
+    def time_load(self):
+        TemplateRegistry().load()
+
+    def track_templates(self):
+        return TemplateRegistry().load()
+
+    track_templates.unit = "templates"
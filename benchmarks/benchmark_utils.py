@@ -0,0 +1,108 @@
+from glue.core import Data
+
+from hubbleds.utils import (
+    age_in_gyr,
+    age_in_gyr_simple,
+    data_summary_for_component,
+    fit_line,
+    make_summary_data,
+    measurement_list_to_glue_data,
+    models_to_glue_data,
+)
+
+from .common import SIZES, population
+
+
+class TimeGlueData:
+    """
+    Converting measurements and summaries of a class, a school and the
+    production database into glue data.
+    """
+
+    params = SIZES
+    param_names = ["size"]
+    timeout = 300
+
+    def setup(self, size):
+        self.population = population(size)
+        self.dumped = [m.model_dump() for m in self.population.measurements]
+
+    def time_models_to_glue_data(self, size):
+        models_to_glue_data(self.population.measurements, label="measurements")
+
+    def time_summaries_to_glue_data(self, size):
+        models_to_glue_data(self.population.student_summaries, label="summaries")
+
+    def time_measurement_list_to_glue_data(self, size):
+        measurement_list_to_glue_data(self.population.measurements, label="measurements")
+
+    def time_measurement_dicts_to_glue_data(self, size):
+        measurement_list_to_glue_data(self.dumped, label="measurements")
+
+    def peakmem_models_to_glue_data(self, size):
+        models_to_glue_data(self.population.measurements, label="measurements")
+
+
+class TimeSummaries:
+    """
+    The Hubble fits and ages of each student, for a class and a school. The
+    production size is left out since it fits each of its 10,000 students.
+    """
+
+    params = SIZES[:-1]
+    param_names = ["size"]
+    timeout = 300
+
+    def setup(self, size):
+        pop = population(size)
+        self.data = models_to_glue_data(pop.measurements, label="measurements")
+
+    def time_make_summary_data(self, size):
+        make_summary_data(
+            self.data,
+            input_id_field="student_id",
+            output_id_field="id",
+            label="summaries",
+        )
+
+
+class TimeFits:
+    """A single fit of a student's, a class's or every measurement."""
+
+    params = [5, 150, 50_000]
+    param_names = ["npoints"]
+
+    def setup(self, npoints):
+        measurements = population("production").measurements[:npoints]
+        self.distances = [m.est_dist_value for m in measurements]
+        self.velocities = [m.velocity_value for m in measurements]
+
+    def time_fit_line(self, npoints):
+        fit_line(self.distances, self.velocities)
+
+
+class TimeAges:
+    """The age of the universe for a Hubble constant."""
+
+    def time_age_in_gyr(self):
+        age_in_gyr(70)
+
+    def time_age_in_gyr_simple(self):
+        age_in_gyr_simple(70)
+
+
+class TimeDataSummary:
+    """The statistics shown for the velocities of each size of data."""
+
+    params = SIZES
+    param_names = ["size"]
+
+    def setup(self, size):
+        pop = population(size)
+        self.data = Data(
+            label="measurements",
+            velocity_value=[m.velocity_value for m in pop.measurements],
+        )
+
+    def time_data_summary_for_component(self, size):
+        data_summary_for_component(self.data, self.data.id["velocity_value"])
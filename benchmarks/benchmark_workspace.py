@@ -0,0 +1,158 @@
+import enum
+import gc
+import tracemalloc
+
+import numpy as np
+from glue.core import Data, DataCollection, Session
+from glue_jupyter import JupyterApplication
+from glue_plotly.viewers.histogram.viewer import PlotlyHistogramView
+from glue_plotly.viewers.scatter.viewer import PlotlyScatterView
+
+from hubbleds.base_marker import BaseMarker
+from hubbleds.workspace import GlueWorkspace, LazyViewer, MarkerViewers, reachable_stages
+
+# The viewers created by each stage page when it mounts
+STAGE_VIEWERS = {
+    "spectra-&-velocity": [PlotlyHistogramView] * 2,
+    "distance-introduction": [],
+    "distance-measurements": [PlotlyHistogramView] * 2,
+    "explore-data": [PlotlyScatterView] * 2,
+    "class-results-uncertainty": [PlotlyScatterView] * 3 + [PlotlyHistogramView] * 3,
+    "prodata": [PlotlyScatterView],
+}
+STAGES = list(STAGE_VIEWERS)
+
+# A full walkthrough, with the back and forth of a student reviewing
+#  earlier stages
+WALKTHROUGH = [0, 1, 2, 1, 2, 3, 2, 3, 4, 3, 4, 5, 4, 5, 0, 5]
+
+
+class Marker(enum.Enum, BaseMarker):
+    # The steps at which the stage 5 viewers first appear
+    ran_var1 = enum.auto()
+    cla_res1 = enum.auto()
+    age_dis1 = enum.auto()
+    cla_res1c = enum.auto()
+    age_dis1c = enum.auto()
+    two_his1 = enum.auto()
+
+
+# The stage 5 viewers and the steps at which they are shown
+STAGE_5_VIEWERS = {
+    "layer": (PlotlyScatterView, ((Marker.ran_var1, Marker.ran_var1),)),
+    "student_slider": (PlotlyScatterView, ((Marker.cla_res1, Marker.age_dis1),)),
+    "class_slider": (PlotlyScatterView, ((Marker.cla_res1c, None),)),
+    "student_hist": (PlotlyHistogramView, ((Marker.age_dis1, Marker.age_dis1),)),
+    "all_student_hist": (PlotlyHistogramView, ((Marker.two_his1, None),)),
+    "class_hist": (PlotlyHistogramView, ((Marker.age_dis1c, None),)),
+}
+
+
+class Route:
+    def __init__(self, path):
+        self.path = path
+
+
+ROUTES = [Route(stage) for stage in STAGES]
+
+
+def _session():
+    data_collection = DataCollection()
+    values = np.random.default_rng(42).normal(13, 2, 5000)
+    data_collection.append(Data(label="Ages", x=values, y=values * 70))
+    return data_collection, Session(data_collection=data_collection)
+
+
+def _setup(viewer):
+    viewer.add_data(viewer.session.data_collection[0])
+
+
+def walkthrough_per_mount():
+    # Every mount creates a new application and new viewers
+    data_collection, session = _session()
+    viewers = []
+    for index in WALKTHROUGH:
+        app = JupyterApplication(data_collection, session)
+        for viewer_cls in STAGE_VIEWERS[STAGES[index]]:
+            viewer = app.new_data_viewer(viewer_cls, show=False)
+            _setup(viewer)
+            viewers.append(viewer)
+    return viewers
+
+
+def walkthrough_workspace():
+    data_collection, session = _session()
+    workspace = GlueWorkspace(data_collection, session)
+    for index in WALKTHROUGH:
+        workspace.retain(reachable_stages(ROUTES, index))
+        stage = STAGES[index]
+        for i, viewer_cls in enumerate(STAGE_VIEWERS[stage]):
+            workspace.viewer(stage, i, viewer_cls, setup=_setup)
+    return workspace
+
+
+def _traced_bytes(walkthrough):
+    gc.collect()
+    tracemalloc.start()
+    result = walkthrough()
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return current
+
+
+class MemWalkthrough:
+    """
+    Memory held by a session's glue viewers after a full story walkthrough,
+    creating viewers on every stage mount versus acquiring them from the
+    session's workspace.
+    """
+
+    timeout = 300
+
+    def peakmem_per_mount(self):
+        walkthrough_per_mount()
+
+    def peakmem_workspace(self):
+        walkthrough_workspace()
+
+    def track_viewers_per_mount(self):
+        return len(walkthrough_per_mount())
+
+    def track_viewers_workspace(self):
+        return walkthrough_workspace().memory_stats()["viewers"]
+
+    def track_traced_bytes_per_mount(self):
+        return _traced_bytes(walkthrough_per_mount)
+
+    def track_traced_bytes_workspace(self):
+        return _traced_bytes(walkthrough_workspace)
+
+    track_traced_bytes_per_mount.unit = "bytes"
+    track_traced_bytes_workspace.unit = "bytes"
+
+
+class TimeStageViewers:
+    """
+    Building the stage 5 viewers before the first render: all six viewers
+    eagerly, or only the viewers shown at the first step.
+    """
+
+    def setup(self):
+        self.data_collection, self.session = _session()
+
+    def _workspace(self):
+        return GlueWorkspace(self.data_collection, self.session)
+
+    def time_eager(self):
+        workspace = self._workspace()
+        for key, (viewer_cls, _) in STAGE_5_VIEWERS.items():
+            workspace.viewer("stage", key, viewer_cls, setup=_setup)
+
+    def time_lazy_first_step(self):
+        viewers = MarkerViewers(self._workspace(), "stage", {
+            key: LazyViewer(viewer_cls, ranges, _setup)
+            for key, (viewer_cls, ranges) in STAGE_5_VIEWERS.items()
+        })
+        viewers.prepare(Marker.first())
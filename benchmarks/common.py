@@ -0,0 +1,14 @@
+from functools import lru_cache
+
+from hubbleds.synthetic import FIXTURE_SIZES, SyntheticPopulation, generate_population
+
+# The fixture sizes that the benchmarks are parametrized over: a class of 30
+#  students, a school of 300 and the roughly 10,000 students (50,000
+#  measurements) of the production database
+SIZES = list(FIXTURE_SIZES)[1:]
+
+
+@lru_cache
+def population(size: str) -> SyntheticPopulation:
+    n_classes, students_per_class = FIXTURE_SIZES[size]
+    return generate_population(n_classes, students_per_class, seed=42)
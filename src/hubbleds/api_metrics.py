@@ -0,0 +1,361 @@
+import json
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter, defaultdict
+from functools import wraps
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from os import getenv
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from cosmicds.logger import setup_logger
+
+logger = setup_logger("API_METRICS")
+
+__all__ = [
+    "API_METRICS",
+    "APIMetrics",
+    "Histogram",
+    "InstrumentedSession",
+    "instrumented",
+]
+
+# Setting this enables the metrics when the app starts. If it is a port
+#  number, the metrics are also served there in the Prometheus text format.
+METRICS_ENV = "HUBBLEDS_API_METRICS"
+
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+BYTES_BUCKETS = tuple(2 ** n for n in range(8, 28, 2))
+ROWS_BUCKETS = (1, 10, 100, 1_000, 10_000, 100_000)
+
+PHASES = ("total", "network", "decode")
+
+
+class Histogram:
+    """A cumulative histogram with fixed bucket bounds, as in Prometheus."""
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self) -> List[Tuple[str, int]]:
+        total = 0
+        bounds = [f"{b:g}" for b in self.buckets] + ["+Inf"]
+        cumulative = []
+        for bound, count in zip(bounds, self.counts):
+            total += count
+            cumulative.append((bound, total))
+        return cumulative
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {"buckets": dict(self.cumulative()), "sum": self.sum, "count": self.count}
+
+
+class _Call:
+    __slots__ = ("network", "nbytes", "requests", "status")
+
+    def __init__(self):
+        self.network = 0.0
+        self.nbytes = 0
+        self.requests = 0
+        self.status: Optional[int] = None
+
+
+class _EndpointMetrics:
+
+    def __init__(self):
+        self.seconds = {phase: Histogram(SECONDS_BUCKETS) for phase in PHASES}
+        self.nbytes = Histogram(BYTES_BUCKETS)
+        self.rows = Histogram(ROWS_BUCKETS)
+        self.statuses: Counter = Counter()
+        self.cache: Counter = Counter()
+        self.errors = 0
+
+
+class APIMetrics:
+    """
+    Per-endpoint metrics of the calls made through `LocalAPI`: wall time
+    split into the time spent in HTTP requests (``network``, including
+    reading the response body) and the rest (``decode``: JSON and pydantic
+    parsing and state updates), response bytes, status codes, row counts
+    and, for the cached endpoints, cache hits and misses.
+
+    Recording is off by default, and disabled metrics only cost a flag
+    check per call.
+    """
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self._endpoints: Dict[str, _EndpointMetrics] = defaultdict(_EndpointMetrics)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    def enable(self):
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def reset(self):
+        with self._lock:
+            self._endpoints.clear()
+
+    def _stack(self) -> List[_Call]:
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def _record(
+        self,
+        endpoint: str,
+        total: float,
+        call: _Call,
+        rows: Optional[int],
+        cached: bool,
+        failed: bool,
+    ):
+        with self._lock:
+            metrics = self._endpoints[endpoint]
+            metrics.seconds["total"].observe(total)
+            metrics.seconds["network"].observe(call.network)
+            metrics.seconds["decode"].observe(max(total - call.network, 0))
+            if call.requests:
+                metrics.nbytes.observe(call.nbytes)
+                metrics.statuses[call.status] += 1
+            if rows is not None:
+                metrics.rows.observe(rows)
+            if cached:
+                metrics.cache["miss" if call.requests else "hit"] += 1
+            if failed:
+                metrics.errors += 1
+
+    def call(self, endpoint: str, func: Callable, args, kwargs, cached: bool = False):
+        stack = self._stack()
+        call = _Call()
+        stack.append(call)
+        failed = True
+        result = None
+        start = time.perf_counter()
+        try:
+            result = func(*args, **kwargs)
+            failed = False
+            return result
+        finally:
+            total = time.perf_counter() - start
+            stack.pop()
+            if stack:
+                # Requests made by a nested call also count for its caller
+                parent = stack[-1]
+                parent.network += call.network
+                parent.nbytes += call.nbytes
+                parent.requests += call.requests
+                parent.status = call.status or parent.status
+            self._record(endpoint, total, call, _count_rows(result), cached, failed)
+
+    def request(self, send: Callable, *args, **kwargs):
+        stack = getattr(self._local, "stack", None)
+        if not stack:
+            return send(*args, **kwargs)
+
+        start = time.perf_counter()
+        response = send(*args, **kwargs)
+        call = stack[-1]
+        call.network += time.perf_counter() - start
+        call.nbytes += len(response.content)
+        call.requests += 1
+        call.status = response.status_code
+        return response
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """The metrics of each endpoint, as JSON-serializable dictionaries."""
+        with self._lock:
+            return {
+                endpoint: {
+                    "seconds": {p: h.as_dict() for p, h in metrics.seconds.items()},
+                    "bytes": metrics.nbytes.as_dict(),
+                    "rows": metrics.rows.as_dict(),
+                    "status": {str(s): n for s, n in metrics.statuses.items()},
+                    "cache": dict(metrics.cache),
+                    "errors": metrics.errors,
+                }
+                for endpoint, metrics in sorted(self._endpoints.items())
+            }
+
+    def prometheus(self) -> str:
+        """The metrics in the Prometheus text exposition format."""
+        lines = []
+
+        def histogram(name, help, series):
+            lines.extend([f"# HELP {name} {help}", f"# TYPE {name} histogram"])
+            for labels, hist in series:
+                for bound, count in hist.cumulative():
+                    lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {count}')
+                lines.append(f"{name}_sum{{{labels}}} {hist.sum:g}")
+                lines.append(f"{name}_count{{{labels}}} {hist.count}")
+
+        def counter(name, help, series):
+            lines.extend([f"# HELP {name} {help}", f"# TYPE {name} counter"])
+            lines.extend(f"{name}{{{labels}}} {value}" for labels, value in series)
+
+        with self._lock:
+            endpoints = sorted(self._endpoints.items())
+            histogram(
+                "hubbleds_api_seconds",
+                "Wall time of LocalAPI calls, by phase.",
+                [(f'endpoint="{e}",phase="{p}"', h)
+                 for e, m in endpoints for p, h in m.seconds.items()],
+            )
+            histogram(
+                "hubbleds_api_response_bytes",
+                "Response bytes read by LocalAPI calls.",
+                [(f'endpoint="{e}"', m.nbytes) for e, m in endpoints],
+            )
+            histogram(
+                "hubbleds_api_rows",
+                "Rows returned by LocalAPI calls.",
+                [(f'endpoint="{e}"', m.rows) for e, m in endpoints if m.rows.count],
+            )
+            counter(
+                "hubbleds_api_responses_total",
+                "Responses to LocalAPI calls, by the status of the last request.",
+                [(f'endpoint="{e}",status="{s}"', n)
+                 for e, m in endpoints for s, n in sorted(m.statuses.items())],
+            )
+            counter(
+                "hubbleds_api_cache_total",
+                "Cache hits and misses of the cached LocalAPI calls.",
+                [(f'endpoint="{e}",result="{r}"', n)
+                 for e, m in endpoints for r, n in sorted(m.cache.items())],
+            )
+            counter(
+                "hubbleds_api_errors_total",
+                "LocalAPI calls that raised an exception.",
+                [(f'endpoint="{e}"', m.errors) for e, m in endpoints if m.errors],
+            )
+
+        return "\n".join(lines) + "\n"
+
+    def dump(self, path: Path):
+        """
+        Write the metrics to ``path``, as JSON if it ends with ``.json`` and
+        in the Prometheus text format otherwise.
+        """
+        path = Path(path)
+        with open(path, "w") as f:
+            if path.suffix == ".json":
+                json.dump(self.snapshot(), f, indent=1)
+            else:
+                f.write(self.prometheus())
+
+    def serve(self, port: int = 0, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+        """
+        Serve the metrics at ``/metrics`` on a local port, in a daemon
+        thread. Use ``server.server_address`` to find the port when it is 0.
+        """
+        if self._server is not None:
+            return self._server
+
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = metrics.prometheus().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        logger.info("Serving API metrics at http://%s:%d/metrics.", *self._server.server_address[:2])
+        return self._server
+
+    def stop_serving(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+
+def _count_rows(result) -> Optional[int]:
+    if isinstance(result, (list, dict)):
+        return len(result)
+    if isinstance(result, tuple) and all(isinstance(r, list) for r in result):
+        return sum(len(r) for r in result)
+    return None
+
+
+API_METRICS = APIMetrics()
+
+
+def instrumented(func: Optional[Callable] = None, *, cached: bool = False):
+    """
+    Record a `LocalAPI` method in `API_METRICS` under its name. Calls of a
+    ``cached`` method that make no requests count as cache hits.
+    """
+    if func is None:
+        return lambda f: instrumented(f, cached=cached)
+
+    endpoint = func.__name__
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        if not API_METRICS.enabled:
+            return func(*args, **kwargs)
+        return API_METRICS.call(endpoint, func, args, kwargs, cached=cached)
+
+    return wrapper
+
+
+class InstrumentedSession:
+    """
+    Wraps a `requests.Session` so that the requests made during an
+    instrumented call are timed and counted for it.
+    """
+
+    def __init__(self, session):
+        self.session = session
+
+    def __getattr__(self, name):
+        return getattr(self.session, name)
+
+    def request(self, method, url, **kwargs):
+        return API_METRICS.request(self.session.request, method, url, **kwargs)
+
+    def get(self, url, **kwargs):
+        return API_METRICS.request(self.session.get, url, **kwargs)
+
+    def put(self, url, **kwargs):
+        return API_METRICS.request(self.session.put, url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return API_METRICS.request(self.session.post, url, **kwargs)
+
+    def delete(self, url, **kwargs):
+        return API_METRICS.request(self.session.delete, url, **kwargs)
+
+
+_metrics_setting = getenv(METRICS_ENV)
+if _metrics_setting:
+    API_METRICS.enable()
+    if _metrics_setting.isdigit() and int(_metrics_setting) > 1:
+        API_METRICS.serve(int(_metrics_setting))
@@ -2,6 +2,8 @@ from dataclasses import dataclass, field
 
 from cosmicds.state import BaseState
 from hubbleds.base_marker import BaseMarker
+from hubbleds.dirty_tracking import STAGE_STATE
+from hubbleds.free_response_buffer import flush_free_responses
 from solara import Reactive
 from solara.toestand import Ref
 
@@ -9,11 +11,13 @@ from cosmicds.logger import setup_logger
 
 logger = setup_logger("STATE")
 
-from typing import TypeVar
+from typing import ClassVar, Optional, TypeVar
 BaseComponentStateT = TypeVar('BaseComponentStateT', bound='BaseComponentState')
 
 def transition_to(component_state: Reactive[BaseComponentStateT], step: BaseMarker, force=False):
     if component_state.value.can_transition(step) or force:
+        # Answers that are still being typed are written before moving on
+        flush_free_responses()
         Ref(component_state.fields.current_step).set(step)
     else:
         logger.warning(
@@ -39,6 +43,14 @@ def transition_previous(component_state: Reactive[BaseComponentStateT], force=Tr
 class BaseComponentState:
     current_step: BaseMarker
 
+    # The selected galaxies aren't written with the stage state (see
+    #  `LocalAPI.put_stage_state`)
+    FIELD_CATEGORIES: ClassVar[dict[str, Optional[str]]] = {
+        "selected_galaxy": None,
+        "selected_example_galaxy": None,
+    }
+    DEFAULT_CATEGORY: ClassVar[str] = STAGE_STATE
+
     def is_current_step(self, step: BaseMarker):
         return self.current_step.value == step.value
 
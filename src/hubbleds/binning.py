@@ -0,0 +1,296 @@
+from collections import OrderedDict
+from typing import Hashable, NamedTuple, Optional
+
+import numpy as np
+
+__all__ = [
+    "DotStack",
+    "DotStacker",
+    "HistogramBins",
+    "HistogramBinner",
+    "array_fingerprint",
+    "bin_indices",
+    "histogram_bins",
+    "histogram_counts",
+    "stack_dots",
+]
+
+MAX_HISTOGRAM_BINS = 100
+
+
+class DotStack(NamedTuple):
+    edges: np.ndarray
+    counts: np.ndarray
+    x: np.ndarray
+    y: np.ndarray
+
+
+def bin_indices(values: np.ndarray, edges: np.ndarray) -> np.ndarray:
+    """
+    Compute the bin index of each value for uniformly spaced bin edges,
+    matching the assignment made by `numpy.histogram` (the last bin includes
+    its right edge). All values must lie within the range of the edges.
+    """
+    nbin = edges.size - 1
+    norm = nbin / (edges[-1] - edges[0])
+    indices = ((values - edges[0]) * norm).astype(np.intp)
+    indices[indices == nbin] -= 1
+
+    # Correct for floating point differences from the edges themselves
+    decrement = values < edges[indices]
+    indices[decrement] -= 1
+    increment = (values >= edges[indices + 1]) & (indices != nbin - 1)
+    indices[increment] += 1
+
+    return indices
+
+
+def _in_range(values: np.ndarray, x_min: float, x_max: float) -> np.ndarray:
+    return values[np.isfinite(values) & (values >= x_min) & (values <= x_max)]
+
+
+def stack_dots(values, x_min: float, x_max: float, nbin: int) -> DotStack:
+    """
+    Compute the positions of the dots in a dot plot.
+
+    Each value inside ``[x_min, x_max]`` becomes a dot placed at the center
+    of its bin, stacked on top of the other dots in that bin, so that the
+    ``y`` position of a dot is its (1-based) height in the stack.
+
+    Parameters
+    ----------
+    values: array-like
+        The values to plot
+    x_min, x_max: float
+        The range of the bins
+    nbin: int
+        The number of bins
+
+    Returns
+    ----------
+    stack: DotStack
+        The bin edges, the counts in each bin and the dot positions
+    """
+    if not x_max > x_min or nbin < 1:
+        raise ValueError(f"Invalid bins: ({x_min}, {x_max}) with {nbin} bins.")
+
+    values = np.asarray(values, dtype=float).ravel()
+    edges = np.linspace(x_min, x_max, nbin + 1)
+    counts = np.bincount(
+        bin_indices(_in_range(values, x_min, x_max), edges), minlength=nbin
+    )
+
+    centers = 0.5 * (edges[:-1] + edges[1:])
+    starts = np.cumsum(counts) - counts
+    x = np.repeat(centers, counts)
+    y = np.arange(1, x.size + 1) - np.repeat(starts, counts)
+
+    return DotStack(edges, counts, x, y)
+
+
+def _append_dots(stack: DotStack, new_values: np.ndarray) -> DotStack:
+    x_min, x_max = stack.edges[0], stack.edges[-1]
+    indices = bin_indices(_in_range(new_values, x_min, x_max), stack.edges)
+    if indices.size == 0:
+        return stack
+
+    # Dots added to the same bin stack on top of each other
+    order = np.argsort(indices, kind="stable")
+    indices = indices[order]
+    first = np.searchsorted(indices, indices, side="left")
+    ranks = np.arange(indices.size) - first
+
+    counts = stack.counts.copy()
+    y_new = counts[indices] + ranks + 1
+    np.add.at(counts, indices, 1)
+
+    centers = 0.5 * (stack.edges[:-1] + stack.edges[1:])
+    x = np.concatenate([stack.x, centers[indices]])
+    y = np.concatenate([stack.y, y_new])
+
+    return DotStack(stack.edges, counts, x, y)
+
+
+class DotStacker:
+    """
+    Cached dot stacking for a single dot plot layer.
+
+    Results are cached by ``(version, x_min, x_max, nbin)``, so that zooming
+    back and forth between ranges doesn't restack the dots. When the values
+    for a new version only extend the values of a cached version (e.g. a
+    student adds a single measurement), the new dots are stacked onto the
+    cached result rather than recomputing every position.
+    """
+
+    def __init__(self, cache_size: int = 4):
+        self.cache_size = cache_size
+        self._cache: OrderedDict[tuple, tuple[np.ndarray, DotStack]] = OrderedDict()
+
+    def clear(self):
+        self._cache.clear()
+
+    def _find_prefix(self, values: np.ndarray, bins: tuple) -> Optional[tuple]:
+        for key, (cached_values, _) in reversed(self._cache.items()):
+            if key[1:] != bins or cached_values.size > values.size:
+                continue
+            # Compare the bits so that NaNs (which are never plotted) match
+            prefix = values[:cached_values.size]
+            if np.array_equal(cached_values.view(np.uint64), prefix.view(np.uint64)):
+                return key
+        return None
+
+    def stack(
+        self,
+        values,
+        x_min: float,
+        x_max: float,
+        nbin: int,
+        version: Optional[Hashable] = None,
+    ) -> DotStack:
+        """
+        Compute (or retrieve) the dot positions for the given values. If
+        ``version`` is None the result is neither cached nor reused.
+        """
+        values = np.ascontiguousarray(values, dtype=float).ravel()
+        bins = (float(x_min), float(x_max), int(nbin))
+        if version is None:
+            return stack_dots(values, *bins)
+
+        key = (version, *bins)
+        if key in self._cache:
+            self._cache.move_to_end(key)
+            return self._cache[key][1]
+
+        prefix_key = self._find_prefix(values, bins)
+        if prefix_key is not None:
+            cached_values, cached_stack = self._cache[prefix_key]
+            stack = _append_dots(cached_stack, values[cached_values.size:])
+        else:
+            stack = stack_dots(values, *bins)
+
+        stored = values.copy()
+        stored.flags.writeable = False
+        self._cache[key] = (stored, stack)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+        return stack
+
+
+class HistogramBins(NamedTuple):
+    x_min: float
+    x_max: float
+    nbin: int
+
+
+def array_fingerprint(*arrays) -> int:
+    """
+    A cheap content hash of one or more arrays, used as a data version when
+    the data doesn't provide one.
+    """
+    return hash(tuple(
+        np.ascontiguousarray(a, dtype=float).tobytes() for a in arrays
+    ))
+
+
+def histogram_bins(
+    arrays,
+    bin_width: float = 1,
+    pad: float = 2.5,
+    fence: float = 3,
+    max_bins: int = MAX_HISTOGRAM_BINS,
+) -> Optional[HistogramBins]:
+    """
+    Compute a shared, robust binning for one or more arrays of values.
+
+    The range covers all of the values unless some of them lie more than
+    ``fence`` interquartile ranges outside of the quartiles of the pooled
+    values, in which case the range stops at the fences and those outliers
+    are left to the overflow bins (see `histogram_counts`). The range is then
+    rounded and padded by ``pad``, and split into bins of ``bin_width``, up
+    to at most ``max_bins`` bins.
+
+    Returns None if there are no finite values.
+    """
+    values = np.concatenate([np.asarray(a, dtype=float).ravel() for a in arrays]) \
+        if len(arrays) else np.empty(0)
+    values = values[np.isfinite(values)]
+    if values.size == 0:
+        return None
+
+    low, q1, q3, high = np.percentile(values, [0, 25, 75, 100])
+    iqr = q3 - q1
+    low = max(low, q1 - fence * iqr)
+    high = min(high, q3 + fence * iqr)
+
+    x_min = round(low, 0) - pad
+    x_max = round(high, 0) + pad
+    nbin = min(max(int(round((x_max - x_min) / bin_width)), 1), max_bins)
+
+    return HistogramBins(float(x_min), float(x_max), nbin)
+
+
+def histogram_counts(
+    values, x_min: float, x_max: float, nbin: int
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Count the values in each of ``nbin`` uniform bins over
+    ``[x_min, x_max]``. Unlike `numpy.histogram`, values outside of the range
+    aren't dropped: they are collected into the first and last bins, which
+    act as underflow and overflow bins.
+
+    Returns
+    ----------
+    edges, counts: numpy.ndarray
+        The bin edges and the number of values in each bin
+    """
+    if not x_max > x_min or nbin < 1:
+        raise ValueError(f"Invalid bins: ({x_min}, {x_max}) with {nbin} bins.")
+
+    values = np.asarray(values, dtype=float).ravel()
+    values = np.clip(values[np.isfinite(values)], x_min, x_max)
+    edges = np.linspace(x_min, x_max, nbin + 1)
+    counts = np.bincount(bin_indices(values, edges), minlength=nbin)
+
+    return edges, counts
+
+
+class HistogramBinner:
+    """
+    Shared, cached histogram binning for a group of linked histogram viewers.
+
+    The bins are computed once per data version for the whole group (see
+    `histogram_bins`), and the counts for each layer are cached per data
+    version and bins.
+    """
+
+    def __init__(self, cache_size: int = 16, **bin_kwargs):
+        self.cache_size = cache_size
+        self.bin_kwargs = bin_kwargs
+        self._bins: tuple[Hashable, Optional[HistogramBins]] | None = None
+        self._counts: OrderedDict[tuple, tuple[np.ndarray, np.ndarray]] = OrderedDict()
+
+    def bins(self, arrays, version: Optional[Hashable] = None) -> Optional[HistogramBins]:
+        if version is None:
+            version = array_fingerprint(*arrays)
+        if self._bins is None or self._bins[0] != version:
+            self._bins = (version, histogram_bins(arrays, **self.bin_kwargs))
+        return self._bins[1]
+
+    def counts(
+        self,
+        values,
+        bins: HistogramBins,
+        version: Optional[Hashable] = None,
+    ) -> tuple[np.ndarray, np.ndarray]:
+        if version is None:
+            return histogram_counts(values, *bins)
+
+        key = (version, *bins)
+        if key not in self._counts:
+            self._counts[key] = histogram_counts(values, *bins)
+            while len(self._counts) > self.cache_size:
+                self._counts.popitem(last=False)
+        else:
+            self._counts.move_to_end(key)
+        return self._counts[key]
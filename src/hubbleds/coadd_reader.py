@@ -0,0 +1,251 @@
+from math import prod
+from typing import Iterable
+
+import numpy as np
+
+__all__ = [
+    "COADD_EXTENSION",
+    "read_coadd_columns",
+    "read_coadd_spectrum",
+    "read_coadd_spectrum_astropy",
+]
+
+COADD_EXTENSION = "COADD"
+
+BLOCK_SIZE = 2880
+CARD_SIZE = 80
+
+# Binary table TFORM codes mapped to big-endian numpy dtypes. Variable-length
+#  array descriptors (P/Q) are only sized so that we can step over them.
+TFORM_DTYPES = {
+    "L": "i1",
+    "B": "u1",
+    "I": ">i2",
+    "J": ">i4",
+    "K": ">i8",
+    "E": ">f4",
+    "D": ">f8",
+    "C": ">c8",
+    "M": ">c16",
+    "P": ">i4",
+    "Q": ">i8",
+}
+
+DESCRIPTOR_REPEAT = {"P": 2, "Q": 2}
+
+
+def _parse_value(raw: str):
+    raw = raw.strip()
+    if raw.startswith("'"):
+        end = raw.find("'", 1)
+        while end != -1 and raw[end + 1:end + 2] == "'":
+            end = raw.find("'", end + 2)
+        return raw[1:end].replace("''", "'").rstrip()
+
+    raw = raw.split("/", 1)[0].strip()
+    if raw == "T":
+        return True
+    if raw == "F":
+        return False
+    try:
+        return int(raw)
+    except ValueError:
+        pass
+    try:
+        return float(raw.replace("D", "E"))
+    except ValueError:
+        return raw
+
+
+def _read_header(buffer: memoryview, offset: int) -> tuple[dict, int]:
+    header = {}
+    size = len(buffer)
+    while True:
+        if offset + BLOCK_SIZE > size:
+            raise ValueError("Truncated FITS header.")
+        block = bytes(buffer[offset:offset + BLOCK_SIZE]).decode("ascii")
+        offset += BLOCK_SIZE
+        for i in range(0, BLOCK_SIZE, CARD_SIZE):
+            card = block[i:i + CARD_SIZE]
+            key = card[:8].rstrip()
+            if key == "END":
+                return header, offset
+            if card[8:10] == "= " and key not in header:
+                header[key] = _parse_value(card[10:])
+
+
+def _data_size(header: dict) -> int:
+    naxis = header.get("NAXIS", 0)
+    if naxis == 0:
+        return 0
+    bitpix = abs(header["BITPIX"]) // 8
+    axes = prod(header[f"NAXIS{i}"] for i in range(1, naxis + 1))
+    size = bitpix * header.get("GCOUNT", 1) * (header.get("PCOUNT", 0) + axes)
+    return -(-size // BLOCK_SIZE) * BLOCK_SIZE
+
+
+def _column_layout(header: dict) -> dict[str, tuple[np.dtype, int, int]]:
+    layout = {}
+    offset = 0
+    for i in range(1, header["TFIELDS"] + 1):
+        tform = header[f"TFORM{i}"].strip()
+        digits = len(tform) - len(tform.lstrip("0123456789"))
+        repeat = int(tform[:digits]) if digits else 1
+        code = tform[digits]
+
+        if code == "A":
+            dtype = np.dtype(f"S{repeat}")
+            width = repeat
+            repeat = 1
+        elif code == "X":
+            dtype = np.dtype(f"V{-(-repeat // 8)}")
+            width = dtype.itemsize
+            repeat = 1
+        elif code in TFORM_DTYPES:
+            dtype = np.dtype(TFORM_DTYPES[code])
+            repeat *= DESCRIPTOR_REPEAT.get(code, 1)
+            width = dtype.itemsize * repeat
+        else:
+            raise ValueError(f"Unsupported binary table format `{tform}`.")
+
+        if repeat > 1:
+            dtype = np.dtype((dtype, (repeat,)))
+
+        name = str(header.get(f"TTYPE{i}", f"col{i}")).lower()
+        layout[name] = (dtype, offset, i)
+        offset += width
+
+    if offset != header["NAXIS1"]:
+        raise ValueError("Binary table column widths do not match NAXIS1.")
+
+    return layout
+
+
+def _find_extension(buffer: memoryview, extname: str) -> tuple[dict, int]:
+    offset = 0
+    size = len(buffer)
+    while offset < size:
+        header, data_start = _read_header(buffer, offset)
+        if str(header.get("EXTNAME", "")).upper() == extname.upper():
+            if header.get("XTENSION") != "BINTABLE":
+                raise ValueError(f"Extension `{extname}` is not a binary table.")
+            return header, data_start
+        offset = data_start + _data_size(header)
+
+    raise KeyError(f"No extension named '{extname}' in file.")
+
+
+def read_coadd_columns(
+    content: bytes | bytearray | memoryview,
+    columns: Iterable[str] = ("loglam", "flux", "ivar"),
+    extname: str = COADD_EXTENSION,
+) -> dict[str, np.ndarray]:
+    """
+    Read only the requested columns of an SDSS spectrum binary table.
+
+    The binary table header is parsed once to find the byte offset of each
+    column, and the requested columns are then viewed directly from the raw
+    buffer using a strided numpy dtype before being copied into native-endian
+    arrays. No other columns or extensions are materialized.
+
+    Parameters
+    ----------
+    content: bytes
+        The raw contents of the FITS file
+    columns: iterable of str
+        The (case-insensitive) names of the columns to read
+    extname: str
+        The name of the binary table extension to read from
+
+    Returns
+    ----------
+    columns: dict
+        A mapping of lowercased column name to a native-endian numpy array
+
+    Raises
+    ----------
+    KeyError
+        If the extension or any of the requested columns does not exist
+    ValueError
+        If the file cannot be parsed by this reader
+    """
+    buffer = memoryview(content).cast("B")
+    header, data_start = _find_extension(buffer, extname)
+    layout = _column_layout(header)
+    nrows = header["NAXIS2"]
+
+    names = [c.lower() for c in columns]
+    missing = [c for c in names if c not in layout]
+    if missing:
+        raise KeyError(f"Columns {missing} not found in extension '{extname}'.")
+
+    if data_start + nrows * header["NAXIS1"] > len(buffer):
+        raise ValueError("Truncated FITS binary table.")
+
+    row_dtype = np.dtype({
+        "names": names,
+        "formats": [layout[c][0] for c in names],
+        "offsets": [layout[c][1] for c in names],
+        "itemsize": header["NAXIS1"],
+    })
+    rows = np.frombuffer(buffer, dtype=row_dtype, count=nrows, offset=data_start)
+
+    result = {}
+    for name in names:
+        field = rows[name]
+        index = layout[name][2]
+        scale = header.get(f"TSCAL{index}", 1)
+        zero = header.get(f"TZERO{index}", 0)
+        if field.dtype.kind in "iufc" and (scale != 1 or zero != 0):
+            result[name] = field * scale + zero
+        else:
+            result[name] = field.astype(field.dtype.newbyteorder("="))
+
+    return result
+
+
+def read_coadd_spectrum(
+    content: bytes | bytearray | memoryview,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Read the wavelength, flux and inverse variance of an SDSS spectrum.
+
+    Parameters
+    ----------
+    content: bytes
+        The raw contents of the FITS file
+
+    Returns
+    ----------
+    wave, flux, ivar: numpy.ndarray
+        The wavelength (computed as ``10 ** loglam``), flux and inverse
+        variance arrays
+    """
+    data = read_coadd_columns(content, columns=("loglam", "flux", "ivar"))
+    loglam = data["loglam"]
+    wave = np.empty(loglam.shape, dtype=np.result_type(loglam.dtype, np.float32))
+    np.power(10, loglam, out=wave)
+    return wave, data["flux"], data["ivar"]
+
+
+def read_coadd_spectrum_astropy(
+    content: bytes | bytearray | memoryview,
+    name: str = "",
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Read the wavelength, flux and inverse variance of an SDSS spectrum by
+    opening the full file with astropy. This is slower than
+    `read_coadd_spectrum`, but handles any file astropy can read.
+    """
+    from astropy.io import fits
+    from contextlib import closing
+    from io import BytesIO
+
+    with closing(BytesIO(content)) as f:
+        f.name = name
+
+        with fits.open(f) as hdulist:
+            if COADD_EXTENSION not in hdulist:
+                raise KeyError(f"No extension named '{COADD_EXTENSION}' in file.")
+            data = hdulist[COADD_EXTENSION].data
+            return 10 ** data["loglam"], data["flux"], data["ivar"]
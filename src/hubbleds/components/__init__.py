@@ -1,24 +1,27 @@
-from .intro_slideshow.intro_slideshow import IntroSlideshow
-from .data_table.data_table import DataTable
-from .spectrum_viewer.spectrum_viewer import SpectrumViewer
-from .spectrum_slideshow.spectrum_slideshow import SpectrumSlideshow
-from .doppler_slideshow.doppler_slideshow import DopplerSlideshow
-from .stage_2_slideshow.stage_2_slideshow import Stage2Slideshow
-from .reflect_velocity_slideshow.reflect_velocity_slideshow import (
-    ReflectVelocitySlideshow,
-)
-from .angsize_dosdonts_slideshow.angsize_dosdonts_slideshow import (
-    AngsizeDosDontsSlideshow,
-)
-from .hubble_exp_universe_slideshow.hubble_exp_universe_slideshow import (
-    HubbleExpUniverseSlideshow,
-)
-from .dotplot_viewer.dotplot_viewer import DotplotViewer
-from .uncertainty_slideshow.uncertainty_slideshow import UncertaintySlideshow
-from .dotplot_viewer.dotplot_viewer import DotplotViewer
-from .selection_tool import SelectionTool
-from .dotplot_tutorial_slideshow import DotplotTutorialSlideshow
-from .id_slider import IdSlider
-from .line_draw_viewer import LineDrawViewer
-from .plotly_layer_toggle import PlotlyLayerToggle
-from .intro_slideshow_vue.intro_slideshow import IntroSlideshowVue
+from hubbleds.lazy import lazy_attributes
+
+# Each component is imported when it is first used, so that a page only
+#  imports the slideshows, viewers and tools that it renders
+_COMPONENTS = {
+    "IntroSlideshow": ".intro_slideshow.intro_slideshow",
+    "DataTable": ".data_table.data_table",
+    "SpectrumViewer": ".spectrum_viewer.spectrum_viewer",
+    "SpectrumSlideshow": ".spectrum_slideshow.spectrum_slideshow",
+    "DopplerSlideshow": ".doppler_slideshow.doppler_slideshow",
+    "Stage2Slideshow": ".stage_2_slideshow.stage_2_slideshow",
+    "ReflectVelocitySlideshow": ".reflect_velocity_slideshow.reflect_velocity_slideshow",
+    "AngsizeDosDontsSlideshow": ".angsize_dosdonts_slideshow.angsize_dosdonts_slideshow",
+    "HubbleExpUniverseSlideshow": ".hubble_exp_universe_slideshow.hubble_exp_universe_slideshow",
+    "DotplotViewer": ".dotplot_viewer.dotplot_viewer",
+    "UncertaintySlideshow": ".uncertainty_slideshow.uncertainty_slideshow",
+    "SelectionTool": ".selection_tool",
+    "DotplotTutorialSlideshow": ".dotplot_tutorial_slideshow",
+    "IdSlider": ".id_slider",
+    "LineDrawViewer": ".line_draw_viewer",
+    "PlotlyLayerToggle": ".plotly_layer_toggle",
+    "IntroSlideshowVue": ".intro_slideshow_vue.intro_slideshow",
+}
+
+__all__ = list(_COMPONENTS)
+
+__getattr__, __dir__ = lazy_attributes(__name__, _COMPONENTS)
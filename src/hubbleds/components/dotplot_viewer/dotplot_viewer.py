@@ -1,11 +1,11 @@
 from random import randint
-from cosmicds.viewers.dotplot.viewer import DotplotScatterLayerArtist
 
 import solara
 from glue.core import Data, Subset
 from reacton import ipyvuetify as rv
 
 from hubbleds.viewers.hubble_dotplot import HubbleDotPlotView, HubbleDotPlotViewer
+from hubbleds.workspace import close_viewer
 from cosmicds.viewers.dotplot.state import DotPlotViewerState
 
 from glue.viewers.common.viewer import Viewer
@@ -42,8 +42,6 @@ def this_or_default(arr, default, index):
     return arr[index]
 
 
-_original_update_data = DotplotScatterLayerArtist._update_data
-
 @solara.component
 def DotplotViewer(
     gjapp: JupyterApplication, 
@@ -174,17 +172,6 @@ def DotplotViewer(
             
             
             
-            for layer in dotplot_view.layers:
-                for trace in layer.traces():
-                    trace.update(hoverinfo="skip", hovertemplate=None)
-
-            def no_hover_update(self: DotplotScatterLayerArtist):
-                with dotplot_view.figure.batch_update():
-                    _original_update_data(self)
-                    for trace in self.traces():
-                        trace.update(hoverinfo="skip", hovertemplate=None)
-            DotplotScatterLayerArtist._update_data = no_hover_update
-                
             def get_layer(layer_name):
                 layer_artist = dotplot_view.layer_artist_for_data(layer_name) # type: ignore
                 if layer_artist is None:
@@ -383,9 +370,9 @@ def DotplotViewer(
                 for cnt in (title_widget, toolbar_widget, viewer_widget):
                     cnt.children = ()
 
-                for wgt in (dotplot_view.toolbar, dotplot_view.figure_widget):
-                    # wgt.layout.close()
-                    wgt.close()
+                # The viewer belongs to this component, so disconnect it from
+                #  the (shared) glue hub along with closing its widgets
+                close_viewer(dotplot_view)
 
             return cleanup
 
@@ -0,0 +1,89 @@
+import gzip
+import zlib
+from typing import Optional
+
+from urllib3.util.request import ACCEPT_ENCODING
+
+__all__ = [
+    "ENCODINGS",
+    "accept_encoding",
+    "choose_encoding",
+    "compress",
+    "decompress",
+]
+
+
+def _zstd():
+    # A zstd module to compress the stand-in API's responses with; responses
+    #  are only read in the encodings that urllib3 decodes (see
+    #  `accept_encoding`)
+    try:
+        from compression import zstd
+    except ImportError:
+        try:
+            from backports import zstd
+        except ImportError:
+            return None
+    return zstd
+
+
+_ZSTD = _zstd()
+
+# The content encodings that can be compressed and decompressed here, most
+#  preferred first
+ENCODINGS = (("zstd",) if _ZSTD is not None else ()) + ("gzip", "deflate")
+
+
+def accept_encoding() -> str:
+    """
+    The ``Accept-Encoding`` header for the encodings of responses that
+    urllib3 decodes, zstd first if it is one of them. Which modules urllib3
+    decodes zstd with depends on its version, so this is urllib3's own list.
+    """
+    encodings = [e.strip() for e in ACCEPT_ENCODING.split(",") if e.strip()]
+    encodings.sort(key=lambda e: e != "zstd")
+    return ", ".join(encodings)
+
+
+def choose_encoding(accept: Optional[str]) -> Optional[str]:
+    """
+    The encoding of a response to a request that accepts ``accept``: the
+    first of ours that it accepts, or None if it accepts none of them.
+    """
+    accepted = set()
+    for item in (accept or "").split(","):
+        name, _, params = item.partition(";")
+        _, _, quality = params.partition("q=")
+        try:
+            if quality and float(quality) == 0:
+                continue
+        except ValueError:
+            continue
+        accepted.add(name.strip().lower())
+    for encoding in ENCODINGS:
+        if encoding in accepted or "*" in accepted:
+            return encoding
+    return None
+
+
+def compress(data: bytes, encoding: str) -> bytes:
+    if encoding == "gzip":
+        return gzip.compress(data, compresslevel=6, mtime=0)
+    if encoding == "deflate":
+        return zlib.compress(data, 6)
+    if encoding == "zstd" and _ZSTD is not None:
+        return _ZSTD.compress(data)
+    raise ValueError(f"Unsupported content encoding `{encoding}`.")
+
+
+def decompress(data: bytes, encoding: Optional[str]) -> bytes:
+    encoding = (encoding or "identity").strip().lower()
+    if encoding == "identity":
+        return data
+    if encoding == "gzip":
+        return gzip.decompress(data)
+    if encoding == "deflate":
+        return zlib.decompress(data)
+    if encoding == "zstd" and _ZSTD is not None:
+        return _ZSTD.decompress(data)
+    raise ValueError(f"Unsupported content encoding `{encoding}`.")
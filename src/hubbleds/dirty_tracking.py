@@ -0,0 +1,102 @@
+from typing import Any, Dict, Iterable, Mapping, Optional, Set
+
+import solara
+from pydantic import BaseModel
+from pydantic_core import to_json
+from solara import Reactive
+
+__all__ = [
+    "EXAMPLE_MEASUREMENTS",
+    "MEASUREMENTS",
+    "STAGE_STATE",
+    "STORY_STATE",
+    "DirtyTracker",
+    "use_dirty_tracker",
+]
+
+# The parts of a student's data that are written to the database separately
+STORY_STATE = "story_state"
+MEASUREMENTS = "measurements"
+EXAMPLE_MEASUREMENTS = "example_measurements"
+STAGE_STATE = "stage_state"
+
+_NOT_FLUSHED = object()
+
+
+def _fingerprint(value: Any) -> Any:
+    # Lists of models, such as the measurements, change by replacing their
+    #  items, so their items are compared by identity. Anything else is
+    #  compared by its JSON, which also sees models and dicts that were
+    #  changed in place.
+    if isinstance(value, list) and value and isinstance(value[0], BaseModel):
+        return tuple(value)
+    return to_json(value, fallback=str)
+
+
+def _same(fingerprint: Any, other: Any) -> bool:
+    if isinstance(fingerprint, tuple) and isinstance(other, tuple):
+        return len(fingerprint) == len(other) and all(a is b for a, b in zip(fingerprint, other))
+    return fingerprint == other
+
+
+class DirtyTracker:
+    """
+    Finds which top-level fields of a state, and which categories of
+    persisted data, changed since the state was last flushed to the
+    database.
+
+    The category of each field comes from ``categories``, falling back to
+    ``default``. Fields whose category is None, like the fields that are
+    only used by the UI or that are never written back, are ignored.
+    """
+
+    def __init__(self, categories: Mapping[str, Optional[str]], default: Optional[str]):
+        self.categories = dict(categories)
+        self.default = default
+        self._flushed: Dict[str, Any] = {}
+
+    @classmethod
+    def for_state(cls, state: BaseModel) -> "DirtyTracker":
+        """
+        A tracker for a state whose class defines its ``FIELD_CATEGORIES``
+        and ``DEFAULT_CATEGORY``, such as `LocalState` and the stages'
+        component states.
+        """
+        return cls(
+            getattr(type(state), "FIELD_CATEGORIES", {}),
+            getattr(type(state), "DEFAULT_CATEGORY", STORY_STATE),
+        )
+
+    def category(self, field: str) -> Optional[str]:
+        return self.categories.get(field, self.default)
+
+    def _tracked(self, state: BaseModel, categories: Optional[Iterable[str]] = None):
+        categories = None if categories is None else set(categories)
+        for field in type(state).model_fields:
+            category = self.category(field)
+            if category is not None and (categories is None or category in categories):
+                yield field
+
+    def dirty_fields(self, state: BaseModel) -> Set[str]:
+        """The tracked fields of ``state`` that changed since they were flushed."""
+        return {
+            field for field in self._tracked(state)
+            if not _same(_fingerprint(getattr(state, field)), self._flushed.get(field, _NOT_FLUSHED))
+        }
+
+    def dirty(self, state: BaseModel) -> Set[str]:
+        """The categories of ``state`` that changed since they were flushed."""
+        return {self.category(field) for field in self.dirty_fields(state)}
+
+    def flushed(self, state: BaseModel, categories: Optional[Iterable[str]] = None):
+        """
+        Record the fields of ``state`` (of ``categories`` only, if given) as
+        written to the database, or as loaded from it.
+        """
+        for field in self._tracked(state, categories):
+            self._flushed[field] = _fingerprint(getattr(state, field))
+
+
+def use_dirty_tracker(state: Reactive[BaseModel]) -> DirtyTracker:
+    """A `DirtyTracker` for ``state`` that lasts as long as the component."""
+    return solara.use_memo(lambda: DirtyTracker.for_state(state.peek()), dependencies=[])
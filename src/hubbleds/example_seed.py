@@ -0,0 +1,184 @@
+import argparse
+import json
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from numpy.random import Generator, PCG64, SeedSequence
+
+from hubbleds.data_management import DB_VELOCITY_FIELD
+
+__all__ = [
+    "EXAMPLE_SEED_ARTIFACT",
+    "EXAMPLE_SEED_PREFIX",
+    "EXAMPLE_SEED_VERSION",
+    "example_seed_artifact",
+    "example_seed_indices",
+    "load_example_seed_artifact",
+    "select_example_seed",
+    "verify_example_seed_artifact",
+]
+
+# The seed data shown alongside a student's example galaxy measurements is a
+#  fixed, "random" selection of sample measurements. Only a bounded prefix of
+#  the sample measurements can ever be selected, so the selection can be
+#  materialized once as a versioned artifact, rather than recomputed from
+#  every sample measurement ever submitted.
+
+# Bump this whenever the selection below changes, so that artifacts written
+#  by the previous selection are no longer used
+EXAMPLE_SEED_VERSION = 1
+EXAMPLE_SEED = 42
+EXAMPLE_SEED_CANDIDATES = 85
+EXAMPLE_SEED_SIZE = 40
+
+# The candidates are the second measurements (odd indices) of the first 85
+#  galaxies, and each is selected along with the record that follows it
+EXAMPLE_SEED_PREFIX = 2 * EXAMPLE_SEED_CANDIDATES + 1
+
+EXAMPLE_SEED_ARTIFACT = Path(__file__).parent / "data" / "example_seed_measurements.json"
+
+
+def example_seed_indices(velocities: List[Optional[float]]) -> np.ndarray:
+    """
+    The indices of the sample measurements selected as seed data, given the
+    velocities of the sample measurements. Only the first
+    `EXAMPLE_SEED_PREFIX` velocities affect the selection.
+
+    Returns
+    ----------
+    indices: numpy.ndarray
+        The selected indices, in selection order, with each candidate
+        followed by the index after it
+    """
+    velocities = velocities[:EXAMPLE_SEED_PREFIX]
+    good = np.array([(vel is not None and vel > 0) for vel in velocities], dtype=bool)
+    gen = Generator(PCG64(SeedSequence(EXAMPLE_SEED)))
+    indices = np.arange(good.size)
+    # We need to keep the first 85 so that it always selects the same
+    #  galaxies "randomly"
+    indices = indices[1::2][:EXAMPLE_SEED_CANDIDATES]
+    random_subset = gen.choice(
+        indices[good[1::2][:EXAMPLE_SEED_CANDIDATES]], size=EXAMPLE_SEED_SIZE, replace=False
+    )
+    return np.ravel(np.column_stack((random_subset, random_subset + 1)))
+
+
+def select_example_seed(
+    records: List[Dict[str, Any]]
+) -> Tuple[np.ndarray, List[Dict[str, Any]]]:
+    """The selected indices and seed measurements from the sample measurements."""
+    indices = example_seed_indices([record[DB_VELOCITY_FIELD] for record in records])
+    return indices, [records[i] for i in indices]
+
+
+def example_seed_artifact(story_id: str, records: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    The artifact for the seed measurements of a story. Along with the
+    selected measurements, it records the velocities that the selection was
+    made from, so that the selection can be verified without the API.
+    """
+    indices, measurements = select_example_seed(records)
+    return {
+        "version": EXAMPLE_SEED_VERSION,
+        "story_id": story_id,
+        "velocities": [record[DB_VELOCITY_FIELD] for record in records[:EXAMPLE_SEED_PREFIX]],
+        "indices": indices.tolist(),
+        "measurements": measurements,
+    }
+
+
+def verify_example_seed_artifact(
+    artifact: Dict[str, Any],
+    records: Optional[List[Dict[str, Any]]] = None,
+) -> List[str]:
+    """
+    Check an artifact against the current selection algorithm and, if
+    ``records`` are given, against the current sample measurements.
+
+    Returns
+    ----------
+    problems: list
+        A description of each mismatch; empty if the artifact is valid
+    """
+    problems = []
+    if artifact.get("version") != EXAMPLE_SEED_VERSION:
+        problems.append(
+            f"Artifact version {artifact.get('version')} is not {EXAMPLE_SEED_VERSION}."
+        )
+
+    indices = example_seed_indices(artifact["velocities"]).tolist()
+    if indices != artifact["indices"]:
+        problems.append("Artifact indices don't match the selection algorithm.")
+    if len(artifact["measurements"]) != len(artifact["indices"]):
+        problems.append("Artifact has a different number of measurements and indices.")
+
+    if records is not None:
+        live = example_seed_artifact(artifact["story_id"], records)
+        if live["indices"] != artifact["indices"]:
+            problems.append("Artifact indices don't match the current sample measurements.")
+        elif live["measurements"] != artifact["measurements"]:
+            problems.append("Artifact measurements don't match the current sample measurements.")
+
+    return problems
+
+
+def load_example_seed_artifact(
+    story_id: str,
+    path: Path = EXAMPLE_SEED_ARTIFACT,
+) -> Optional[List[Dict[str, Any]]]:
+    """
+    The seed measurements from the artifact at ``path``, or None if there is
+    no artifact for ``story_id`` or it doesn't match the current selection.
+    """
+    try:
+        with open(path) as f:
+            artifact = json.load(f)
+    except FileNotFoundError:
+        return None
+
+    if artifact.get("story_id") != story_id or verify_example_seed_artifact(artifact):
+        return None
+    return artifact["measurements"]
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m hubbleds.example_seed",
+        description="Write the example seed artifact from the API, or verify "
+                    "that its indices match the current selection algorithm.",
+    )
+    parser.add_argument("command", choices=["generate", "verify"])
+    parser.add_argument("--story-id", default="hubbles_law")
+    parser.add_argument("--path", type=Path, default=EXAMPLE_SEED_ARTIFACT)
+    parser.add_argument(
+        "--live", action="store_true",
+        help="Also verify against the sample measurements from the API",
+    )
+    args = parser.parse_args(argv)
+
+    records = None
+    if args.command == "generate" or args.live:
+        # The API module uses this module, so import it only when needed
+        from hubbleds.remote import LOCAL_API
+        records = LOCAL_API.get_sample_measurements_json(args.story_id)
+
+    if args.command == "generate":
+        artifact = example_seed_artifact(args.story_id, records)
+        with open(args.path, "w") as f:
+            json.dump(artifact, f, indent=1)
+        print(f"Wrote {len(artifact['measurements'])} seed measurements to {args.path}.")
+        return 0
+
+    with open(args.path) as f:
+        artifact = json.load(f)
+    problems = verify_example_seed_artifact(artifact, records)
+    for problem in problems:
+        print(problem)
+    if not problems:
+        print(f"{args.path} matches the selection algorithm: {artifact['indices']}")
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,222 @@
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Set
+
+from cosmicds.logger import setup_logger
+
+logger = setup_logger("FREE_RESPONSE_BUFFER")
+
+__all__ = [
+    "FREE_RESPONSE_BUFFER",
+    "FreeResponseBuffer",
+    "flush_free_responses",
+]
+
+# A student's answer is written once they stop typing for this many
+#  seconds, and at least this often while they keep typing
+IDLE_SECONDS = 2.0
+MAX_INTERVAL_SECONDS = 15.0
+
+NO_SESSION = "(no session)"
+
+
+def _current_context():
+    from solara.server import kernel_context
+
+    try:
+        return kernel_context.get_current_context()
+    except RuntimeError:
+        return None
+
+
+class _PendingWrite:
+    __slots__ = ("tags", "persist", "context", "first", "last")
+
+    def __init__(self, persist: Callable[[], Optional[bool]], context, now: float):
+        self.tags: Set[str] = set()
+        self.persist = persist
+        self.context = context
+        self.first = now
+        self.last = now
+
+
+class FreeResponseBuffer:
+    """
+    Defers the database writes of free responses while a student types.
+
+    `fr_callback` applies every keystroke to the local state at once, but
+    writing the story state on each of them sends the whole state to the
+    database many times per answer. The buffer keeps, per session, the tags
+    whose answers changed and the latest write callback, and calls it once
+    the answers have been idle for ``idle`` seconds, once ``max_interval``
+    seconds have passed since the first unwritten change, or when the
+    session is flushed, e.g. when a free response loses focus or before the
+    stage changes.
+
+    Each write callback writes the whole story state, so the answers of all
+    of a session's pending tags are written by a single call. Writes that
+    are due are made by a daemon thread, inside the kernel context of the
+    session that made the change. Whatever else writes the story state of
+    a session can `watch` for these writes, so as not to repeat them.
+    """
+
+    def __init__(
+        self,
+        idle: float = IDLE_SECONDS,
+        max_interval: float = MAX_INTERVAL_SECONDS,
+        clock: Callable[[], float] = time.monotonic,
+        background: bool = True,
+    ):
+        self.idle = idle
+        self.max_interval = max_interval
+        self.clock = clock
+        self.background = background
+        self.writes = 0
+        self._pending: Dict[str, _PendingWrite] = {}
+        self._watchers: Dict[str, List[Callable[[], None]]] = {}
+        self._condition = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+
+    def _deadline(self, pending: _PendingWrite) -> float:
+        return min(pending.last + self.idle, pending.first + self.max_interval)
+
+    def update(self, tag: str, persist: Callable[[], Optional[bool]]):
+        """
+        Record that the answer of ``tag`` changed in the local state of the
+        current session, to be written later by ``persist``, which returns
+        False if it didn't write it.
+        """
+        context = _current_context()
+        session = context.id if context is not None else NO_SESSION
+        now = self.clock()
+        with self._condition:
+            pending = self._pending.get(session)
+            if pending is None:
+                pending = self._pending[session] = _PendingWrite(persist, context, now)
+            pending.tags.add(tag)
+            pending.persist = persist
+            pending.last = now
+            due = now >= pending.first + self.max_interval
+            if not due and self.background:
+                self._start()
+                self._condition.notify()
+        if due:
+            self.flush(session)
+
+    def pending(self, session: Optional[str] = None) -> Set[str]:
+        """The tags of ``session`` (by default, the current one) not yet written."""
+        session = session or self._session()
+        with self._condition:
+            pending = self._pending.get(session)
+            return set(pending.tags) if pending is not None else set()
+
+    def _session(self) -> str:
+        context = _current_context()
+        return context.id if context is not None else NO_SESSION
+
+    def watch(self, on_write: Callable[[], None]) -> Callable[[], None]:
+        """
+        Call ``on_write`` each time the answers of the current session are
+        written, in the session's kernel context.
+
+        Returns
+        ----------
+        unwatch: Callable
+            Stops calling ``on_write``, e.g. as the cleanup of a
+            `solara.use_effect`
+        """
+        session = self._session()
+        with self._condition:
+            self._watchers.setdefault(session, []).append(on_write)
+
+        def unwatch():
+            with self._condition:
+                watchers = self._watchers.get(session, [])
+                if on_write in watchers:
+                    watchers.remove(on_write)
+                if not watchers:
+                    self._watchers.pop(session, None)
+
+        return unwatch
+
+    def _written(self, session: str):
+        with self._condition:
+            watchers = list(self._watchers.get(session, []))
+        for on_write in watchers:
+            on_write()
+
+    def flush(self, session: Optional[str] = None) -> bool:
+        """
+        Write the pending answers of ``session`` (by default, the current
+        one) now.
+
+        Returns
+        ----------
+        written: bool
+            Whether there was anything to write
+        """
+        session = session or self._session()
+        with self._condition:
+            pending = self._pending.pop(session, None)
+        if pending is None:
+            return False
+
+        logger.debug("Writing free responses %s of session `%s`.", sorted(pending.tags), session)
+        try:
+            if pending.context is not None and pending.context is not _current_context():
+                with pending.context:
+                    if pending.persist() is not False:
+                        self._written(session)
+            elif pending.persist() is not False:
+                self._written(session)
+        except Exception:
+            logger.exception("Could not write the free responses of session `%s`.", session)
+        self.writes += 1
+        return True
+
+    def flush_due(self) -> int:
+        """Write the pending answers of every session whose write is due."""
+        now = self.clock()
+        with self._condition:
+            due = [s for s, p in self._pending.items() if self._deadline(p) <= now]
+        return sum(self.flush(session) for session in due)
+
+    def flush_all(self) -> int:
+        with self._condition:
+            sessions = list(self._pending)
+        return sum(self.flush(session) for session in sessions)
+
+    def _start(self):
+        # Called with the condition held
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="free-response-writes", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                if self._pending:
+                    deadline = min(self._deadline(p) for p in self._pending.values())
+                    self._condition.wait(max(deadline - self.clock(), 0.0))
+                else:
+                    self._condition.wait()
+            try:
+                self.flush_due()
+            except Exception:
+                logger.exception("Could not write the pending free responses.")
+
+    def flush_on_close(self) -> Callable[[], None]:
+        """
+        To be registered with `solara.lab.on_kernel_start`: writes the pending
+        answers of each session when its kernel closes.
+        """
+        session = self._session()
+        return lambda: self.flush(session)
+
+
+FREE_RESPONSE_BUFFER = FreeResponseBuffer()
+
+
+def flush_free_responses() -> bool:
+    """Write the current session's pending free responses, e.g. before a stage change."""
+    return FREE_RESPONSE_BUFFER.flush()
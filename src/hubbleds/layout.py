@@ -5,10 +5,34 @@ import solara
 from solara.toestand import Ref
 from cosmicds.components import MathJaxSupport, PlotlySupport, GoogleAnalyticsSupport
 from hubbleds.remote import LOCAL_API
+from hubbleds.free_response_buffer import FREE_RESPONSE_BUFFER, flush_free_responses
+from hubbleds.dirty_tracking import EXAMPLE_MEASUREMENTS, MEASUREMENTS, STORY_STATE, use_dirty_tracker
+from hubbleds.workspace import get_workspace, reachable_stages
+from hubbleds.memory import MEMORY_LOG_ENV, start_memory_logging
+from hubbleds.render_profile import RENDER_PROFILE_ENV, RENDER_PROFILER
+from hubbleds.templates import TEMPLATES
 from cosmicds.logger import setup_logger
 
 logger = setup_logger("LAYOUT")
 
+if getenv(MEMORY_LOG_ENV):
+    start_memory_logging(float(getenv(MEMORY_LOG_ENV)))
+
+if getenv(RENDER_PROFILE_ENV):
+    RENDER_PROFILER.install()
+    solara.lab.on_kernel_start(RENDER_PROFILER.log_on_close)
+
+# Start sending the journaled writes of this worker now, rather than on the
+#  first write, so that those left over from before a restart aren't held
+LOCAL_API.start_write_journal()
+
+# Write the free responses that a student was typing when they left
+solara.lab.on_kernel_start(FREE_RESPONSE_BUFFER.flush_on_close)
+
+# Read the guideline and component templates once per process; this fails
+#  on startup if a stage refers to a template that doesn't exist
+TEMPLATES.install()
+
 
 @solara.component
 def Layout(children=[]):
@@ -20,12 +44,37 @@ def Layout(children=[]):
 
     student_id = Ref(GLOBAL_STATE.fields.student.id)
     loaded_states = solara.use_reactive(False)
+    global_changes = use_dirty_tracker(GLOBAL_STATE)
+    local_changes = use_dirty_tracker(LOCAL_STATE)
 
     router = solara.use_router()
+    # Write the answers of the previous stage before showing the next one
+    def _flush_free_responses():
+        flush_free_responses()
+
+    solara.use_effect(_flush_free_responses, dependencies=[router.path])
+
+    # The free response buffer writes the story state while a student
+    #  types, so what it wrote doesn't need to be written again here
+    def _watch_free_responses():
+        def _written():
+            global_changes.flushed(GLOBAL_STATE.value)
+            local_changes.flushed(LOCAL_STATE.value, [STORY_STATE])
+
+        return FREE_RESPONSE_BUFFER.watch(_written)
+
+    solara.use_effect(_watch_free_responses, dependencies=[])
     Ref(LOCAL_STATE.fields.last_route).set(router.path)
     route_index = next((i for i, r in enumerate(router.routes) if r.path == router.path.strip('/')), None)
     Ref(LOCAL_STATE.fields.max_route_index).set(max(route_index or 0, LOCAL_STATE.value.max_route_index or 0))
 
+    # Close the viewers of stages that can't be reached from here in a
+    #  single step; they are created again if the student goes back
+    def _retain_reachable_stages():
+        get_workspace(GLOBAL_STATE).retain(reachable_stages(router.routes, route_index))
+
+    solara.use_effect(_retain_reachable_stages, dependencies=[route_index])
+
     async def _load_global_local_states():
         if not GLOBAL_STATE.value.student.id:
             logger.warning("Failed to load measurements: no student was found.")
@@ -46,6 +95,10 @@ def Layout(children=[]):
             GLOBAL_STATE, LOCAL_STATE
         )
 
+        # What was just loaded doesn't need to be written back
+        global_changes.flushed(GLOBAL_STATE.value)
+        local_changes.flushed(LOCAL_STATE.value)
+
         logger.info("Finished loading state.")
         if LOCAL_STATE.value.last_route is not None:
             router.push(LOCAL_STATE.value.last_route)
@@ -61,18 +114,40 @@ def Layout(children=[]):
         if not loaded_states.value:
             return
 
-        # Listen for changes in the states and write them to the database
-        put_state = LOCAL_API.put_story_state(GLOBAL_STATE, LOCAL_STATE)
+        # Listen for changes in the states and write the parts that changed
+        #  to the database
+        global_state = GLOBAL_STATE.value
+        local_state = LOCAL_STATE.value
+        dirty = global_changes.dirty(global_state) | local_changes.dirty(local_state)
+        if STORY_STATE in dirty and FREE_RESPONSE_BUFFER.pending():
+            # The buffer writes the whole story state once the student
+            #  stops typing
+            dirty.discard(STORY_STATE)
+        if not dirty:
+            return
+
+        written = []
+        if STORY_STATE in dirty:
+            if LOCAL_API.put_story_state(GLOBAL_STATE, LOCAL_STATE):
+                global_changes.flushed(global_state)
+                local_changes.flushed(local_state, [STORY_STATE])
+                written.append("story state")
 
         # Be sure to write the measurement data separately since it's stored
         #  in another location in the database
-        put_meas = LOCAL_API.put_measurements(GLOBAL_STATE, LOCAL_STATE)
-        put_samp = LOCAL_API.put_sample_measurements(GLOBAL_STATE, LOCAL_STATE)
-        
-        if put_state and put_meas and put_samp:
-            logger.info("Wrote state to database.")
+        if MEASUREMENTS in dirty:
+            if LOCAL_API.put_measurements(GLOBAL_STATE, LOCAL_STATE):
+                local_changes.flushed(local_state, [MEASUREMENTS])
+                written.append("measurements")
+        if EXAMPLE_MEASUREMENTS in dirty:
+            if LOCAL_API.put_sample_measurements(GLOBAL_STATE, LOCAL_STATE):
+                local_changes.flushed(local_state, [EXAMPLE_MEASUREMENTS])
+                written.append("sample measurements")
+
+        if len(written) == len(dirty):
+            logger.info("Wrote %s to database.", ", ".join(written))
         else:
-            logger.info(f"Did not write {'story state' if not put_state else ''} {'measurements' if not put_meas else ''} {'sample measurements' if not put_samp else ''} to database.")
+            logger.info("Did not write all of %s to database.", ", ".join(sorted(dirty)))
 
     solara.lab.use_task(
         _write_local_global_states, dependencies=[GLOBAL_STATE.value, LOCAL_STATE.value]
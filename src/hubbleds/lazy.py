@@ -0,0 +1,43 @@
+import sys
+from importlib import import_module
+from typing import Callable, Dict, List, Tuple
+
+__all__ = ["lazy_attributes"]
+
+
+def lazy_attributes(
+    package: str,
+    attributes: Dict[str, str],
+) -> Tuple[Callable[[str], object], Callable[[], List[str]]]:
+    """
+    The module ``__getattr__`` and ``__dir__`` of a package whose attributes
+    are imported from its submodules when they are first used (PEP 562),
+    rather than when the package is imported.
+
+    Parameters
+    ----------
+    package: str
+        The name of the package, i.e. its ``__name__``
+    attributes: dict
+        The relative name of the submodule that defines each attribute
+
+    Returns
+    ----------
+    getattr, dir: tuple
+        The functions to assign to the package's ``__getattr__`` and
+        ``__dir__``
+    """
+
+    def __getattr__(name: str):
+        module = attributes.get(name)
+        if module is None:
+            raise AttributeError(f"module {package!r} has no attribute {name!r}")
+        value = getattr(import_module(module, package), name)
+        # Later lookups find the attribute without calling this again
+        setattr(sys.modules[package], name, value)
+        return value
+
+    def __dir__() -> List[str]:
+        return sorted(set(vars(sys.modules[package])) | set(attributes))
+
+    return __getattr__, __dir__
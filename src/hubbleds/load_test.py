@@ -0,0 +1,349 @@
+import argparse
+import importlib
+import os
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+import numpy as np
+import solara
+from solara.server import kernel
+# Reactive variables are only kept per kernel context when solara is running
+#  as a server, so that each simulated session has its own state
+import solara.server.starlette  # noqa: F401
+from solara.server.kernel_context import VirtualKernelContext
+from solara.toestand import Ref
+
+from cosmicds.logger import setup_logger
+from cosmicds.state import GLOBAL_STATE
+from hubbleds.base_component_state import transition_next
+from hubbleds.remote import LOCAL_API
+from hubbleds.stand_in_api import FaultConfig, StandInAPI, StandInStore
+from hubbleds.state import LOCAL_STATE, StudentMeasurement, fr_callback, mc_callback
+from hubbleds.utils import distance_from_angular_size, velocity_from_wavelengths
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+logger = setup_logger("LOAD_TEST")
+
+__all__ = [
+    "STAGES",
+    "LoadReport",
+    "SessionReport",
+    "run_load_test",
+    "run_session",
+]
+
+STAGES = [
+    "01-spectra-&-velocity",
+    "02-distance-introduction",
+    "03-distance-measurements",
+    "04-explore-data",
+    "05-class-results-uncertainty",
+    "06-prodata",
+]
+
+LATENCY_PERCENTILES = (50, 90, 99)
+
+# A multiple choice and a free response question are answered every this
+#  many steps
+QUESTION_INTERVAL = 4
+
+
+class SessionReport(NamedTuple):
+    session: int
+    student_id: int
+    latencies: Dict[str, List[float]]
+    errors: List[str]
+
+
+class LoadReport(NamedTuple):
+    sessions: List[SessionReport]
+    wall_time: float
+    cpu_time: float
+    rss_start: int
+    rss_end: int
+    request_counts: Dict[str, int]
+
+    def latency_percentiles(self) -> Dict[str, Dict[int, float]]:
+        """Percentiles of the latency (in seconds) of each kind of action."""
+        latencies = defaultdict(list)
+        for session in self.sessions:
+            for action, values in session.latencies.items():
+                latencies[action].extend(values)
+        return {
+            action: dict(zip(LATENCY_PERCENTILES, np.percentile(values, LATENCY_PERCENTILES)))
+            for action, values in sorted(latencies.items())
+        }
+
+    def session_percentiles(self) -> Dict[int, Dict[int, float]]:
+        """Percentiles of the latency of every action, for each session."""
+        return {
+            session.session: dict(zip(
+                LATENCY_PERCENTILES,
+                np.percentile(sum(session.latencies.values(), []) or [0], LATENCY_PERCENTILES),
+            ))
+            for session in self.sessions
+        }
+
+    def format(self) -> str:
+        lines = [
+            f"{len(self.sessions)} sessions in {self.wall_time:.1f} s, "
+            f"{self.cpu_time:.1f} s CPU "
+            f"({100 * self.cpu_time / max(self.wall_time, 1e-9):.0f}%)",
+            f"RSS: {self.rss_start / 2**20:.0f} MiB -> {self.rss_end / 2**20:.0f} MiB "
+            f"(+{(self.rss_end - self.rss_start) / 2**20:.0f} MiB)",
+            "",
+            "Latency (ms)      " + "".join(f"{'p' + str(p):>10}" for p in LATENCY_PERCENTILES),
+        ]
+        for action, percentiles in self.latency_percentiles().items():
+            lines.append(f"{action:<18}" + "".join(f"{1000 * v:>10.1f}" for v in percentiles.values()))
+
+        per_session = np.array([list(p.values()) for p in self.session_percentiles().values()])
+        if per_session.size:
+            lines.append(
+                f"{'session p50 range':<18}"
+                f"{1000 * per_session[:, 0].min():>10.1f}{1000 * per_session[:, 0].max():>10.1f}"
+            )
+
+        lines += ["", "API requests"]
+        for endpoint, count in sorted(self.request_counts.items(), key=lambda x: -x[1]):
+            lines.append(f"{endpoint:<28}{count:>8}")
+
+        errors = sum(len(s.errors) for s in self.sessions)
+        if errors:
+            lines += ["", f"{errors} errors, e.g. {next(e for s in self.sessions for e in s.errors)}"]
+        return "\n".join(lines)
+
+
+def _rss() -> int:
+    if psutil is not None:
+        return psutil.Process().memory_info().rss
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+# Representative student interactions. Each changes the story state the same
+#  way as the page callback that it stands in for.
+
+def select_galaxies(session: "_Session"):
+    galaxies = LOCAL_API.get_galaxies(LOCAL_STATE)
+    need = 5 - len(LOCAL_STATE.value.measurements)
+    chosen = session.rng.choice(len(galaxies), size=max(need, 0), replace=False)
+    measurements = Ref(LOCAL_STATE.fields.measurements)
+    for index in chosen:
+        measurements.set(measurements.value + [
+            StudentMeasurement(student_id=session.student_id, galaxy=galaxies[index])
+        ])
+
+
+def measure_wavelengths(session: "_Session"):
+    measurements = Ref(LOCAL_STATE.fields.measurements)
+    for i, measurement in enumerate(measurements.value):
+        if measurement.galaxy is None:
+            continue
+        LOCAL_API.load_spectrum_data(measurement.galaxy, LOCAL_STATE)
+        obs_wave = round(measurement.galaxy.redshift_rest_wave_value + session.rng.normal(0, 3))
+        updated = measurement.model_copy(update={
+            "obs_wave_value": obs_wave,
+            "velocity_value": velocity_from_wavelengths(obs_wave, measurement.rest_wave_value),
+        })
+        measurements.set(measurements.value[:i] + [updated] + measurements.value[i + 1:])
+
+
+def measure_angular_sizes(session: "_Session"):
+    measurements = Ref(LOCAL_STATE.fields.measurements)
+    for i, measurement in enumerate(measurements.value):
+        ang_size = float(max(round(session.rng.normal(50, 15)), 5))
+        updated = measurement.model_copy(update={
+            "ang_size_value": ang_size,
+            "est_dist_value": distance_from_angular_size(ang_size),
+        })
+        measurements.set(measurements.value[:i] + [updated] + measurements.value[i + 1:])
+
+
+def answer_questions(session: "_Session", tag: str):
+    mc_callback(("mc-initialize-response", tag), LOCAL_STATE)
+    mc_callback(("mc-score", {"tag": tag, "score": 10, "choice": 0, "tries": 1,
+                              "wrong_attempts": 0}), LOCAL_STATE)
+    fr_callback(("fr-initialize", {"tag": tag}), LOCAL_STATE)
+    fr_callback(("fr-update", {"tag": tag, "response": "A response."}), LOCAL_STATE)
+
+
+# The interactions done when a session reaches a marker of a stage
+INTERACTIONS: Dict[str, Dict[str, List[Callable]]] = {
+    "01-spectra-&-velocity": {
+        "sel_gal2": [select_galaxies],
+        "obs_wav1": [measure_wavelengths],
+    },
+    "03-distance-measurements": {
+        "ang_siz2": [measure_angular_sizes],
+    },
+}
+
+
+class _Session:
+
+    def __init__(self, index: int, student_id: int, class_id: int, seed: int):
+        self.index = index
+        self.student_id = student_id
+        self.class_id = class_id
+        self.rng = np.random.default_rng(seed + index)
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: List[str] = []
+
+    def timed(self, action: str, func: Callable, *args):
+        start = time.perf_counter()
+        try:
+            return func(*args)
+        except Exception as e:
+            self.errors.append(f"{action}: {type(e).__name__}: {e}")
+            logger.exception("Session %d failed to %s.", self.index, action)
+        finally:
+            self.latencies[action].append(time.perf_counter() - start)
+
+    def run_stage(self, stage: str):
+        page = importlib.import_module(f"hubbleds.pages.{stage}")
+        component_state = importlib.import_module(
+            f"hubbleds.pages.{stage}.component_state"
+        ).COMPONENT_STATE
+
+        rendered = self.timed("mount", lambda: solara.render(page.Page(), handle_error=False))
+        interactions = INTERACTIONS.get(stage, {})
+        step = 0
+        while True:
+            marker = component_state.value.current_step
+            for interaction in interactions.get(marker.name, []):
+                self.timed(interaction.__name__, interaction, self)
+            if step % QUESTION_INTERVAL == 0:
+                self.timed("questions", answer_questions, self, f"load-{stage}-{marker.name}")
+            if marker is marker.last():
+                break
+            self.timed("transition", transition_next, component_state, True)
+            if component_state.value.current_step is marker:
+                self.errors.append(f"transition: stuck at {stage} {marker.name}")
+                break
+            step += 1
+
+        if rendered is not None:
+            rendered[1].close()
+
+    def run(self, stages: List[str]) -> SessionReport:
+        context = VirtualKernelContext(
+            id=f"load-test-{self.index}",
+            session_id=f"load-test-session-{self.index}",
+            kernel=kernel.Kernel(),
+        )
+        with context:
+            Ref(GLOBAL_STATE.fields.student.id).set(self.student_id)
+            Ref(GLOBAL_STATE.fields.classroom.class_info).set({"id": self.class_id})
+            for stage in stages:
+                self.run_stage(stage)
+        context.close()
+        return SessionReport(self.index, self.student_id, dict(self.latencies), self.errors)
+
+
+def run_session(
+    index: int,
+    student_id: int,
+    class_id: int,
+    stages: List[str] = STAGES,
+    seed: int = 0,
+) -> SessionReport:
+    """
+    Walk a single simulated student through ``stages`` in their own kernel
+    context, timing each page mount, step transition and interaction.
+    """
+    return _Session(index, student_id, class_id, seed).run(stages)
+
+
+def run_load_test(
+    n_sessions: int = 30,
+    concurrency: Optional[int] = None,
+    stages: List[str] = STAGES,
+    size: str = "school",
+    faults: FaultConfig = FaultConfig(),
+    seed: int = 0,
+    spectra_root: Optional[Path] = None,
+) -> LoadReport:
+    """
+    Run ``n_sessions`` simulated students (``concurrency`` at a time,
+    defaulting to all of them) through the story, against a stand-in API
+    seeded with synthetic data of the given size, which serves the spectra
+    in ``spectra_root``.
+
+    Returns
+    ----------
+    report: LoadReport
+        The latencies of each session, the CPU time and RSS growth of this
+        process, and the number of API requests to each endpoint
+    """
+    store = StandInStore.synthetic(size, seed=seed)
+    students = [(s, c) for c, ids in store.classes.items() for s in ids]
+
+    with StandInAPI(store, faults=faults, seed=seed, spectra_root=spectra_root) as server:
+        api_url = LOCAL_API.API_URL
+        LOCAL_API.API_URL = server.url
+        rss_start = _rss()
+        cpu_start = time.process_time()
+        wall_start = time.perf_counter()
+        try:
+            with ThreadPoolExecutor(max_workers=concurrency or n_sessions) as executor:
+                futures = [
+                    executor.submit(run_session, i, *students[i % len(students)], stages, seed)
+                    for i in range(n_sessions)
+                ]
+                sessions = [future.result() for future in futures]
+        finally:
+            LOCAL_API.API_URL = api_url
+
+        return LoadReport(
+            sessions=sessions,
+            wall_time=time.perf_counter() - wall_start,
+            cpu_time=time.process_time() - cpu_start,
+            rss_start=rss_start,
+            rss_end=_rss(),
+            request_counts=dict(server.request_counts),
+        )
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m hubbleds.load_test",
+        description="Walk simulated students through the story against a stand-in API.",
+    )
+    parser.add_argument("--sessions", type=int, default=30)
+    parser.add_argument("--concurrency", type=int)
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=STAGES)
+    parser.add_argument("--size", default="school")
+    parser.add_argument("--latency", type=float, default=0)
+    parser.add_argument("--jitter", type=float, default=0)
+    parser.add_argument("--error-rate", type=float, default=0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--spectra", type=Path, help="Directory of FITS spectra to serve, e.g. tests/data")
+    args = parser.parse_args(argv)
+
+    report = run_load_test(
+        n_sessions=args.sessions,
+        concurrency=args.concurrency,
+        stages=args.stages,
+        size=args.size,
+        faults=FaultConfig(args.latency, args.jitter, args.error_rate),
+        seed=args.seed,
+        spectra_root=args.spectra,
+    )
+    print(report.format())
+    return 1 if any(s.errors for s in report.sessions) else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,313 @@
+import sys
+import threading
+import time
+from types import FunctionType, ModuleType
+from typing import TYPE_CHECKING, Any, Dict, FrozenSet, Iterable, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from cosmicds.logger import setup_logger
+from cosmicds.state import GLOBAL_STATE
+from hubbleds.remote import LOCAL_API
+from hubbleds.state import LOCAL_STATE
+from hubbleds.workspace import find_workspace
+
+# The layout imports this module, so the modules that are only needed to
+#  measure sessions are imported when they are measured
+if TYPE_CHECKING:
+    from glue.core import Data
+
+logger = setup_logger("MEMORY")
+
+__all__ = [
+    "MEMORY_LOG_ENV",
+    "SessionMemory",
+    "all_session_memory",
+    "data_nbytes",
+    "deep_sizeof",
+    "log_memory_report",
+    "memory_report",
+    "session_memory",
+    "start_memory_logging",
+]
+
+# The number of seconds between memory reports in the server log; the
+#  reports are off when this isn't set
+MEMORY_LOG_ENV = "HUBBLEDS_MEMORY_LOG"
+MEMORY_REPORT_TOP = 5
+
+LOCAL_STATE_LISTS = (
+    "measurements",
+    "example_measurements",
+    "class_measurements",
+    "all_measurements",
+    "student_summaries",
+    "class_summaries",
+)
+
+# Long lists are estimated from this many of their items
+SIZE_SAMPLE = 20
+
+# The spectra cached on a galaxy are counted separately from the galaxy
+SPECTRUM_ATTRIBUTES = frozenset({"spectrum", "spectrum_as_data_frame"})
+
+
+class SessionMemory(NamedTuple):
+    session: str
+    student_id: Optional[int]
+    data: Dict[str, int]
+    shared_data: int
+    spectra: int
+    local_state: Dict[str, int]
+    viewers: int
+    viewer_bytes: int
+    widgets: int
+
+    @property
+    def total(self) -> int:
+        """The estimated bytes held by the session alone."""
+        return (
+            sum(self.data.values())
+            + self.spectra
+            + sum(self.local_state.values())
+            + self.viewer_bytes
+        )
+
+    def format(self) -> str:
+        largest = max(self.data.items(), key=lambda x: x[1], default=("-", 0))
+        return (
+            f"{self.session} (student {self.student_id}): {_mib(self.total)} "
+            f"[glue {_mib(sum(self.data.values()))} in {len(self.data)} data, "
+            f"largest {largest[0]} {_mib(largest[1])}; "
+            f"shared {_mib(self.shared_data)}; "
+            f"spectra {_mib(self.spectra)}; "
+            f"state {_mib(sum(self.local_state.values()))}; "
+            f"{self.viewers} viewers {_mib(self.viewer_bytes)}; "
+            f"{self.widgets} widgets]"
+        )
+
+
+def _mib(nbytes: int) -> str:
+    return f"{nbytes / 2**20:.1f} MiB"
+
+
+def _array_nbytes(array: np.ndarray) -> int:
+    if array.dtype != object or array.size == 0:
+        return array.nbytes
+    sample = array.ravel()[:: max(array.size // SIZE_SAMPLE, 1)]
+    return array.nbytes + int(np.mean([sys.getsizeof(x) for x in sample]) * array.size)
+
+
+def deep_sizeof(obj: Any, skip_attributes: FrozenSet[str] = frozenset()) -> int:
+    """
+    An estimate of the bytes held by ``obj`` and everything it refers to,
+    counting each object once. Attributes in ``skip_attributes`` are not
+    followed.
+    """
+    import pandas as pd
+
+    seen = set()
+    size = 0
+    stack = [obj]
+    while stack:
+        o = stack.pop()
+        if o is None or id(o) in seen or isinstance(o, (type, ModuleType, FunctionType)):
+            continue
+        seen.add(id(o))
+
+        if isinstance(o, np.ndarray):
+            size += _array_nbytes(o)
+        elif isinstance(o, (pd.DataFrame, pd.Series)):
+            size += int(np.sum(o.memory_usage(deep=True)))
+        else:
+            size += sys.getsizeof(o)
+            if isinstance(o, dict):
+                stack.extend(o.keys())
+                stack.extend(o.values())
+            elif isinstance(o, (list, tuple, set, frozenset)):
+                stack.extend(o)
+            elif hasattr(o, "__dict__"):
+                stack.extend(v for k, v in vars(o).items() if k not in skip_attributes)
+    return size
+
+
+def _list_bytes(items: List[Any]) -> int:
+    # The items are sized one at a time, so that the estimate of a list
+    #  doesn't depend on whether it was sampled
+    if not items:
+        return sys.getsizeof(items)
+    sample = items[:: max(len(items) // SIZE_SAMPLE, 1)]
+    item_size = np.mean([deep_sizeof(item, SPECTRUM_ATTRIBUTES) for item in sample])
+    return sys.getsizeof(items) + int(item_size * len(items))
+
+
+def data_nbytes(data: "Data", shared_ids: Optional[set] = None) -> Tuple[int, int]:
+    """
+    The bytes of the stored component arrays of ``data``, split into the
+    arrays owned by the session and the arrays of the reference datasets
+    shared between sessions (see `hubbleds.reference_data`). Coordinate and
+    derived components are computed on demand, and aren't counted.
+
+    Returns
+    ----------
+    owned: int
+        The bytes of the session's own arrays
+    shared: int
+        The bytes of the shared arrays
+    """
+    from hubbleds.reference_data import reference_array_ids
+
+    shared_ids = reference_array_ids() if shared_ids is None else shared_ids
+    owned = shared = 0
+    for component in data._components.values():
+        array = getattr(component, "_data", None)
+        if not isinstance(array, np.ndarray):
+            continue
+        if id(array) in shared_ids:
+            shared += array.nbytes
+        else:
+            owned += _array_nbytes(array)
+    return owned, shared
+
+
+def _spectra_bytes(local_state) -> int:
+    galaxies = {
+        id(m.galaxy): m.galaxy
+        for name in LOCAL_STATE_LISTS[:4]
+        for m in getattr(local_state, name, [])
+        if m.galaxy is not None
+    }
+    return sum(
+        deep_sizeof(galaxy.__dict__.get(attribute))
+        for galaxy in galaxies.values()
+        for attribute in SPECTRUM_ATTRIBUTES
+    )
+
+
+def _viewer_bytes(viewers: Iterable[Any]) -> int:
+    # The traces of a plotly figure hold a copy of the plotted data
+    size = 0
+    for viewer in viewers:
+        figure = getattr(viewer, "figure", None)
+        traces = getattr(figure, "_data", None)
+        if traces is not None:
+            size += deep_sizeof(traces)
+    return size
+
+
+def session_memory(
+    global_state,
+    local_state,
+    session: str = "",
+    widgets: int = 0,
+) -> SessionMemory:
+    """
+    Estimate the memory held by a session from the values of its global and
+    local states: its glue data, the spectra cached on its galaxies, the
+    measurement and summary lists of its local state and its viewers.
+    """
+    from hubbleds.reference_data import reference_array_ids
+
+    data_collection = getattr(global_state, "glue_data_collection", None)
+    data = {}
+    shared = 0
+    shared_ids = reference_array_ids()
+    for d in data_collection or []:
+        owned, d_shared = data_nbytes(d, shared_ids)
+        data[d.label] = owned
+        shared += d_shared
+
+    workspace = find_workspace(data_collection) if data_collection is not None else None
+    viewers = workspace.live_viewers if workspace is not None else []
+
+    lists = {}
+    if local_state is not None:
+        lists = {name: _list_bytes(getattr(local_state, name)) for name in LOCAL_STATE_LISTS}
+
+    student = getattr(global_state, "student", None)
+    return SessionMemory(
+        session=session,
+        student_id=getattr(student, "id", None),
+        data=data,
+        shared_data=shared,
+        spectra=_spectra_bytes(local_state) if local_state is not None else 0,
+        local_state=lists,
+        viewers=len(viewers),
+        viewer_bytes=_viewer_bytes(viewers),
+        widgets=widgets,
+    )
+
+
+def _context_value(context, reactive):
+    # The value of a reactive in a kernel context, without creating the
+    #  default value if the session never used it
+    return context.user_dicts.get(reactive._storage.storage_key)
+
+
+def all_session_memory() -> List[SessionMemory]:
+    """The memory of every live session of the solara server, largest first."""
+    from solara.server import kernel_context
+
+    sessions = []
+    for context in list(kernel_context.contexts.values()):
+        global_state = _context_value(context, GLOBAL_STATE)
+        local_state = _context_value(context, LOCAL_STATE)
+        if global_state is None and local_state is None:
+            continue
+        try:
+            sessions.append(session_memory(
+                global_state, local_state, session=context.id, widgets=len(context.widgets),
+            ))
+        except Exception:
+            # The session may be changing or closing while it is measured
+            logger.exception("Could not measure the memory of session `%s`.", context.id)
+    return sorted(sessions, key=lambda s: s.total, reverse=True)
+
+
+def memory_report(top: int = MEMORY_REPORT_TOP) -> str:
+    """
+    A report of the memory held by the process-wide caches and by the
+    ``top`` largest sessions.
+    """
+    from hubbleds.reference_data import reference_data_nbytes
+
+    sessions = all_session_memory()
+    spectra = deep_sizeof(list(LOCAL_API.spectrum_cache.values()))
+    lines = [
+        f"{len(sessions)} sessions holding {_mib(sum(s.total for s in sessions))}; "
+        f"shared reference data {_mib(reference_data_nbytes())}; "
+        f"spectrum cache {_mib(spectra)} in {len(LOCAL_API.spectrum_cache)} spectra",
+    ]
+    lines.extend(f"  {session.format()}" for session in sessions[:top])
+    return "\n".join(lines)
+
+
+def log_memory_report(top: int = MEMORY_REPORT_TOP):
+    logger.info("Memory report:\n%s", memory_report(top))
+
+
+_logging_thread: Optional[threading.Thread] = None
+_logging_lock = threading.Lock()
+
+
+def start_memory_logging(interval: float, top: int = MEMORY_REPORT_TOP) -> threading.Thread:
+    """
+    Log a memory report every ``interval`` seconds from a daemon thread. Only
+    one thread is started per process.
+    """
+    global _logging_thread
+
+    def _log():
+        while True:
+            time.sleep(interval)
+            try:
+                log_memory_report(top)
+            except Exception:
+                logger.exception("Could not write the memory report.")
+
+    with _logging_lock:
+        if _logging_thread is None:
+            _logging_thread = threading.Thread(target=_log, name="memory-report", daemon=True)
+            _logging_thread.start()
+            logger.info("Logging a memory report every %s seconds.", interval)
+        return _logging_thread
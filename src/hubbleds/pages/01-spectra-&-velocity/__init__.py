@@ -1,8 +1,12 @@
 import solara
 from solara.lab import computed
-from hubbleds.state import LOCAL_STATE, GLOBAL_STATE, get_multiple_choice, mc_callback
+from hubbleds.state import LOCAL_STATE, GLOBAL_STATE, get_multiple_choice, mc_callback, update_measurement
+from hubbleds.transaction import transaction
 from .component_state import COMPONENT_STATE, Marker
 from hubbleds.remote import LOCAL_API
+from hubbleds.dirty_tracking import use_dirty_tracker
+from hubbleds.reference_data import add_example_seed_data
+from hubbleds.workspace import get_workspace
 from glue_jupyter import JupyterApplication
 import asyncio
 from pathlib import Path
@@ -71,10 +75,13 @@ def Page():
     loaded_component_state = solara.use_reactive(False)
     router = solara.use_router()
 
+    stage_changes = use_dirty_tracker(COMPONENT_STATE)
+
     async def _load_component_state():
         # Load stored component state from database, measurement data is
         #   considered higher-level and is loaded when the story starts.
         LOCAL_API.get_stage_state(GLOBAL_STATE, LOCAL_STATE, COMPONENT_STATE)
+        stage_changes.flushed(COMPONENT_STATE.value)
 
         total_galaxies = Ref(COMPONENT_STATE.fields.total_galaxies)
 
@@ -95,9 +102,14 @@ def Page():
         if not loaded_component_state.value:
             return
 
-        # Listen for changes in the states and write them to the database
+        # Listen for changes in the states and write them to the database,
+        #  unless only fields that aren't stored changed
+        state = COMPONENT_STATE.value
+        if not stage_changes.dirty(state):
+            return
         res = LOCAL_API.put_stage_state(GLOBAL_STATE, LOCAL_STATE, COMPONENT_STATE)
         if res:
+            stage_changes.flushed(state)
             logger.info("Wrote component state to database.")
         else:
             logger.info("Did not write component state to database.")
@@ -107,35 +119,14 @@ def Page():
     def _glue_setup() -> JupyterApplication:
         # NOTE: use_memo has to be part of the main page render. Including it
         #  in a conditional will result in an error.
-        gjapp = JupyterApplication(
-            GLOBAL_STATE.value.glue_data_collection, GLOBAL_STATE.value.glue_session
-        )
+        gjapp = get_workspace(GLOBAL_STATE).app
 
         if EXAMPLE_GALAXY_SEED_DATA not in gjapp.data_collection:
-            example_seed_data = LOCAL_API.get_example_seed_measurement(LOCAL_STATE, which='both')
-            
-            data = Data(
-                label=EXAMPLE_GALAXY_SEED_DATA,
-                **{
-                    k: np.asarray([r[k] for r in example_seed_data])
-                    for k in example_seed_data[0].keys()
-                }
-            )
-            gjapp.data_collection.append(data)
-            # create 'first measurement' and 'second measurement' datasets
-            # create_measurement_subsets(gjapp, data)
-            first = Data(label = EXAMPLE_GALAXY_SEED_DATA + '_first', 
-                         **{k: np.asarray([r[k] for r in example_seed_data if r['measurement_number'] == 'first'])
-                            for k in example_seed_data[0].keys()}
-                            )
+            # The seed data and its 'first measurement' and 'second
+            #  measurement' splits are shared by every session
+            _, first, second = add_example_seed_data(gjapp.data_collection, LOCAL_STATE)
             first.style.color = "#C94456"
-            gjapp.data_collection.append(first)
-            second = Data(label = EXAMPLE_GALAXY_SEED_DATA + '_second', 
-                         **{k: np.asarray([r[k] for r in example_seed_data if r['measurement_number'] == 'second'])
-                            for k in example_seed_data[0].keys()}
-                            )
             second.style.color = "#4449C9"
-            gjapp.data_collection.append(second)
             
             link_seed_data(gjapp)
         
@@ -226,6 +217,21 @@ def Page():
     
     solara.use_memo(_glue_sync_setup, dependencies=[Ref(LOCAL_STATE.fields.measurements_loaded)])
 
+    async def _prefetch_spectra():
+        # Fetch the spectra for the example galaxy and the student's selected
+        #  galaxies in one request rather than one round trip per galaxy.
+        if not LOCAL_STATE.value.measurements_loaded:
+            return
+        galaxies = [
+            m.galaxy
+            for m in LOCAL_STATE.value.example_measurements + LOCAL_STATE.value.measurements
+            if m.galaxy is not None
+        ]
+        if galaxies:
+            LOCAL_API.load_spectra(galaxies, LOCAL_STATE)
+
+    solara.lab.use_task(_prefetch_spectra, dependencies=[LOCAL_STATE.value.measurements_loaded])
+
     # Flag to show/hide the selection tool. TODO: we shouldn't need to be
     #   doing this here; revisit in the future and implement proper handling
     #   in the ipywwt package itself.
@@ -738,24 +744,15 @@ def Page():
                 )
 
                 def _velocity_calculated_callback(value):
-                    example_measurement_index = (
-                        LOCAL_STATE.value.get_example_measurement_index(
-                            COMPONENT_STATE.value.selected_example_galaxy,
-                            measurement_number='first'
-                        )
+                    example_measurement = update_measurement(
+                        LOCAL_STATE,
+                        COMPONENT_STATE.value.selected_example_galaxy,
+                        example=True,
+                        measurement_number='first',
+                        velocity_value=round(value),
                     )
-                    if example_measurement_index is None:
+                    if example_measurement is None:
                         return
-                    example_measurement = Ref(
-                        LOCAL_STATE.fields.example_measurements[
-                            example_measurement_index
-                        ]
-                    )
-                    example_measurement.set(
-                        example_measurement.value.model_copy(
-                            update={"velocity_value": round(value)}
-                        )
-                    )
                     
                     if COMPONENT_STATE.value.current_step == Marker.rem_vel1:
                         add_example_measurements_to_glue()
@@ -947,24 +944,19 @@ def Page():
                     obs_wave.set(0)
 
                 def _on_calculate_velocity():
-                    for i in range(len(LOCAL_STATE.value.measurements)):
-                        measurement = Ref(LOCAL_STATE.fields.measurements[i])
-                        velocity = round(
-                            3e5
-                            * (
-                                measurement.value.obs_wave_value
-                                / measurement.value.rest_wave_value
-                                - 1
-                            )
-                        )
-                        measurement.set(
-                            measurement.value.model_copy(
-                                update={"velocity_value": velocity}
+                    # All of the velocities are set as one change of each state
+                    with transaction(LOCAL_STATE) as local, transaction(COMPONENT_STATE) as component:
+                        for i, measurement in enumerate(local.value.measurements):
+                            velocity = round(
+                                3e5
+                                * (
+                                    measurement.obs_wave_value
+                                    / measurement.rest_wave_value
+                                    - 1
+                                )
                             )
-                        )
-
-                        velocities_total = Ref(COMPONENT_STATE.fields.velocities_total)
-                        velocities_total.set(velocities_total.value + 1)
+                            local.update_item("measurements", i, velocity_value=velocity)
+                            component.update(velocities_total=component.value.velocities_total + 1)
 
                 @computed
                 def selected_galaxy_index():
@@ -1303,31 +1295,21 @@ def Page():
                         if example_measurement_index is None:
                             return
                         
-                        example_measurements = LOCAL_STATE.value.example_measurements
-                        example_measurement = Ref(
-                            LOCAL_STATE.fields.example_measurements[
-                                example_measurement_index
-                            ]
-                        )
-                        
-                        if example_measurement.value.velocity_value is None:
-                            example_measurement.set(
-                                example_measurement.value.model_copy(
-                                    update={"obs_wave_value": value}
+                        with transaction(LOCAL_STATE) as local:
+                            example_measurement = local.value.example_measurements[example_measurement_index]
+                            if example_measurement.velocity_value is None:
+                                local.update_item(
+                                    "example_measurements", example_measurement_index,
+                                    obs_wave_value=value,
                                 )
-                            )
-                        else:
-                            velocity = velocity_from_wavelengths(value, example_measurement.value.rest_wave_value)
-                            example_measurement.set(
-                                example_measurement.value.model_copy(
-                                    update={"obs_wave_value": value, "velocity_value": velocity}
+                            else:
+                                velocity = velocity_from_wavelengths(value, example_measurement.rest_wave_value)
+                                local.update_item(
+                                    "example_measurements", example_measurement_index,
+                                    obs_wave_value=value, velocity_value=velocity,
                                 )
-                            )
-                        example_measurements[example_measurement_index] = example_measurement.value
-                        Ref(LOCAL_STATE.fields.example_measurements).set(example_measurements)
-                        obs_wave_tool_used.set(True)
-                        obs_wave = Ref(COMPONENT_STATE.fields.obs_wave)
-                        obs_wave.set(value)
+                        with transaction(COMPONENT_STATE) as component:
+                            component.update(obs_wave_tool_used=True, obs_wave=value)
                         
                     def _on_set_marker_location(value):
                         logger.info('Setting marker location spectrum -> dotplot')
@@ -1336,7 +1318,6 @@ def Page():
                             logger.info(f'Setting velocity {velocity: 0.2f} ')
                             sync_velocity_line.set(velocity)
 
-                    obs_wave_tool_used = Ref(COMPONENT_STATE.fields.obs_wave_tool_used)
                     obs_wave_tool_activated = Ref(
                         COMPONENT_STATE.fields.obs_wave_tool_activated
                     )
@@ -1401,24 +1382,19 @@ def Page():
                         num_bad_velocities()
 
                         if not is_bad:
-                            measurement = Ref(
-                                LOCAL_STATE.fields.measurements[measurement_index]
-                            )
-                            
-                            if measurement.value.velocity_value is None:
-                                measurement.set(
-                                    measurement.value.model_copy(
-                                        update={"obs_wave_value": value}
+                            with transaction(LOCAL_STATE) as local:
+                                measurement = local.value.measurements[measurement_index]
+                                if measurement.velocity_value is None:
+                                    local.update_item(
+                                        "measurements", measurement_index,
+                                        obs_wave_value=value,
                                     )
-                                )
-                                
-                            else:
-                                velocity = velocity_from_wavelengths(value, measurement.value.rest_wave_value)
-                                measurement.set(
-                                    measurement.value.model_copy(
-                                        update={"obs_wave_value": value, "velocity_value": velocity}
+                                else:
+                                    velocity = velocity_from_wavelengths(value, measurement.rest_wave_value)
+                                    local.update_item(
+                                        "measurements", measurement_index,
+                                        obs_wave_value=value, velocity_value=velocity,
                                     )
-                                )
 
                             obs_wave = Ref(COMPONENT_STATE.fields.obs_wave)
                             obs_wave.set(value)
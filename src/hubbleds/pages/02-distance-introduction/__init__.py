@@ -6,6 +6,7 @@ from hubbleds.components import Stage2Slideshow
 from hubbleds.state import LOCAL_STATE, GLOBAL_STATE, get_multiple_choice, mc_callback 
 from .component_state import COMPONENT_STATE
 from hubbleds.remote import LOCAL_API
+from hubbleds.dirty_tracking import use_dirty_tracker
 from ...utils import IMAGE_BASE_URL, DISTANCE_CONSTANT
 
 from cosmicds.logger import setup_logger
@@ -18,10 +19,13 @@ def Page():
     loaded_component_state = solara.use_reactive(False)
     router = solara.use_router()
 
+    stage_changes = use_dirty_tracker(COMPONENT_STATE)
+
     async def _load_component_state():
         # Load stored component state from database, measurement data is
         # considered higher-level and is loaded when the story starts
         LOCAL_API.get_stage_state(GLOBAL_STATE, LOCAL_STATE, COMPONENT_STATE)
+        stage_changes.flushed(COMPONENT_STATE.value)
 
         # TODO: What else to we need to do here?
         logger.info("Finished loading component state for stage 2.")
@@ -33,10 +37,15 @@ def Page():
         if not loaded_component_state.value:
             return
 
-        # Listen for changes in the states and write them to the database
+        # Listen for changes in the states and write them to the database,
+        #  unless only fields that aren't stored changed
+        state = COMPONENT_STATE.value
+        if not stage_changes.dirty(state):
+            return
         res = LOCAL_API.put_stage_state(GLOBAL_STATE, LOCAL_STATE, COMPONENT_STATE)
         
         if res:
+            stage_changes.flushed(state)
             logger.info("Wrote component state for stage 2 to database.")
         else:
             logger.info("Did not write component state for stage 2 to database.")
@@ -6,7 +6,6 @@ import solara.lab
 from solara.toestand import Ref
 
 from glue_jupyter.app import JupyterApplication
-from glue.core import Data
 
 from cosmicds.components import (
     ScaffoldAlert,
@@ -30,12 +29,15 @@ from hubbleds.components import (
 
 from hubbleds.data_management import *
 from hubbleds.remote import LOCAL_API
+from hubbleds.dirty_tracking import use_dirty_tracker
+from hubbleds.transaction import transaction
 from hubbleds.state import (
     GLOBAL_STATE, 
     LOCAL_STATE,
     StudentMeasurement, 
     get_multiple_choice,
-    mc_callback
+    mc_callback,
+    update_measurement,
     )
 from hubbleds.utils import (
     DISTANCE_CONSTANT, 
@@ -47,10 +49,11 @@ from hubbleds.utils import (
     )
 
 from hubbleds.widgets.distance_tool.distance_tool import DistanceTool
+from hubbleds.reference_data import add_example_seed_data
+from hubbleds.workspace import get_workspace
 from ...viewers.hubble_dotplot import HubbleDotPlotView, HubbleDotPlotViewer
 from .component_state import COMPONENT_STATE, Marker
 
-from numpy import asarray
 import astropy.units as u
 
 from pathlib import Path
@@ -156,8 +159,11 @@ def Page():
     loaded_component_state = solara.use_reactive(False)
     router = solara.use_router()
 
+    stage_changes = use_dirty_tracker(COMPONENT_STATE)
+
     async def _load_component_state():
         LOCAL_API.get_stage_state(GLOBAL_STATE, LOCAL_STATE, COMPONENT_STATE)
+        stage_changes.flushed(COMPONENT_STATE.value)
         logger.info("Finished loading component state")
         loaded_component_state.set(True)
     
@@ -167,9 +173,14 @@ def Page():
         if not loaded_component_state.value:
             return
 
-        # Listen for changes in the states and write them to the database
+        # Listen for changes in the states and write them to the database,
+        #  unless only fields that aren't stored changed
+        state = COMPONENT_STATE.value
+        if not stage_changes.dirty(state):
+            return
         res = LOCAL_API.put_stage_state(GLOBAL_STATE, LOCAL_STATE, COMPONENT_STATE)
         if res:
+            stage_changes.flushed(state)
             logger.info("Wrote component state for stage 3 to database.")
         else:
             logger.info("Did not write component state for stage 3 to database.")
@@ -178,30 +189,15 @@ def Page():
     
     
     def _glue_setup() -> JupyterApplication:
-        gjapp = gjapp = JupyterApplication(
-            GLOBAL_STATE.value.glue_data_collection, GLOBAL_STATE.value.glue_session
-        )
+        gjapp = get_workspace(GLOBAL_STATE).app
         
         # Get the example seed data
         if EXAMPLE_GALAXY_SEED_DATA not in gjapp.data_collection:
-            example_seed_data = LOCAL_API.get_example_seed_measurement(LOCAL_STATE, which = 'both')
-            data = Data(label=EXAMPLE_GALAXY_SEED_DATA, **{k: asarray([r[k] for r in example_seed_data]) for k in example_seed_data[0].keys()})
-            gjapp.data_collection.append(data)
-            
-            # create 'first measurement' and 'second measurement' datasets
-            # create_measurement_subsets(gjapp, data)
-            first = Data(label = EXAMPLE_GALAXY_SEED_DATA + '_first', 
-                         **{k: asarray([r[k] for r in example_seed_data if r['measurement_number'] == 'first'])
-                            for k in example_seed_data[0].keys()}
-                            )
+            # The seed data and its 'first measurement' and 'second
+            #  measurement' splits are shared by every session
+            _, first, second = add_example_seed_data(gjapp.data_collection, LOCAL_STATE)
             first.style.color = "#C94456"
-            gjapp.data_collection.append(first)
-            second = Data(label = EXAMPLE_GALAXY_SEED_DATA + '_second', 
-                         **{k: asarray([r[k] for r in example_seed_data if r['measurement_number'] == 'second'])
-                            for k in example_seed_data[0].keys()}
-                            )
             second.style.color = "#4449C9"
-            gjapp.data_collection.append(second)
             
             link_seed_data(gjapp)
         
@@ -337,41 +333,18 @@ def Page():
     def _update_angular_size(update_example: bool, galaxy, angular_size, count, meas_num = 'first', brightness = 1.0):
         # if bool(galaxy) and angular_size is not None:
         arcsec_value = int(angular_size.to(u.arcsec).value)
-        if update_example:
-            index = LOCAL_STATE.value.get_example_measurement_index(galaxy["id"], measurement_number=meas_num)
-            if index is not None:
-                measurements = LOCAL_STATE.value.example_measurements
-                measurement = Ref(LOCAL_STATE.fields.example_measurements[index])
-                measurement.set(
-                    measurement.value.model_copy(
-                        update={
-                            "ang_size_value": arcsec_value,
-                            "brightness": brightness
-                            }
-                        )
-                )
-                measurements[index] = measurement.value
-                Ref(LOCAL_STATE.fields.example_measurements).set(measurements)
-            else:
-                raise ValueError(f"Could not find measurement for galaxy {galaxy['id']}")
-        else:
-            index = LOCAL_STATE.value.get_measurement_index(galaxy["id"])
-            if index is not None:
-                measurements = LOCAL_STATE.value.measurements
-                measurement = Ref(LOCAL_STATE.fields.measurements[index])
-                measurement.set(
-                    measurement.value.model_copy(
-                        update={
-                            "ang_size_value": arcsec_value,
-                            "brightness": brightness
-                            }
-                        )
-                )
-                measurements[index] = measurement.value
-                Ref(LOCAL_STATE.fields.measurements).set(measurements)
-                count.set(count.value + 1)
-            else:
-                raise ValueError(f"Could not find measurement for galaxy {galaxy['id']}")
+        measurement = update_measurement(
+            LOCAL_STATE,
+            galaxy["id"],
+            example=update_example,
+            measurement_number=meas_num,
+            ang_size_value=arcsec_value,
+            brightness=brightness,
+        )
+        if measurement is None:
+            raise ValueError(f"Could not find measurement for galaxy {galaxy['id']}")
+        if not update_example:
+            count.set(count.value + 1)
    
         
     @solara.lab.computed
@@ -382,38 +355,15 @@ def Page():
     def _update_distance_measurement(update_example: bool, galaxy, theta, measurement_number = 'first'):
         # if bool(galaxy) and theta is not None:
         distance = distance_from_angular_size(theta)
-        if update_example:
-            index = LOCAL_STATE.value.get_example_measurement_index(galaxy["id"], measurement_number=measurement_number)
-            if index is not None:
-                measurements = LOCAL_STATE.value.example_measurements
-                measurement = Ref(LOCAL_STATE.fields.example_measurements[index])
-                measurement.set(
-                    measurement.value.model_copy(
-                        update={
-                            "est_dist_value": distance
-                            }
-                        )
-                )
-                measurements[index] = measurement.value
-                Ref(LOCAL_STATE.fields.example_measurements).set(measurements)
-            else:
-                raise ValueError(f"Could not find measurement for galaxy {galaxy['id']}")
-        else:
-            index = LOCAL_STATE.value.get_measurement_index(galaxy["id"])
-            if index is not None:
-                measurements = LOCAL_STATE.value.measurements
-                measurement = Ref(LOCAL_STATE.fields.measurements[index])
-                measurement.set(
-                    measurement.value.model_copy(
-                        update={
-                            "est_dist_value": distance
-                            }
-                        )
-                )
-                measurements[index] = measurement.value
-                Ref(LOCAL_STATE.fields.measurements).set(measurements)
-            else:
-                raise ValueError(f"Could not find measurement for galaxy {galaxy['id']}")
+        measurement = update_measurement(
+            LOCAL_STATE,
+            galaxy["id"],
+            example=update_example,
+            measurement_number=measurement_number,
+            est_dist_value=distance,
+        )
+        if measurement is None:
+            raise ValueError(f"Could not find measurement for galaxy {galaxy['id']}")
     
     ang_size_dotplot_range = solara.use_reactive([])
     dist_dotplot_range = solara.use_reactive([])
@@ -568,15 +518,12 @@ def Page():
                 count = Ref(COMPONENT_STATE.fields.example_angular_sizes_total) if on_example_galaxy_marker.value else Ref(COMPONENT_STATE.fields.angular_sizes_total)
                 _update_angular_size(on_example_galaxy_marker.value, current_galaxy.value, angle, count, example_galaxy_measurement_number.value, brightness = current_brightness.value)
                 put_measurements(samples=on_example_galaxy_marker.value)
-                if on_example_galaxy_marker.value:
-                    value = int(angle.to(u.arcsec).value)
-                    meas_theta = Ref(COMPONENT_STATE.fields.meas_theta)
-                    meas_theta.set(value)
-                    n_meas = Ref(COMPONENT_STATE.fields.n_meas)
-                    n_meas.set(COMPONENT_STATE.value.n_meas + 1)
-                if COMPONENT_STATE.value.bad_measurement:
-                    bad_measurement = Ref(COMPONENT_STATE.fields.bad_measurement)
-                    bad_measurement.set(False)
+                with transaction(COMPONENT_STATE) as component:
+                    if on_example_galaxy_marker.value:
+                        value = int(angle.to(u.arcsec).value)
+                        component.update(meas_theta=value, n_meas=component.value.n_meas + 1)
+                    if component.value.bad_measurement:
+                        component.update(bad_measurement=False)
                 auto_fill_distance = (
                     COMPONENT_STATE.value.current_step_between(Marker.est_dis4, Marker.dot_seq5c) 
                     or COMPONENT_STATE.value.current_step >= Marker.fil_rem1
@@ -752,12 +699,14 @@ def Page():
                     has_ang_size = all(measurement.ang_size_value is not None for measurement in dataset)
                     if not has_ang_size:
                         logger.info("\n ======= Not all galaxies have angular sizes ======= \n")
-                    for measurement in dataset:
-                        if measurement.galaxy is not None and measurement.ang_size_value is not None:
-                            count += 1
-                            _update_distance_measurement(False, measurement.galaxy.model_dump(), measurement.ang_size_value)
-                        elif measurement.ang_size_value is None:
-                            logger.info(f"Galaxy {measurement.galaxy_id} has no angular size")
+                    # The distances are set as one change of the local state
+                    with transaction(LOCAL_STATE):
+                        for measurement in dataset:
+                            if measurement.galaxy is not None and measurement.ang_size_value is not None:
+                                count += 1
+                                _update_distance_measurement(False, measurement.galaxy.model_dump(), measurement.ang_size_value)
+                            elif measurement.ang_size_value is None:
+                                logger.info(f"Galaxy {measurement.galaxy_id} has no angular size")
                     logger.info(f"fill_galaxy_distances: Filled {count} distances")
                     put_measurements(samples=False)
                     distances_total.set(count)
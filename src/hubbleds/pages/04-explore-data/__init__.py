@@ -15,8 +15,10 @@ from cosmicds.components import ScaffoldAlert, StateEditor, ViewerLayout
 from hubbleds.components import DataTable, HubbleExpUniverseSlideshow, LineDrawViewer, PlotlyLayerToggle
 from hubbleds.state import LOCAL_STATE, GLOBAL_STATE, StudentMeasurement, get_multiple_choice, get_free_response, mc_callback, fr_callback
 from hubbleds.viewers.hubble_scatter_viewer import HubbleScatterView
+from hubbleds.workspace import get_workspace
 from .component_state import COMPONENT_STATE, Marker
 from hubbleds.remote import LOCAL_API
+from hubbleds.dirty_tracking import use_dirty_tracker
 from hubbleds.utils import AGE_CONSTANT, models_to_glue_data, PLOTLY_MARGINS
 
 from cosmicds.logger import setup_logger
@@ -48,10 +50,13 @@ def Page():
     loaded_component_state = solara.use_reactive(False)
     router = solara.use_router()
 
+    stage_changes = use_dirty_tracker(COMPONENT_STATE)
+
     async def _load_component_state():
         # Load stored component state from database, measurement data is
         # considered higher-level and is loaded when the story starts
         LOCAL_API.get_stage_state(GLOBAL_STATE, LOCAL_STATE, COMPONENT_STATE)
+        stage_changes.flushed(COMPONENT_STATE.value)
 
         # TODO: What else to we need to do here?
         logger.info("Finished loading component state for stage 4.")
@@ -63,9 +68,14 @@ def Page():
         if not loaded_component_state.value:
             return
 
-        # Listen for changes in the states and write them to the database
+        # Listen for changes in the states and write them to the database,
+        #  unless only fields that aren't stored changed
+        state = COMPONENT_STATE.value
+        if not stage_changes.dirty(state):
+            return
         res = LOCAL_API.put_stage_state(GLOBAL_STATE, LOCAL_STATE, COMPONENT_STATE)
         if res:
+            stage_changes.flushed(state)
             logger.info("Wrote component state for stage 4 to database.")
         else:
             logger.info("Did not write component state for stage 4 to database.")
@@ -84,37 +94,34 @@ def Page():
     solara.lab.use_task(_load_student_data)
 
     def glue_setup() -> Tuple[JupyterApplication, Dict[str, CDSScatterView]]:
-        gjapp = JupyterApplication(
-            GLOBAL_STATE.value.glue_data_collection, GLOBAL_STATE.value.glue_session
-        )
-
-        race_viewer = gjapp.new_data_viewer(HubbleScatterView, show=False)
-        race_data = Data(**{
-            "label": "Hubble Race Data",
-            "Distance (km)": [12, 24, 30],
-            "Velocity (km/hr)": [4, 8, 10],
-        })
-        race_data = GLOBAL_STATE.value.add_or_update_data(race_data)
-        race_data.style.color = "#f00"
-        race_data.style.alpha = 1
-        race_data.style.markersize = 10
-        race_viewer.add_data(race_data)
-        race_viewer.state.x_att = race_data.id["Distance (km)"]
-        race_viewer.state.y_att = race_data.id["Velocity (km/hr)"]
-        race_viewer.state.x_max = 1.1 * race_viewer.state.x_max
-        race_viewer.state.y_max = 1.1 * race_viewer.state.y_max
-        race_viewer.state.x_min = 0
-        race_viewer.state.y_min = 0
-        race_viewer.state.title = "Race Data"
-
-        layer_viewer = gjapp.new_data_viewer(HubbleScatterView, show=False)
+        workspace = get_workspace(GLOBAL_STATE)
+        stage = router.path.strip("/")
+
+        def _setup_race_viewer(race_viewer: CDSScatterView):
+            race_data = Data(**{
+                "label": "Hubble Race Data",
+                "Distance (km)": [12, 24, 30],
+                "Velocity (km/hr)": [4, 8, 10],
+            })
+            race_data = GLOBAL_STATE.value.add_or_update_data(race_data)
+            race_data.style.color = "#f00"
+            race_data.style.alpha = 1
+            race_data.style.markersize = 10
+            race_viewer.add_data(race_data)
+            race_viewer.state.x_att = race_data.id["Distance (km)"]
+            race_viewer.state.y_att = race_data.id["Velocity (km/hr)"]
+            race_viewer.state.x_max = 1.1 * race_viewer.state.x_max
+            race_viewer.state.y_max = 1.1 * race_viewer.state.y_max
+            race_viewer.state.x_min = 0
+            race_viewer.state.y_min = 0
+            race_viewer.state.title = "Race Data"
 
         viewers = {
-            "race": race_viewer,
-            "layer": layer_viewer,
+            "race": workspace.viewer(stage, "race", HubbleScatterView, setup=_setup_race_viewer),
+            "layer": workspace.viewer(stage, "layer", HubbleScatterView),
         }
 
-        return gjapp, viewers
+        return workspace.app, viewers
 
     gjapp, viewers = solara.use_memo(glue_setup, dependencies=[])
 
@@ -4,20 +4,20 @@ from glue.core.message import NumericalDataChangedMessage
 from glue.core.subset import RangeSubsetState
 from glue_jupyter import JupyterApplication
 from glue_jupyter.link import link
-from glue_plotly.viewers import PlotlyBaseView
 import numpy as np
 import solara
 from solara.toestand import Ref
 
-from functools import partial
 from pathlib import Path
+from threading import Lock
 import reacton.ipyvuetify as rv
-from typing import Dict, Iterable, Optional, Tuple
+from typing import Callable, Dict, Iterable, Optional, Tuple
 
 from cosmicds.components import PercentageSelector, ScaffoldAlert, StateEditor, StatisticsSelector, ViewerLayout
 from cosmicds.utils import empty_data_from_model_class, show_legend, show_layer_traces_in_legend
 from cosmicds.viewers import CDSHistogramView
 from hubbleds.base_component_state import transition_next, transition_previous
+from hubbleds.binning import HistogramBinner
 from hubbleds.components import UncertaintySlideshow, IdSlider
 from hubbleds.tools import *  # noqa
 from hubbleds.state import LOCAL_STATE, GLOBAL_STATE, StudentMeasurement, get_free_response, get_multiple_choice, mc_callback, fr_callback
@@ -26,6 +26,8 @@ from hubbleds.viewers.hubble_histogram_viewer import HubbleHistogramView
 from hubbleds.viewers.hubble_scatter_viewer import HubbleScatterView
 from .component_state import COMPONENT_STATE, Marker
 from hubbleds.remote import LOCAL_API
+from hubbleds.dirty_tracking import use_dirty_tracker
+from hubbleds.workspace import LazyViewer, MarkerViewers, get_workspace
 
 from cosmicds.logger import setup_logger
 
@@ -41,10 +43,13 @@ def Page():
     loaded_component_state = solara.use_reactive(False)
     router = solara.use_router()
 
+    stage_changes = use_dirty_tracker(COMPONENT_STATE)
+
     async def _load_component_state():
         # Load stored component state from database, measurement data is
         # considered higher-level and is loaded when the story starts
         LOCAL_API.get_stage_state(GLOBAL_STATE, LOCAL_STATE, COMPONENT_STATE)
+        stage_changes.flushed(COMPONENT_STATE.value)
 
         # TODO: What else to we need to do here?
         logger.info("Finished loading component state for stage 4.")
@@ -56,9 +61,14 @@ def Page():
         if not loaded_component_state.value:
             return
 
-        # Listen for changes in the states and write them to the database
+        # Listen for changes in the states and write them to the database,
+        #  unless only fields that aren't stored changed
+        state = COMPONENT_STATE.value
+        if not stage_changes.dirty(state):
+            return
         res = LOCAL_API.put_stage_state(GLOBAL_STATE, LOCAL_STATE, COMPONENT_STATE)
         if res:
+            stage_changes.flushed(state)
             logger.info("Wrote stage 5 component state to database.")
         else:
             logger.info("Did not write stage 5 component state to database.")
@@ -74,6 +84,10 @@ def Page():
     class_default_color = "#FF006E"
     class_highlight_color = "#3A86FF"
 
+    # One binner per group of linked histogram viewers, so that the viewers
+    #  in a group share a single bin computation
+    binners: Dict[Tuple[int, ...], HistogramBinner] = solara.use_memo(dict, dependencies=[])
+
     def _update_bins(viewers: Iterable[CDSHistogramView], _msg: Optional[NumericalDataChangedMessage]=None):
         props = ('hist_n_bin', 'hist_x_min', 'hist_x_max')
         with ExitStack() as stack:
@@ -89,42 +103,22 @@ def Page():
             if not values:
                 return
 
-            try:
-                xmin = round(min(min(vals) for vals in values), 0) - 2.5
-                xmax = round(max(max(vals) for vals in values), 0) + 2.5
-            except:
+            binner = binners.setdefault(tuple(id(viewer) for viewer in viewers), HistogramBinner())
+            bins = binner.bins(values)
+            if bins is None:
                 return
             for viewer in viewers:
-                viewer.state.hist_n_bin = int(xmax - xmin)
-                viewer.state.hist_x_min = xmin
-                viewer.state.hist_x_max = xmax
+                viewer.state.hist_n_bin = bins.nbin
+                viewer.state.hist_x_min = bins.x_min
+                viewer.state.hist_x_max = bins.x_max
 
     data_ready = solara.use_reactive(False)
-    def glue_setup() -> Tuple[JupyterApplication, Dict[str, PlotlyBaseView]]:
+    all_data_loaded = solara.use_reactive(False)
+    def glue_setup() -> Tuple[JupyterApplication, MarkerViewers, Callable[[], dict]]:
         # NOTE: use_memo has to be part of the main page render. Including it
         #  in a conditional will result in an error.
-        gjapp = JupyterApplication(
-            GLOBAL_STATE.value.glue_data_collection, GLOBAL_STATE.value.glue_session
-        )
-
-        layer_viewer = gjapp.new_data_viewer(HubbleScatterView, show=False)
-        student_slider_viewer = gjapp.new_data_viewer(HubbleScatterView, show=False)
-        class_slider_viewer = gjapp.new_data_viewer(HubbleScatterView, show=False)
-        student_hist_viewer = gjapp.new_data_viewer(HubbleHistogramView, show=False)
-        all_student_hist_viewer = gjapp.new_data_viewer(HubbleHistogramView, show=False)
-        class_hist_viewer = gjapp.new_data_viewer(HubbleHistogramView, show=False)
-        viewers = {
-            "layer": layer_viewer,
-            "student_slider": student_slider_viewer,
-            "class_slider": class_slider_viewer,
-            "student_hist": student_hist_viewer,
-            "all_student_hist": all_student_hist_viewer,
-            "class_hist": class_hist_viewer
-        }
-
-        two_hist_viewers = (all_student_hist_viewer, class_hist_viewer)
-        for att in ('x_min', 'x_max'):
-            link((all_student_hist_viewer.state, att), (class_hist_viewer.state, att))
+        workspace = get_workspace(GLOBAL_STATE)
+        gjapp = workspace.app
 
         if not LOCAL_STATE.value.measurements_loaded:
             LOCAL_API.get_measurements(GLOBAL_STATE, LOCAL_STATE)
@@ -137,14 +131,6 @@ def Page():
             student_ids.set(ids)
         measurements.set(class_measurements)
 
-        all_measurements, student_summaries, class_summaries = LOCAL_API.get_all_data(LOCAL_STATE)
-        all_meas = Ref(LOCAL_STATE.fields.all_measurements)
-        all_stu_summaries = Ref(LOCAL_STATE.fields.student_summaries)
-        all_cls_summaries = Ref(LOCAL_STATE.fields.class_summaries)
-        all_meas.set(all_measurements)
-        all_stu_summaries.set(student_summaries)
-        all_cls_summaries.set(class_summaries)
-
         student_data = models_to_glue_data(LOCAL_STATE.value.measurements, label="My Data")
         if not student_data.components:
             student_data = empty_data_from_model_class(StudentMeasurement, label="My Data")
@@ -157,44 +143,11 @@ def Page():
 
         for component in ("est_dist_value", "velocity_value"):
             gjapp.add_link(student_data, component, class_data, component)
-        layer_viewer.add_data(student_data)
-        student_layer = layer_viewer.layers[0]
-        student_layer.state.color = student_highlight_color
-        student_layer.state.size = 12
-        student_layer.state.zorder = 5
-
-        layer_viewer.ignore(lambda data: data.label == "student_slider_subset")
-        layer_viewer.add_data(class_data)
-        class_layer = layer_viewer.layers[1]
-        class_layer.state.zorder = 1
-        class_layer.state.color = "#3A86FF"
-        class_layer.state.size = 8
-        class_layer.state.visible = False
-
-
-        layer_viewer.state.x_att = class_data.id['est_dist_value']
-        layer_viewer.state.y_att = class_data.id['velocity_value']
-        layer_viewer.state.x_axislabel = "Distance (Mpc)"
-        layer_viewer.state.y_axislabel = "Velocity (km/s)"
-        layer_viewer.state.title = "Our Data"
-        show_layer_traces_in_legend(layer_viewer)
-        show_legend(layer_viewer, show=True)
 
         if len(class_data.subsets) == 0:
             student_slider_subset = class_data.new_subset(label="student_slider_subset", alpha=1, markersize=10)
         else:
             student_slider_subset = class_data.subsets[0]
-        student_slider_viewer.add_data(class_data)
-        student_slider_viewer.state.x_att = class_data.id['est_dist_value']
-        student_slider_viewer.state.y_att = class_data.id['velocity_value']
-        student_slider_viewer.state.x_axislabel = "Distance (Mpc)"
-        student_slider_viewer.state.y_axislabel = "Velocity (km/s)"
-        student_slider_viewer.state.title = "My Class Data"
-        student_slider_viewer.add_subset(student_slider_subset)
-        student_slider_viewer.layers[0].state.visible = False
-        student_slider_viewer.toolbar.tools["hubble:linefit"].activate()
-        show_layer_traces_in_legend(student_slider_viewer)
-        show_legend(student_slider_viewer, show=True)
 
         class_summary_data = make_summary_data(class_data,
                                                input_id_field="student_id",
@@ -202,73 +155,225 @@ def Page():
                                                label="Class Summaries")
         class_summary_data = GLOBAL_STATE.value.add_or_update_data(class_summary_data)
 
-        student_hist_viewer.add_data(class_summary_data)
-        student_hist_viewer.state.x_att = class_summary_data.id['age_value']
-        student_hist_viewer.state.x_axislabel = "Age (Gyr)"
-        student_hist_viewer.state.title = "My class ages (5 galaxies each)"
-        student_hist_viewer.layers[0].state.color = "#8338EC"
+        # The data for all classes is only needed by the viewers in the
+        #  second half of the stage, so it is only loaded (by a task, see
+        #  below) when the story gets close to the first of those viewers
+        all_class_data = {}
+        all_class_data_lock = Lock()
+
+        def _load_all_class_data():
+            with all_class_data_lock:
+                if not all_class_data:
+                    _fetch_all_class_data()
+            return all_class_data
+
+        def _fetch_all_class_data():
+            all_measurements, student_summaries, class_summaries = LOCAL_API.get_all_data(LOCAL_STATE)
+            all_meas = Ref(LOCAL_STATE.fields.all_measurements)
+            all_stu_summaries = Ref(LOCAL_STATE.fields.student_summaries)
+            all_cls_summaries = Ref(LOCAL_STATE.fields.class_summaries)
+            all_meas.set(all_measurements)
+            all_stu_summaries.set(student_summaries)
+            all_cls_summaries.set(class_summaries)
+
+            all_data = models_to_glue_data(all_measurements, label="All Measurements")
+            all_data = GLOBAL_STATE.value.add_or_update_data(all_data)
+
+            student_summ_data = models_to_glue_data(student_summaries, label="All Student Summaries")
+            student_summ_data = GLOBAL_STATE.value.add_or_update_data(student_summ_data)
+
+            all_class_summ_data = models_to_glue_data(class_summaries, label="All Class Summaries")
+            all_class_summ_data = GLOBAL_STATE.value.add_or_update_data(all_class_summ_data)
+
+            if len(all_data.subsets) == 0:
+                all_data.new_subset(label="class_slider_subset", alpha=1, markersize=10)
+
+            Ref(COMPONENT_STATE.fields.class_low_age).set(round(min(all_class_summ_data["age_value"])))
+            Ref(COMPONENT_STATE.fields.class_high_age).set(round(max(all_class_summ_data["age_value"])))
+
+            all_class_data.update(
+                all_data=all_data,
+                student_summ_data=student_summ_data,
+                all_class_summ_data=all_class_summ_data,
+            )
+
+        def _setup_layer_viewer(layer_viewer: HubbleScatterView):
+            layer_viewer.add_data(student_data)
+            student_layer = layer_viewer.layers[0]
+            student_layer.state.color = student_highlight_color
+            student_layer.state.size = 12
+            student_layer.state.zorder = 5
+
+            layer_viewer.ignore(lambda data: data.label == "student_slider_subset")
+            layer_viewer.add_data(class_data)
+            class_layer = layer_viewer.layers[1]
+            class_layer.state.zorder = 1
+            class_layer.state.color = "#3A86FF"
+            class_layer.state.size = 8
+            class_layer.state.visible = False
+
+            layer_viewer.state.x_att = class_data.id['est_dist_value']
+            layer_viewer.state.y_att = class_data.id['velocity_value']
+            layer_viewer.state.x_axislabel = "Distance (Mpc)"
+            layer_viewer.state.y_axislabel = "Velocity (km/s)"
+            layer_viewer.state.title = "Our Data"
+            show_layer_traces_in_legend(layer_viewer)
+            show_legend(layer_viewer, show=True)
+
+        def _setup_student_slider_viewer(student_slider_viewer: HubbleScatterView):
+            student_slider_viewer.add_data(class_data)
+            student_slider_viewer.state.x_att = class_data.id['est_dist_value']
+            student_slider_viewer.state.y_att = class_data.id['velocity_value']
+            student_slider_viewer.state.x_axislabel = "Distance (Mpc)"
+            student_slider_viewer.state.y_axislabel = "Velocity (km/s)"
+            student_slider_viewer.state.title = "My Class Data"
+            student_slider_viewer.add_subset(student_slider_subset)
+            student_slider_viewer.layers[0].state.visible = False
+            student_slider_viewer.toolbar.tools["hubble:linefit"].activate()
+            show_layer_traces_in_legend(student_slider_viewer)
+            show_legend(student_slider_viewer, show=True)
+
+        def _setup_class_slider_viewer(class_slider_viewer: HubbleScatterView):
+            all_data = _load_all_class_data()["all_data"]
+            class_slider_viewer.add_data(all_data)
+            class_slider_viewer.state.x_att = all_data.id['est_dist_value']
+            class_slider_viewer.state.y_att = all_data.id['velocity_value']
+            class_slider_viewer.state.x_axislabel = "Distance (Mpc)"
+            class_slider_viewer.state.y_axislabel = "Velocity (km/s)"
+            class_slider_viewer.state.title = "All Classes Data"
+            class_slider_viewer.layers[0].state.visible = False
+            class_slider_viewer.add_subset(all_data.subsets[0])
+            class_slider_viewer.toolbar.tools["hubble:linefit"].activate()
+            show_layer_traces_in_legend(class_slider_viewer)
+            show_legend(class_slider_viewer, show=True)
+
+        def _setup_student_hist_viewer(student_hist_viewer: HubbleHistogramView):
+            student_hist_viewer.add_data(class_summary_data)
+            student_hist_viewer.state.x_att = class_summary_data.id['age_value']
+            student_hist_viewer.state.x_axislabel = "Age (Gyr)"
+            student_hist_viewer.state.title = "My class ages (5 galaxies each)"
+            student_hist_viewer.layers[0].state.color = "#8338EC"
+            student_hist_viewer.figure.update_layout(hovermode="closest")
+            _update_bins((student_hist_viewer,))
+
+        def _setup_all_student_hist_viewer(all_student_hist_viewer: HubbleHistogramView):
+            student_summ_data = _load_all_class_data()["student_summ_data"]
+            all_student_hist_viewer.add_data(student_summ_data)
+            all_student_hist_viewer.state.x_att = student_summ_data.id['age_value']
+            all_student_hist_viewer.state.x_axislabel = "Age (Gyr)"
+            all_student_hist_viewer.state.title = "All student ages (5 galaxies each)"
+            all_student_hist_viewer.layers[0].state.color = "#FFBE0B"
+            all_student_hist_viewer.figure.update_layout(hovermode="closest")
+
+        def _setup_class_hist_viewer(class_hist_viewer: HubbleHistogramView):
+            all_class_summ_data = _load_all_class_data()["all_class_summ_data"]
+            class_hist_viewer.add_data(all_class_summ_data)
+            class_hist_viewer.state.x_att = all_class_summ_data.id['age_value']
+            class_hist_viewer.state.x_axislabel = "Age (Gyr)"
+            class_hist_viewer.state.title = "All class ages (~100 galaxies each)"
+            class_hist_viewer.layers[0].state.color = "#619EFF"
+            class_hist_viewer.figure.update_layout(hovermode="closest")
+
+            # The two histograms of all of the data share their bins, so the
+            #  class histogram always brings the student histogram with it
+            all_student_hist_viewer = viewers["all_student_hist"]
+            for att in ('x_min', 'x_max'):
+                link((all_student_hist_viewer.state, att), (class_hist_viewer.state, att))
+
+            # This looks weird, and it kinda is!
+            # The idea here is that the all students viewer will always have a wider range than the all classes viewer
+            # So we force the home tool of the class viewer to limit-resetting based on the students viewer
+            class_hist_viewer.toolbar.tools["plotly:home"].activate = all_student_hist_viewer.toolbar.tools["plotly:home"].activate
+            _update_bins((all_student_hist_viewer, class_hist_viewer))
+
+        viewers = MarkerViewers(workspace, router.path.strip("/"), {
+            "layer": LazyViewer(HubbleScatterView,
+                                ((Marker.ran_var1, Marker.fin_cla1), (Marker.cla_dat1, Marker.you_age1c)),
+                                _setup_layer_viewer),
+            "student_slider": LazyViewer(HubbleScatterView,
+                                         ((Marker.cla_res1, Marker.con_int3),),
+                                         _setup_student_slider_viewer),
+            "class_slider": LazyViewer(HubbleScatterView,
+                                       ((Marker.cla_res1c, None),),
+                                       _setup_class_slider_viewer),
+            "student_hist": LazyViewer(HubbleHistogramView,
+                                       ((Marker.age_dis1, Marker.con_int3),),
+                                       _setup_student_hist_viewer),
+            "all_student_hist": LazyViewer(HubbleHistogramView,
+                                           ((Marker.age_dis1c, None),),
+                                           _setup_all_student_hist_viewer),
+            "class_hist": LazyViewer(HubbleHistogramView,
+                                     ((Marker.age_dis1c, None),),
+                                     _setup_class_hist_viewer),
+        })
+
+        def _on_summaries_changed(msg: NumericalDataChangedMessage):
+            if msg.data.label == "Class Summaries":
+                hist_viewers = [viewers.get("student_hist")]
+            else:
+                hist_viewers = [viewers.get("all_student_hist"), viewers.get("class_hist")]
+            hist_viewers = [viewer for viewer in hist_viewers if viewer is not None]
+            if hist_viewers:
+                _update_bins(hist_viewers, msg)
 
-        all_data = models_to_glue_data(all_measurements, label="All Measurements")
-        all_data = GLOBAL_STATE.value.add_or_update_data(all_data)
+        gjapp.data_collection.hub.subscribe(gjapp.data_collection, NumericalDataChangedMessage,
+                                            handler=_on_summaries_changed,
+                                            filter=lambda msg: msg.data.label in ("Class Summaries", "All Student Summaries", "All Class Summaries"))
 
-        student_summ_data = models_to_glue_data(student_summaries, label="All Student Summaries")
-        student_summ_data = GLOBAL_STATE.value.add_or_update_data(student_summ_data)
+        data_ready.set(True)
 
-        all_class_summ_data = models_to_glue_data(class_summaries, label="All Class Summaries")
-        all_class_summ_data = GLOBAL_STATE.value.add_or_update_data(all_class_summ_data)
+        return gjapp, viewers, _load_all_class_data
 
-        if len(all_data.subsets) == 0:
-            class_slider_subset = all_data.new_subset(label="class_slider_subset", alpha=1, markersize=10)
-        else:
-            class_slider_subset = all_data.subsets[0]
-
-        class_slider_viewer.add_data(all_data)
-        class_slider_viewer.state.x_att = all_data.id['est_dist_value']
-        class_slider_viewer.state.y_att = all_data.id['velocity_value']
-        class_slider_viewer.state.x_axislabel = "Distance (Mpc)"
-        class_slider_viewer.state.y_axislabel = "Velocity (km/s)"
-        class_slider_viewer.state.title = "All Classes Data"
-        class_slider_viewer.layers[0].state.visible = False
-        class_slider_viewer.add_subset(class_slider_subset)
-        class_slider_viewer.toolbar.tools["hubble:linefit"].activate()
-        show_layer_traces_in_legend(class_slider_viewer)
-        show_legend(class_slider_viewer, show=True)        
-
-        all_student_hist_viewer.add_data(student_summ_data)
-        all_student_hist_viewer.state.x_att = student_summ_data.id['age_value']
-        all_student_hist_viewer.state.x_axislabel = "Age (Gyr)"
-        all_student_hist_viewer.state.title = "All student ages (5 galaxies each)"
-        all_student_hist_viewer.layers[0].state.color = "#FFBE0B"
-
-        class_hist_viewer.add_data(all_class_summ_data)
-        class_hist_viewer.state.x_att = all_class_summ_data.id['age_value']
-        class_hist_viewer.state.x_axislabel = "Age (Gyr)"
-        class_hist_viewer.state.title = "All class ages (~100 galaxies each)"
-        class_hist_viewer.layers[0].state.color = "#619EFF"
-
-        # This looks weird, and it kinda is!
-        # The idea here is that the all students viewer will always have a wider range than the all classes viewer
-        # So we force the home tool of the class viewer to limit-resetting based on the students viewer
-        class_hist_viewer.toolbar.tools["plotly:home"].activate = all_student_hist_viewer.toolbar.tools["plotly:home"].activate
-
-        for viewer in (student_hist_viewer, all_student_hist_viewer, class_hist_viewer):
-            viewer.figure.update_layout(hovermode="closest")
+    gjapp, viewers, load_all_class_data = solara.use_memo(glue_setup, dependencies=[])
 
-        gjapp.data_collection.hub.subscribe(gjapp.data_collection, NumericalDataChangedMessage,
-                                            handler=partial(_update_bins, two_hist_viewers),
-                                            filter=lambda msg: msg.data.label == "Student Summaries")
+    if not data_ready.value:
+        rv.ProgressCircular(
+            width=3,
+            color="primary",
+            indeterminate=True,
+            size=100,
+        )
+        return
 
-        gjapp.data_collection.hub.subscribe(gjapp.data_collection, NumericalDataChangedMessage,
-                                            handler=partial(_update_bins, [student_hist_viewer]),
-                                            filter=lambda msg: msg.data.label in ("All Student Summaries", "All Class Summaries"))
+    # The viewers for the next step, and the data for all classes if they
+    #  need it, are prepared after this render, so that they're ready by the
+    #  time the student gets there
+    async def _prepare_next_viewers():
+        current = COMPONENT_STATE.value.current_step
+        upcoming = current if current == current.last() else current.next(current)
+        if Marker.is_at_or_after(upcoming, Marker.cla_res1c):
+            load_all_class_data()
+            all_data_loaded.set(True)
+        viewers.prepare(upcoming)
 
-        data_ready.set(True)
+    solara.lab.use_task(_prepare_next_viewers, dependencies=[COMPONENT_STATE.value.current_step])
 
-        return gjapp, viewers
+    def _on_component_state_loaded(value: bool):
+        if not value:
+            return
 
-    gjapp, viewers = solara.use_memo(glue_setup, dependencies=[])
+        student_low_age = Ref(COMPONENT_STATE.fields.student_low_age)
+        student_high_age = Ref(COMPONENT_STATE.fields.student_high_age)
 
-    if not data_ready.value:
+        class_data_size = Ref(COMPONENT_STATE.fields.class_data_size)
+
+        class_summary_data = GLOBAL_STATE.value.glue_data_collection["Class Summaries"]
+        student_low_age.set(round(min(class_summary_data["age_value"])))
+        student_high_age.set(round(max(class_summary_data["age_value"])))
+        class_data_size.set(len(class_summary_data["age_value"]))
+
+        # The class ages are set when the data for all classes is loaded, but
+        #  that may have happened before the stored state was loaded
+        if "All Class Summaries" in GLOBAL_STATE.value.glue_data_collection:
+            all_class_summ_data = GLOBAL_STATE.value.glue_data_collection["All Class Summaries"]
+            Ref(COMPONENT_STATE.fields.class_low_age).set(round(min(all_class_summ_data["age_value"])))
+            Ref(COMPONENT_STATE.fields.class_high_age).set(round(max(all_class_summ_data["age_value"])))
+
+    loaded_component_state.subscribe(_on_component_state_loaded)
+
+    # A student who returns to the second half of the stage waits for the
+    #  data for all classes, which the render doesn't load itself
+    if COMPONENT_STATE.value.current_step_at_or_after(Marker.cla_res1c) and not all_data_loaded.value:
         rv.ProgressCircular(
             width=3,
             color="primary",
@@ -277,21 +382,23 @@ def Page():
         )
         return
 
-    _update_bins((viewers["all_student_hist"], viewers["class_hist"]))
-    _update_bins((viewers["student_hist"],))
+    # Only build the viewers that are shown at the current step
+    viewers.prepare(COMPONENT_STATE.value.current_step)
 
     logger.info("DATA IS READY")
 
     def show_class_data(marker):
-        if "Class Data" in GLOBAL_STATE.value.glue_data_collection:
+        layer_viewer = viewers.get("layer")
+        if layer_viewer is not None and "Class Data" in GLOBAL_STATE.value.glue_data_collection:
             class_data = GLOBAL_STATE.value.glue_data_collection["Class Data"]
-            layer = viewers["layer"].layer_artist_for_data(class_data)
+            layer = layer_viewer.layer_artist_for_data(class_data)
             layer.state.visible = Marker.is_at_or_after(marker, Marker.cla_dat1)
 
     def show_student_data(marker):
-        if "My Data" in GLOBAL_STATE.value.glue_data_collection:
+        layer_viewer = viewers.get("layer")
+        if layer_viewer is not None and "My Data" in GLOBAL_STATE.value.glue_data_collection:
             student_data = GLOBAL_STATE.value.glue_data_collection["My Data"]
-            layer = viewers["layer"].layer_artist_for_data(student_data)
+            layer = layer_viewer.layer_artist_for_data(student_data)
             layer.state.visible = Marker.is_at_or_before(marker, Marker.fin_cla1)
 
     current_step = Ref(COMPONENT_STATE.fields.current_step)
@@ -308,34 +415,12 @@ def Page():
         if not class_best_fit_clicked.value:
             class_best_fit_clicked.set(active)
 
-    line_fit_tool = viewers["layer"].toolbar.tools['hubble:linefit']
-    add_callback(line_fit_tool, 'active',  _on_best_fit_line_shown)
+    if "layer" in viewers:
+        line_fit_tool = viewers["layer"].toolbar.tools['hubble:linefit']
+        add_callback(line_fit_tool, 'active',  _on_best_fit_line_shown)
 
     StateEditor(Marker, COMPONENT_STATE, LOCAL_STATE, LOCAL_API, show_all=True)
 
-    def _on_component_state_loaded(value: bool):
-        if not value:
-            return
-
-        student_low_age = Ref(COMPONENT_STATE.fields.student_low_age)
-        student_high_age = Ref(COMPONENT_STATE.fields.student_high_age)
-
-        class_low_age = Ref(COMPONENT_STATE.fields.class_low_age)
-        class_high_age = Ref(COMPONENT_STATE.fields.class_high_age)
-
-        class_data_size = Ref(COMPONENT_STATE.fields.class_data_size)
-
-        class_summary_data = GLOBAL_STATE.value.glue_data_collection["Class Summaries"]
-        student_low_age.set(round(min(class_summary_data["age_value"])))
-        student_high_age.set(round(max(class_summary_data["age_value"])))
-        class_data_size.set(len(class_summary_data["age_value"]))
-
-        all_class_summ_data = GLOBAL_STATE.value.glue_data_collection["All Class Summaries"]
-        class_low_age.set(round(min(all_class_summ_data["age_value"])))
-        class_high_age.set(round(max(all_class_summ_data["age_value"])))
-
-    loaded_component_state.subscribe(_on_component_state_loaded)
-
     #--------------------- Row 1: OUR DATA HUBBLE VIEWER -----------------------
     if (
             COMPONENT_STATE.value.current_step_between(Marker.ran_var1, Marker.fin_cla1) \
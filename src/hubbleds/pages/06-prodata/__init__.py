@@ -15,6 +15,9 @@ from cosmicds.utils import show_legend, show_layer_traces_in_legend
 
 # hubbleds
 from hubbleds.remote import LOCAL_API
+from hubbleds.dirty_tracking import use_dirty_tracker
+from hubbleds.reference_data import add_hubble_reference_data
+from hubbleds.workspace import get_workspace
 from hubbleds.base_component_state import (
     transition_previous,
     transition_next,
@@ -34,7 +37,6 @@ from .component_state import COMPONENT_STATE, Marker
 
 # glue-jupyter
 from glue_jupyter import JupyterApplication
-from glue.core.data_factories import load_data
 
 # misc.
 from pathlib import Path
@@ -42,7 +44,7 @@ from pathlib import Path
 from glue_plotly.viewers import PlotlyBaseView
 from ...viewers import HubbleFitView
 
-from typing import Tuple, cast
+from typing import Tuple
 from ...data_management import HUBBLE_1929_DATA_LABEL, HUBBLE_KEY_DATA_LABEL
 import numpy as np
 
@@ -68,9 +70,13 @@ def Page():
     solara.Title("HubbleDS")
     # === Setup State Loading and Writing ===
     loaded_component_state = solara.use_reactive(False)
+    router = solara.use_router()
+
+    stage_changes = use_dirty_tracker(COMPONENT_STATE)
 
     async def _load_component_state():
         LOCAL_API.get_stage_state(GLOBAL_STATE, LOCAL_STATE, COMPONENT_STATE)
+        stage_changes.flushed(COMPONENT_STATE.value)
         logger.info("Finished loading component state")
         loaded_component_state.set(True)
     
@@ -80,9 +86,14 @@ def Page():
         if not loaded_component_state.value:
             return
 
-        # Listen for changes in the states and write them to the database
+        # Listen for changes in the states and write them to the database,
+        #  unless only fields that aren't stored changed
+        state = COMPONENT_STATE.value
+        if not stage_changes.dirty(state):
+            return
         res = LOCAL_API.put_stage_state(GLOBAL_STATE, LOCAL_STATE, COMPONENT_STATE)
         if res:
+            stage_changes.flushed(state)
             logger.info("Wrote stage 6 component state to database.")
         else:
             logger.info("Did not write stage 6 component state to database.")
@@ -94,9 +105,8 @@ def Page():
     def _glue_setup() -> Tuple[JupyterApplication, HubbleFitView]:
         # NOTE: use_memo has to be part of the main page render. Including it
         #  in a conditional will result in an error.
-        gjapp = JupyterApplication(
-            GLOBAL_STATE.value.glue_data_collection, GLOBAL_STATE.value.glue_session
-        )
+        workspace = get_workspace(GLOBAL_STATE)
+        gjapp = workspace.app
         
         
         def add_link(from_dc_name, from_att, to_dc_name, to_att):
@@ -105,11 +115,7 @@ def Page():
                 gjapp.add_link(from_dc, from_att, to_dc, to_att)
 
 
-        data_dir = Path(__file__).parent.parent.parent / "data"
-        if HUBBLE_KEY_DATA_LABEL not in gjapp.data_collection:
-            gjapp.data_collection.append(load_data(data_dir / f"{HUBBLE_KEY_DATA_LABEL}.csv"))
-        if HUBBLE_1929_DATA_LABEL not in gjapp.data_collection:
-            gjapp.data_collection.append(load_data(data_dir / f"{HUBBLE_1929_DATA_LABEL}.csv"))
+        add_hubble_reference_data(gjapp.data_collection)
         
         if len(LOCAL_STATE.value.class_measurements) == 0:
             class_measurements = LOCAL_API.get_class_measurements(GLOBAL_STATE, LOCAL_STATE)
@@ -129,11 +135,13 @@ def Page():
         add_link(HUBBLE_1929_DATA_LABEL, 'Distance (Mpc)', 'Class Data', 'est_dist_value')
         add_link(HUBBLE_1929_DATA_LABEL, 'Tweaked Velocity (km/s)', 'Class Data', 'velocity_value')
 
-        viewer = cast(HubbleFitView, gjapp.new_data_viewer(HubbleFitView, show=False))
-        viewer.state.title = "Professional Data"
-        viewer.figure.update_xaxes(showline=True, mirror=False)
-        viewer.figure.update_yaxes(showline=True, mirror=False)
-        viewer.ignore(lambda data: data.label == "student_slider_subset")
+        def _setup_viewer(viewer: HubbleFitView):
+            viewer.state.title = "Professional Data"
+            viewer.figure.update_xaxes(showline=True, mirror=False)
+            viewer.figure.update_yaxes(showline=True, mirror=False)
+            viewer.ignore(lambda data: data.label == "student_slider_subset")
+
+        viewer = workspace.viewer(router.path.strip("/"), "prodata", HubbleFitView, setup=_setup_viewer)
         
         return gjapp, viewer
     
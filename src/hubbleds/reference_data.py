@@ -0,0 +1,222 @@
+from pathlib import Path
+from threading import Lock
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+import numpy as np
+from glue.core import Data, DataCollection
+from glue.core.component import CategoricalComponent, Component
+from glue.core.data_factories import load_data
+from solara import Reactive
+
+from cosmicds.logger import setup_logger
+from hubbleds.data_management import (
+    EXAMPLE_GALAXY_SEED_DATA,
+    HUBBLE_1929_DATA_LABEL,
+    HUBBLE_KEY_DATA_LABEL,
+)
+from hubbleds.remote import LOCAL_API
+
+logger = setup_logger("REFERENCE_DATA")
+
+__all__ = [
+    "REFERENCE_DATA_DIR",
+    "ReferenceData",
+    "add_example_seed_data",
+    "add_hubble_reference_data",
+    "add_reference_data",
+    "clear_reference_data",
+    "get_reference_data",
+    "load_reference_csv",
+    "reference_array_ids",
+    "reference_data_nbytes",
+    "seed_data_from_records",
+]
+
+REFERENCE_DATA_DIR = Path(__file__).parent / "data"
+
+SEED_DATA_SPLITS = ("first", "second")
+
+
+def _share_component(component: Component) -> Component:
+    # A new component around the same (read-only) arrays, so that every
+    #  session can jitter or replace its own components independently
+    if isinstance(component, CategoricalComponent):
+        return CategoricalComponent(
+            component.data, categories=component.categories, units=component.units
+        )
+    return Component(component.data, units=component.units)
+
+
+class ReferenceData:
+    """
+    An immutable dataset shared by every session in the process.
+
+    The component arrays are made read-only when the dataset is registered,
+    and each session gets its own glue `Data` from `to_data`. The wrappers
+    share the arrays of the reference dataset, but have their own component
+    IDs, styles, links and subsets.
+    """
+
+    def __init__(self, data: Data):
+        self.label = data.label
+        self.components: Tuple[Tuple[str, Component], ...] = tuple(
+            (cid.label, data.get_component(cid)) for cid in data.main_components
+        )
+        for _, component in self.components:
+            if isinstance(component.data, np.ndarray):
+                component.data.setflags(write=False)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(component.data.nbytes for _, component in self.components)
+
+    def to_data(self, label: Optional[str] = None) -> Data:
+        """A new glue `Data` for a session, backed by the shared arrays."""
+        return Data(
+            label=label or self.label,
+            **{name: _share_component(component) for name, component in self.components},
+        )
+
+
+_REFERENCE_DATA: Dict[Hashable, ReferenceData] = {}
+_LOAD_LOCKS: Dict[Hashable, Lock] = {}
+_REGISTRY_LOCK = Lock()
+
+
+def get_reference_data(
+    key: Hashable,
+    loader: Callable[[], Data],
+) -> ReferenceData:
+    """
+    The reference dataset registered under ``key``, which is loaded with
+    ``loader`` the first time it is requested in this process. Concurrent
+    requests for the same key wait for a single load.
+    """
+    reference = _REFERENCE_DATA.get(key)
+    if reference is not None:
+        return reference
+
+    with _REGISTRY_LOCK:
+        lock = _LOAD_LOCKS.setdefault(key, Lock())
+    with lock:
+        reference = _REFERENCE_DATA.get(key)
+        if reference is None:
+            logger.info("Loading reference data `%s`.", key)
+            reference = ReferenceData(loader())
+            _REFERENCE_DATA[key] = reference
+        return reference
+
+
+def clear_reference_data():
+    """Forget every registered reference dataset."""
+    with _REGISTRY_LOCK:
+        _REFERENCE_DATA.clear()
+        _LOAD_LOCKS.clear()
+
+
+def reference_array_ids() -> set:
+    """The IDs of the arrays of every registered reference dataset."""
+    return {
+        id(component.data)
+        for reference in list(_REFERENCE_DATA.values())
+        for _, component in reference.components
+    }
+
+
+def reference_data_nbytes() -> int:
+    """The size of the arrays of every registered reference dataset."""
+    return sum(reference.nbytes for reference in list(_REFERENCE_DATA.values()))
+
+
+def add_reference_data(
+    data_collection: DataCollection,
+    key: Hashable,
+    loader: Callable[[], Data],
+    label: Optional[str] = None,
+) -> Data:
+    """
+    Add a session's wrapper of the reference dataset ``key`` to
+    ``data_collection``, unless data with its label is already there.
+
+    Returns
+    ----------
+    data: Data
+        The data in the collection with the label of the dataset
+    """
+    reference = get_reference_data(key, loader)
+    label = label or reference.label
+    if label not in data_collection:
+        data_collection.append(reference.to_data(label))
+    return data_collection[label]
+
+
+def load_reference_csv(label: str) -> Data:
+    """Load one of the CSV files shipped in the package data directory."""
+    return load_data(REFERENCE_DATA_DIR / f"{label}.csv")
+
+
+def seed_data_from_records(records: List[Dict[str, Any]]) -> Dict[str, Data]:
+    """
+    Build the example galaxy seed data, and its first and second
+    measurement splits, from the seed measurement records.
+
+    Returns
+    ----------
+    data: dict
+        The seed data and its splits, by label
+    """
+    columns = {k: np.asarray([r[k] for r in records]) for k in records[0].keys()}
+    numbers = columns["measurement_number"]
+
+    data = {EXAMPLE_GALAXY_SEED_DATA: Data(label=EXAMPLE_GALAXY_SEED_DATA, **columns)}
+    for split in SEED_DATA_SPLITS:
+        label = f"{EXAMPLE_GALAXY_SEED_DATA}_{split}"
+        mask = numbers == split
+        data[label] = Data(label=label, **{k: v[mask] for k, v in columns.items()})
+    return data
+
+
+def add_example_seed_data(
+    data_collection: DataCollection,
+    local_state: Reactive,
+) -> Tuple[Data, Data, Data]:
+    """
+    Add the example galaxy seed data and its first and second measurement
+    splits to a session's data collection. The seed measurements are only
+    fetched once per story in the process.
+
+    Returns
+    ----------
+    data, first, second: Data
+        The session's seed data and splits
+    """
+    story_id = local_state.value.story_id
+    cached: Dict[str, Data] = {}
+
+    def _load(label):
+        def _loader():
+            if not cached:
+                records = LOCAL_API.get_example_seed_measurement(local_state, which="both")
+                cached.update(seed_data_from_records(records))
+            return cached[label]
+        return _loader
+
+    labels = [EXAMPLE_GALAXY_SEED_DATA] + [
+        f"{EXAMPLE_GALAXY_SEED_DATA}_{split}" for split in SEED_DATA_SPLITS
+    ]
+    data, first, second = (
+        add_reference_data(data_collection, (story_id, label), _load(label))
+        for label in labels
+    )
+    return data, first, second
+
+
+def add_hubble_reference_data(data_collection: DataCollection) -> Tuple[Data, Data]:
+    """
+    Add the HST Key Project and Hubble (1929) datasets to a session's data
+    collection.
+    """
+    return tuple(
+        add_reference_data(data_collection, label, lambda label=label: load_reference_csv(label))
+        for label in (HUBBLE_KEY_DATA_LABEL, HUBBLE_1929_DATA_LABEL)
+    )
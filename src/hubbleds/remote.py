@@ -1,9 +1,15 @@
 from cosmicds.utils import CDSJSONEncoder
 from hubbleds.state import ClassSummary, StudentMeasurement, StudentSummary
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import closing
 from io import BytesIO
 import json
-from astropy.io import fits
+import re
+import tarfile
+from threading import Lock
+import zipfile
+from hubbleds.coadd_reader import read_coadd_spectrum, read_coadd_spectrum_astropy
 from hubbleds.state import GalaxyData, SpectrumData, LocalState
 from cosmicds.remote import BaseAPI
 from cosmicds.state import GlobalState, BaseState, GLOBAL_STATE
@@ -18,16 +24,157 @@ from csv import DictReader
 
 logger = setup_logger("API")
 
-from .data_management import DB_VELOCITY_FIELD
-from numpy.random import Generator, PCG64, SeedSequence
-from numpy import arange, asarray, ravel, column_stack
-from typing import Any
+from .api_metrics import InstrumentedSession, instrumented
+from .example_seed import load_example_seed_artifact, select_example_seed
+from .transport import PooledTransport
+from .write_journal import WRITE_JOURNAL_ENV, JournalEntry, WriteJournal
+from os import getenv
+from typing import Any, Optional
 
 ELEMENT_REST = {"H-α": 6562.79, "Mg-I": 5176.7}
 DEBOUNCE_TIMEOUT = 1
 
+SPECTRUM_TYPE_FOLDERS = {"Sp": "spiral", "E": "elliptical", "Ir": "irregular"}
+SPECTRUM_CACHE_SIZE = 128
+SPECTRUM_FETCH_WORKERS = 6
+
+# The endpoints of the writes that are journaled, each of which is
+#  followed in the URL by the student
+_STUDENT_WRITE_ENDPOINTS = "(story-state|stage-state|submit-measurement|sample-measurement)"
+
+
+def unpack_spectrum_bundle(content: bytes) -> dict[str, bytes]:
+    """
+    Unpack a tar (optionally compressed) or zip archive of spectrum files
+    into a mapping of archive path to file contents.
+    """
+    with closing(BytesIO(content)) as f:
+        if zipfile.is_zipfile(f):
+            with zipfile.ZipFile(f) as archive:
+                return {
+                    info.filename: archive.read(info)
+                    for info in archive.infolist() if not info.is_dir()
+                }
+
+        f.seek(0)
+        with tarfile.open(fileobj=f, mode="r:*") as archive:
+            return {
+                member.name.removeprefix("./"): archive.extractfile(member).read()
+                for member in archive.getmembers() if member.isfile()
+            }
+
 
 class LocalAPI(BaseAPI):
+    _spectrum_bundle_supported = True
+    _spectrum_lock = Lock()
+    _example_seed_cache: dict[str, list[dict[str, Any]]] = {}
+    _example_seed_lock = Lock()
+
+    _write_journal: Optional[WriteJournal] = None
+    _write_journal_lock = Lock()
+
+    @cached_property
+    def request_session(self) -> InstrumentedSession:
+        # Every session of the worker shares this API, so its requests go
+        #  through a bounded pool (see `PooledTransport`)
+        return InstrumentedSession(PooledTransport(BaseAPI.request_session.func(self)))
+
+    def start_write_journal(self) -> Optional[WriteJournal]:
+        """
+        Open the journal of this worker's writes (see `WriteJournal`) if
+        `WRITE_JOURNAL_ENV` is set, and start sending its writes, beginning
+        with those that weren't sent before a restart. The journal is only
+        opened once, however many threads call this.
+
+        Returns
+        ----------
+        journal: WriteJournal or None
+            The journal, or None if writes are sent to the API directly
+        """
+        with self._write_journal_lock:
+            if self._write_journal is None:
+                path = getenv(WRITE_JOURNAL_ENV)
+                if not path:
+                    return None
+                journal = WriteJournal(path)
+                journal.start(self._send_journal_entry)
+                self._write_journal = journal
+            return self._write_journal
+
+    @property
+    def write_journal(self) -> Optional[WriteJournal]:
+        return self.start_write_journal()
+
+    def _send_student_writes(self, student_id: int) -> bool:
+        """
+        Send the journaled writes of ``student_id`` that weren't sent yet,
+        so that a read of their state doesn't miss them.
+
+        Returns
+        ----------
+        done: bool
+            Whether none of their writes are left unsent
+        """
+        journal = self.write_journal
+        if journal is None:
+            return True
+        # Every journal key has the student right after its endpoint (see
+        #  the `put_*` methods)
+        pattern = re.compile(rf"/{_STUDENT_WRITE_ENDPOINTS}/{student_id}/")
+        done = journal.replay(
+            self._send_journal_entry, where=lambda entry: pattern.search(entry.key) is not None
+        )
+        if not done:
+            logger.warning("Reading the state of student `%s` before all of their writes were sent.", student_id)
+        return done
+
+    @instrumented
+    def get_app_story_states(
+        self, global_state: Reactive[GlobalState], local_state: Reactive[LocalState]
+    ):
+        self._send_student_writes(global_state.value.student.id)
+        return BaseAPI.get_app_story_states(self, global_state, local_state)
+
+    @instrumented
+    def get_stage_state(
+        self,
+        global_state: Reactive[GlobalState],
+        local_state: Reactive[LocalState],
+        component_state: Reactive[BaseState],
+    ):
+        self._send_student_writes(global_state.value.student.id)
+        return BaseAPI.get_stage_state(self, global_state, local_state, component_state)
+
+    def _send_journal_entry(self, entry: JournalEntry) -> int:
+        r = self.request_session.request(
+            entry.method, entry.url, data=entry.body, headers=entry.headers
+        )
+        return r.status_code
+
+    def _put(self, url: str, payload: Any = None, data: Optional[str] = None, key: Optional[str] = None) -> bool:
+        """
+        Write ``payload`` (or the JSON text ``data``) to ``url``. With a
+        write journal, the write is acknowledged once it is journaled and
+        replaces the unsent write of the same ``key`` (by default, the URL).
+
+        Returns
+        ----------
+        success: bool
+            Whether the write was journaled or accepted by the API
+        """
+        body = (data if data is not None else json.dumps(payload)).encode()
+        headers = {"Content-Type": "application/json"}
+        if self.write_journal is not None:
+            self.write_journal.append(key or url, "PUT", url, body, headers)
+            return True
+
+        r = self.request_session.put(url, headers=headers, data=body)
+        if r.status_code != 200:
+            logger.error("PUT %s failed with status %d: %s", url, r.status_code, r.text)
+            return False
+        return True
+
+    @instrumented
     def get_galaxies(self, local_state: Reactive[LocalState]) -> list[GalaxyData]:
         galaxy_data_json = self.request_session.get(
             f"{self.API_URL}/{local_state.value.story_id}/galaxies?types=Sp"
@@ -37,39 +184,158 @@ class LocalAPI(BaseAPI):
 
         return galaxy_data
 
-    def load_spectrum_data(
-        self, gal_data: GalaxyData, local_state: Reactive[LocalState]
-    ) -> SpectrumData | None:
+    @cached_property
+    def spectrum_cache(self) -> OrderedDict[str, SpectrumData]:
+        return OrderedDict()
+
+    @staticmethod
+    def _spectrum_path(gal_data: GalaxyData) -> str:
         file_name = f"{gal_data.name.replace('.fits', '')}.fits"
+        folder = SPECTRUM_TYPE_FOLDERS[gal_data.type]
+        return f"{folder}/{file_name}"
+
+    def _cache_spectrum(self, path: str, spec_data: SpectrumData):
+        with self._spectrum_lock:
+            self.spectrum_cache[path] = spec_data
+            self.spectrum_cache.move_to_end(path)
+            while len(self.spectrum_cache) > SPECTRUM_CACHE_SIZE:
+                self.spectrum_cache.popitem(last=False)
+
+    def _cached_spectrum(self, path: str) -> SpectrumData | None:
+        with self._spectrum_lock:
+            spec_data = self.spectrum_cache.get(path)
+            if spec_data is not None:
+                self.spectrum_cache.move_to_end(path)
+            return spec_data
+
+    def _parse_spectrum(
+        self, gal_data: GalaxyData, content: bytes
+    ) -> SpectrumData | None:
+        try:
+            wave, flux, ivar = read_coadd_spectrum(content)
+        except KeyError:
+            logger.error("No extension named 'COADD' in spectrum file.")
+            return
+        except ValueError:
+            logger.warning(
+                "Could not parse spectrum `%s` directly, falling back to astropy.",
+                gal_data.name,
+            )
+            try:
+                wave, flux, ivar = read_coadd_spectrum_astropy(
+                    content, name=gal_data.name
+                )
+            except KeyError:
+                logger.error("No extension named 'COADD' in spectrum file.")
+                return
 
-        type_folders = {"Sp": "spiral", "E": "elliptical", "Ir": "irregular"}
-        folder = type_folders[gal_data.type]
-        url = (
-            f"{self.API_URL}/{local_state.value.story_id}/spectra/{folder}/{file_name}"
+        return SpectrumData(
+            name=gal_data.name,
+            wave=wave,
+            flux=flux,
+            ivar=ivar,
         )
-        response = self.request_session.get(url)
 
-        with closing(BytesIO(response.content)) as f:
-            f.name = gal_data.name
+    @instrumented(cached=True)
+    def load_spectrum_data(
+        self, gal_data: GalaxyData, local_state: Reactive[LocalState]
+    ) -> SpectrumData | None:
+        path = self._spectrum_path(gal_data)
+        spec_data = self._cached_spectrum(path)
+        if spec_data is not None:
+            return spec_data
 
-            with fits.open(f) as hdulist:
-                data = hdulist["COADD"].data if "COADD" in hdulist else None
+        url = f"{self.API_URL}/{local_state.value.story_id}/spectra/{path}"
+        response = self.request_session.get(url)
 
-        if data is None:
-            logger.error("No extension named 'COADD' in spectrum file.")
+        spec_data = self._parse_spectrum(gal_data, response.content)
+        if spec_data is None:
             return
 
-        spec_data = SpectrumData(
-            name=gal_data.name,
-            wave=10 ** data["loglam"],
-            flux=data["flux"],
-            ivar=data["ivar"],
-        )
+        self._cache_spectrum(path, spec_data)
 
         logger.info("Loaded spectrum data for galaxy `%s` from database.", gal_data.id)
 
         return spec_data
 
+    def _get_spectrum_bundle(
+        self, paths: list[str], local_state: Reactive[LocalState]
+    ) -> dict[str, bytes] | None:
+        if not self._spectrum_bundle_supported:
+            return None
+
+        r = self.request_session.post(
+            f"{self.API_URL}/{local_state.value.story_id}/spectra/bundle",
+            json={"files": paths},
+            headers={"Accept": "application/x-tar, application/zip"},
+        )
+
+        if r.status_code in (404, 405, 501):
+            logger.info(
+                "Spectrum bundle endpoint not available; using single fetches."
+            )
+            self._spectrum_bundle_supported = False
+            return None
+        elif r.status_code != 200:
+            logger.warning("Failed to fetch spectrum bundle: %s", r.status_code)
+            return None
+
+        try:
+            return unpack_spectrum_bundle(r.content)
+        except (tarfile.TarError, zipfile.BadZipFile) as e:
+            logger.warning("Could not unpack spectrum bundle: %s", e)
+            return None
+
+    @instrumented(cached=True)
+    def load_spectra(
+        self, galaxies: list[GalaxyData], local_state: Reactive[LocalState]
+    ) -> dict[int, SpectrumData]:
+        """
+        Load the spectra for several galaxies at once, filling the spectrum
+        cache. Spectra that are not yet cached are requested from the server
+        as a single archive, falling back to concurrent single fetches if
+        the server does not provide the bundle endpoint.
+        """
+        paths = {gal.id: self._spectrum_path(gal) for gal in galaxies}
+        missing = {
+            gal.id: gal for gal in galaxies
+            if self._cached_spectrum(paths[gal.id]) is None
+        }
+
+        if missing:
+            contents = self._get_spectrum_bundle(
+                sorted({paths[i] for i in missing}), local_state
+            ) or {}
+
+            for gal_id, gal in list(missing.items()):
+                content = contents.get(paths[gal_id])
+                if content is None:
+                    continue
+                spec_data = self._parse_spectrum(gal, content)
+                if spec_data is not None:
+                    self._cache_spectrum(paths[gal_id], spec_data)
+                    del missing[gal_id]
+
+            if contents:
+                logger.info("Loaded %d spectra from bundle.", len(contents))
+
+        if missing:
+            with ThreadPoolExecutor(
+                max_workers=min(SPECTRUM_FETCH_WORKERS, len(missing))
+            ) as executor:
+                list(executor.map(
+                    lambda gal: self.load_spectrum_data(gal, local_state),
+                    missing.values(),
+                ))
+
+        spectra = {}
+        for gal in galaxies:
+            spec_data = self._cached_spectrum(paths[gal.id])
+            if spec_data is not None:
+                spectra[gal.id] = spec_data
+
+        return spectra
+
     def get_dummy_data(self) -> List[StudentMeasurement]:
         path = (Path(__file__).parent / "data" / "dummy_student_data.csv").as_posix()
         measurements = []
@@ -89,6 +355,7 @@ class LocalAPI(BaseAPI):
                 measurements.append(StudentMeasurement(**measurement))
         return measurements
 
+    @instrumented
     def get_measurements(
         self, global_state: Reactive[GlobalState], local_state: Reactive[LocalState]
     ) -> list[StudentMeasurement]:
@@ -96,6 +363,7 @@ class LocalAPI(BaseAPI):
             f"{self.API_URL}/{local_state.value.story_id}/measurements/"
             f"{global_state.value.student.id}"
         )
+        self._send_student_writes(global_state.value.student.id)
         r = self.request_session.get(url)
             
         measurements = Ref(local_state.fields.measurements)
@@ -116,9 +384,11 @@ class LocalAPI(BaseAPI):
 
         return measurements.value
 
+    @instrumented
     def get_sample_measurements(
         self, global_state: Reactive[GlobalState], local_state: Reactive[LocalState]
     ) -> list[StudentMeasurement]:
+        self._send_student_writes(global_state.value.student.id)
         r = self.request_session.get(
             f"{self.API_URL}/{local_state.value.story_id}/sample-"
             f"measurements/{global_state.value.student.id}"
@@ -167,6 +437,7 @@ class LocalAPI(BaseAPI):
 
         return sample_measurements.value
 
+    @instrumented
     def put_measurements(
         self, global_state: Reactive[GlobalState], local_state: Reactive[LocalState]
     ):  
@@ -178,9 +449,8 @@ class LocalAPI(BaseAPI):
         url = f"{self.API_URL}/{local_state.value.story_id}/submit-measurement/"
 
         for measurement in local_state.value.measurements:
-            r = self.request_session.put(url, json=measurement.dict(exclude={"galaxy"}))
-
-            if r.status_code != 200:
+            key = f"{url}{measurement.student_id}/{measurement.galaxy_id}"
+            if not self._put(url, measurement.dict(exclude={"galaxy"}), key=key):
                 logger.warning(
                     f"Failed to add measurement for galaxy `%s` by student `%s`.",
                     global_state.value.student.id,
@@ -193,6 +463,7 @@ class LocalAPI(BaseAPI):
         )
         return True
 
+    @instrumented
     def put_sample_measurements(
         self, global_state: Reactive[GlobalState], local_state: Reactive[LocalState]
     ):
@@ -210,9 +481,8 @@ class LocalAPI(BaseAPI):
                     global_state.value.student.id,
                 )
 
-            r = self.request_session.put(url, json=measurement.dict(exclude={"galaxy"}))
-
-            if r.status_code != 200:
+            key = f"{url}{measurement.student_id}/{measurement.galaxy_id}/{measurement.measurement_number}"
+            if not self._put(url, measurement.dict(exclude={"galaxy"}), key=key):
                 logger.warning(
                     f"Failed to add example measurement for galaxy `%s` by student `%s`.",
                     measurement.galaxy_id,
@@ -225,6 +495,7 @@ class LocalAPI(BaseAPI):
             )
         return True
 
+    @instrumented
     def get_measurement(
         self,
         galaxy_id: int,
@@ -248,6 +519,7 @@ class LocalAPI(BaseAPI):
 
         return measurement
 
+    @instrumented
     def get_sample_measurement(
         self,
         galaxy_id: int,
@@ -272,6 +544,7 @@ class LocalAPI(BaseAPI):
 
         return measurement
 
+    @instrumented
     def delete_all_measurements(
         self, global_state: Reactive[GlobalState], local_state: Reactive[LocalState]
     ):
@@ -291,6 +564,7 @@ class LocalAPI(BaseAPI):
                 )
                 logger.error(r.text)
 
+    @instrumented
     def get_sample_galaxy(self, local_state: Reactive[LocalState]) -> GalaxyData:
         galaxy_json = self.request_session.get(
             f"{self.API_URL}/{local_state.value.story_id}/sample-galaxy"
@@ -300,6 +574,7 @@ class LocalAPI(BaseAPI):
 
         return galaxy_data
 
+    @instrumented
     def get_class_measurements(
         self,
         global_state: Reactive[GlobalState],
@@ -326,6 +601,7 @@ class LocalAPI(BaseAPI):
 
         return measurements.value
 
+    @instrumented
     def get_all_data(
         self,
         local_state: Reactive[LocalState],
@@ -364,6 +640,7 @@ class LocalAPI(BaseAPI):
 
         return measurements.value, student_summaries.value, class_summaries.value
 
+    @instrumented
     def put_stage_state(
         self,
         global_state: Reactive[GlobalState],
@@ -383,19 +660,28 @@ class LocalAPI(BaseAPI):
             {"current_step": component_state.value.current_step.value}
         )
 
-        r = self.request_session.put(
+        url = (
             f"{self.API_URL}/stage-state/{global_state.value.student.id}/"
-            f"{local_state.value.story_id}/{component_state.value.stage_id}",
-            json=comp_state_dict,
+            f"{local_state.value.story_id}/{component_state.value.stage_id}"
         )
-
-        if r.status_code != 200:
+        if not self._put(url, comp_state_dict):
             logger.error("Failed to write story state to database.")
-            logger.error(r.text)
             return False
         
         return True
 
+    @staticmethod
+    def _story_state_json(
+        global_state: Reactive[GlobalState],
+        local_state: Reactive[LocalState],
+    ) -> str:
+        state = {
+            "app": global_state.value.model_dump(),
+            "story": local_state.value.as_dict(),
+        }
+        return json.dumps(state, cls=CDSJSONEncoder)
+
+    @instrumented
     def put_story_state(
         self,
         global_state: Reactive[GlobalState],
@@ -407,59 +693,49 @@ class LocalAPI(BaseAPI):
         
         logger.info("Serializing state into DB.")
 
-        state = {
-            "app": global_state.value.model_dump(),
-            "story": local_state.value.as_dict(),
-        }
-
-        state_json = json.dumps(state, cls=CDSJSONEncoder)
-        r = self.request_session.put(
-            f"{self.API_URL}/story-state/{global_state.value.student.id}/{local_state.value.story_id}",
-            headers={"Content-Type": "application/json"},
-            data=state_json,
-        )
-
-        if r.status_code != 200:
+        state_json = self._story_state_json(global_state, local_state)
+        url = f"{self.API_URL}/story-state/{global_state.value.student.id}/{local_state.value.story_id}"
+        if not self._put(url, data=state_json):
             logger.error("Failed to write story state to database.")
-            logger.error(r.text)
             return False
         
         return True
 
 
+    @instrumented
+    def get_sample_measurements_json(self, story_id: str) -> list[dict[str, Any]]:
+        url = f"{self.API_URL}/{story_id}/sample-measurements"
+        r = self.request_session.get(url)
+        return r.json()
+
+    def _example_seed_measurements(self, story_id: str) -> list[dict[str, Any]]:
+        with self._example_seed_lock:
+            measurements = self._example_seed_cache.get(story_id)
+            if measurements is not None:
+                return measurements
+
+            # The selection is fixed, so prefer the precomputed seed
+            #  measurements over downloading every sample measurement
+            measurements = load_example_seed_artifact(story_id)
+            if measurements is None:
+                logger.info("No example seed artifact for `%s`, selecting from sample measurements.", story_id)
+                _, measurements = select_example_seed(self.get_sample_measurements_json(story_id))
+
+            self._example_seed_cache[story_id] = measurements
+            return measurements
+
+    @instrumented(cached=True)
     def get_example_seed_measurement(
             self, 
             local_state: Reactive[LocalState],
             which="both"
             ) -> list[dict[str, Any]]:
-        url = f"{self.API_URL}/{local_state.value.story_id}/sample-measurements"
-        r = self.request_session.get(url)
-        res_json = r.json()
-        
-        
         # TODO: Note that though this is from the old code
         # it seems to only pick the 2nd measurement
-        vels = [record[DB_VELOCITY_FIELD] for record in res_json]
-        good = [(vel is not None and vel > 0) for vel in vels]
-        seq = SeedSequence(42)
-        gen = Generator(PCG64(seq))
-        indices = arange(len(good))
-        indices = indices[1::2][:85] # we need to keep the first 85 so that it always selects the same galaxies "randomly"
-        random_subset = gen.choice(indices[good[1::2][:85]], size=40, replace=False)
-        random_subset = ravel(column_stack((random_subset, random_subset+1)))
-        # This is the subset
-        # [121 122  13  14 159 160  23  24 161 162 137 138 111 112 155 156  69  70
-        #     75  76  81  82  11  12 129 130  93  94  99 100  17  18  37  38 169 170
-        #     67  68 107 108 119 120  65  66  45  46 141 142  73  74 165 166  85  86
-        #     59  60  87  88  27  28 109 110  51  52  47  48  97  98  89  90  63  64
-        #     91  92 143 144 149 150 103 104]
-        measurements = []
-
-        _filter_func = lambda x: res_json[x]['measurement_number'] == which
-        filtered = filter(_filter_func, random_subset) if which != 'both' else random_subset
-        for i in filtered:
-            measurements.append(res_json[i])
-
-        return measurements
+        # See `hubbleds.example_seed` for the selection
+        measurements = self._example_seed_measurements(local_state.value.story_id)
+        if which == 'both':
+            return list(measurements)
+        return [m for m in measurements if m['measurement_number'] == which]
 
 LOCAL_API = LocalAPI()
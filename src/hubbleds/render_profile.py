@@ -0,0 +1,281 @@
+import sys
+import threading
+import time
+from collections import defaultdict
+from functools import wraps
+from typing import Callable, Dict, List, Optional, Tuple
+
+from reacton.core import ComponentFunction
+from solara.toestand import Reactive, ReactiveField
+
+from cosmicds.logger import setup_logger
+
+logger = setup_logger("RENDER_PROFILE")
+
+__all__ = [
+    "RENDER_PROFILE_ENV",
+    "RENDER_PROFILER",
+    "RenderProfiler",
+    "RenderStats",
+]
+
+# Setting this profiles the renders of every session, and logs the report
+#  of a session when it closes
+RENDER_PROFILE_ENV = "HUBBLEDS_RENDER_PROFILE"
+
+# Components and reactive variables are profiled if they are defined in
+#  modules under these packages
+PROFILED_PACKAGES = ("hubbleds", "cosmicds")
+
+# The trigger of renders that no reactive variable caused, such as the
+#  first render of a page or a change of a component's own state
+NO_TRIGGER = "(mount or component state)"
+NO_SESSION = "(no session)"
+COMPONENT_REACTIVE = "(component reactive)"
+
+REPORT_TOP = 15
+
+
+class RenderStats:
+    __slots__ = ("count", "total", "max")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds: float):
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def merge(self, other: "RenderStats"):
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+
+
+def _in_packages(module: Optional[str], packages: Tuple[str, ...]) -> bool:
+    return module is not None and module.split(".", 1)[0] in packages
+
+
+def _short_name(module: str, name: str) -> str:
+    # e.g. `01-spectra-&-velocity.Page` or `spectrum_viewer.SpectrumViewer`
+    return f"{module.rsplit('.', 1)[-1]}.{name}"
+
+
+def _current_session() -> str:
+    from solara.server import kernel_context
+
+    try:
+        return kernel_context.get_current_context().id
+    except RuntimeError:
+        return NO_SESSION
+
+
+class RenderProfiler:
+    """
+    Counts and times the renders of solara components, by session, by
+    component and by the reactive variable whose change triggered them.
+
+    Each render of a component is timed from the call of its function, so
+    the times are of the component's own body; its children are timed as
+    renders of their own. A change of a reactive variable is the trigger of
+    every render that happens while the change is being set, and changes of
+    a field are reported as the field, e.g. ``LOCAL_STATE.measurements``.
+
+    While installed, the profiler replaces the function attribute of every
+    `ComponentFunction` and the ``set`` of solara's reactive variables, so
+    it is meant for debugging and load tests only.
+    """
+
+    def __init__(self, packages: Tuple[str, ...] = PROFILED_PACKAGES):
+        self.packages = packages
+        self.installed = False
+        self._stats: Dict[Tuple[str, str, str], RenderStats] = defaultdict(RenderStats)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._reactive_names: Dict[int, str] = {}
+        self._scanned_modules = 0
+        self._originals: Dict[type, Callable] = {}
+
+    # Installation
+
+    def install(self):
+        if self.installed:
+            return
+        profiler = self
+
+        def get_f(component: ComponentFunction):
+            f = component.__dict__["f"]
+            if not _in_packages(getattr(f, "__module__", None), profiler.packages):
+                return f
+            profiled = component.__dict__.get("_profiled_f")
+            if profiled is None or profiled.__wrapped__ is not f:
+                profiled = profiler._profiled(f, _short_name(f.__module__, f.__name__))
+                component.__dict__["_profiled_f"] = profiled
+            return profiled
+
+        def set_f(component: ComponentFunction, f: Callable):
+            component.__dict__["f"] = f
+
+        # A property takes precedence over the instance attribute, so the
+        #  render loop gets the timed function of components that were
+        #  created before or after the profiler was installed
+        ComponentFunction.f = property(get_f, set_f)
+
+        for cls in (Reactive, ReactiveField):
+            self._originals[cls] = cls.__dict__["set"]
+            cls.set = self._triggering(cls.__dict__["set"])
+
+        self.installed = True
+        logger.info("Profiling component renders.")
+
+    def uninstall(self):
+        if not self.installed:
+            return
+        del ComponentFunction.f
+        for cls, original in self._originals.items():
+            cls.set = original
+        self._originals.clear()
+        self.installed = False
+
+    def _profiled(self, f: Callable, name: str) -> Callable:
+        profiler = self
+
+        @wraps(f)
+        def render(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return f(*args, **kwargs)
+            finally:
+                profiler._record(name, time.perf_counter() - start)
+
+        return render
+
+    def _triggering(self, set_value: Callable) -> Callable:
+        profiler = self
+
+        @wraps(set_value)
+        def set(reactive, value):
+            if getattr(profiler._local, "trigger", None) is not None:
+                return set_value(reactive, value)
+            profiler._local.trigger = profiler.reactive_name(reactive)
+            try:
+                return set_value(reactive, value)
+            finally:
+                profiler._local.trigger = None
+
+        return set
+
+    def _record(self, component: str, seconds: float):
+        trigger = getattr(self._local, "trigger", None) or NO_TRIGGER
+        key = (_current_session(), component, trigger)
+        with self._lock:
+            self._stats[key].add(seconds)
+
+    # Names of reactive variables
+
+    def _scan_modules(self):
+        # Module-level reactive variables are named after the module that
+        #  they are found in with the shortest name, which is usually the
+        #  one that defines them or the page that uses them
+        modules = list(sys.modules.items())
+        if len(modules) == self._scanned_modules:
+            return
+        self._scanned_modules = len(modules)
+        found: Dict[int, Tuple[str, str]] = {}
+        for module_name, module in modules:
+            if module is None or not _in_packages(module_name, self.packages):
+                continue
+            for attribute, value in list(vars(module).items()):
+                if type(value) is Reactive:
+                    previous = found.get(id(value))
+                    if previous is None or len(module_name) < len(previous[0]):
+                        found[id(value)] = (module_name, attribute)
+        for key, (module_name, attribute) in found.items():
+            if module_name.endswith(".state"):
+                self._reactive_names[key] = attribute
+            else:
+                self._reactive_names[key] = _short_name(module_name, attribute)
+
+    def reactive_name(self, reactive: Reactive) -> str:
+        field = ""
+        if isinstance(reactive, ReactiveField):
+            field = str(reactive)
+            reactive = reactive._root
+        name = self._reactive_names.get(id(reactive))
+        if name is None:
+            self._scan_modules()
+            name = self._reactive_names.get(id(reactive), COMPONENT_REACTIVE)
+        return name + field
+
+    # Results
+
+    def reset(self, session: Optional[str] = None):
+        with self._lock:
+            if session is None:
+                self._stats.clear()
+            else:
+                for key in [k for k in self._stats if k[0] == session]:
+                    del self._stats[key]
+
+    def sessions(self) -> List[str]:
+        with self._lock:
+            return sorted({key[0] for key in self._stats})
+
+    def stats(
+        self,
+        session: Optional[str] = None,
+        by: Tuple[str, ...] = ("component",),
+    ) -> Dict[Tuple[str, ...], RenderStats]:
+        """
+        The render stats of ``session`` (or of every session), grouped by
+        ``component``, ``trigger`` or both, most render time first.
+        """
+        fields = {"session": 0, "component": 1, "trigger": 2}
+        grouped: Dict[Tuple[str, ...], RenderStats] = defaultdict(RenderStats)
+        with self._lock:
+            for key, stats in self._stats.items():
+                if session is None or key[0] == session:
+                    grouped[tuple(key[fields[f]] for f in by)].merge(stats)
+        return dict(sorted(grouped.items(), key=lambda x: -x[1].total))
+
+    def report(self, session: Optional[str] = None, top: int = REPORT_TOP) -> str:
+        """
+        A ranked report of the render counts and times of ``session`` (or of
+        every session) by component, by trigger and by both.
+        """
+        components = self.stats(session, ("component",))
+        count = sum(s.count for s in components.values())
+        total = sum(s.total for s in components.values())
+        lines = [f"{count} renders taking {1000 * total:.1f} ms in {session or 'every session'}"]
+
+        def table(title, rows, width):
+            lines.extend(["", f"{title:<{width}}{'renders':>9}{'total ms':>10}{'mean ms':>9}{'max ms':>9}"])
+            for key, stats in list(rows.items())[:top]:
+                lines.append(
+                    f"{' <- '.join(key):<{width}}{stats.count:>9}{1000 * stats.total:>10.1f}"
+                    f"{1000 * stats.total / stats.count:>9.2f}{1000 * stats.max:>9.2f}"
+                )
+
+        table("Component", components, 44)
+        table("Trigger", self.stats(session, ("trigger",)), 44)
+        table("Component <- trigger", self.stats(session, ("component", "trigger")), 80)
+        return "\n".join(lines)
+
+    def log_on_close(self) -> Callable[[], None]:
+        """
+        To be registered with `solara.lab.on_kernel_start`: logs the report
+        of each session when its kernel closes, and forgets its stats.
+        """
+        session = _current_session()
+
+        def cleanup():
+            logger.info("Render profile:\n%s", self.report(session))
+            self.reset(session)
+
+        return cleanup
+
+
+RENDER_PROFILER = RenderProfiler()
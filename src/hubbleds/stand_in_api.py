@@ -0,0 +1,496 @@
+import argparse
+import io
+import json
+import random
+import re
+import tarfile
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from cosmicds.logger import setup_logger
+from hubbleds.compression import ENCODINGS, choose_encoding, compress, decompress
+from hubbleds.synthetic import FIXTURE_SIZES, generate_population, population_fixtures
+
+logger = setup_logger("STAND_IN_API")
+
+__all__ = [
+    "FaultConfig",
+    "StandInAPI",
+    "StandInStore",
+]
+
+
+class FaultConfig(NamedTuple):
+    """
+    The latency and errors injected into responses. Each request waits for
+    ``latency`` plus a uniformly distributed delay of up to ``jitter``
+    seconds, and fails with ``error_status`` with probability ``error_rate``.
+    """
+    latency: float = 0
+    jitter: float = 0
+    error_rate: float = 0
+    error_status: int = 503
+
+
+class StandInStore:
+    """
+    The in-memory data behind the stand-in API, seeded from synthetic
+    fixtures (see `hubbleds.synthetic.population_fixtures`).
+    """
+
+    def __init__(self, fixtures: Dict[str, Any]):
+        self.galaxies = {g["id"]: g for g in fixtures["galaxies"]}
+        self.sample_galaxy = fixtures["sample_galaxy"]
+        self.classes = {int(k): list(v) for k, v in fixtures["classes"].items()}
+        self.student_classes = {
+            student_id: class_id
+            for class_id, ids in self.classes.items() for student_id in ids
+        }
+        self.measurements = {
+            (m["student_id"], m["galaxy_id"]): m for m in fixtures["measurements"]
+        }
+        self.sample_measurements = {
+            (m["student_id"], m["measurement_number"]): m
+            for m in fixtures["sample_measurements"]
+        }
+        self.student_summaries = list(fixtures["studentData"])
+        self.class_summaries = list(fixtures["classData"])
+        self.story_states: Dict[Tuple[int, str], Any] = {}
+        self.stage_states: Dict[Tuple[int, str, str], Any] = {}
+        self.lock = threading.Lock()
+
+    @classmethod
+    def synthetic(cls, size: str = "class", seed: int = 0) -> "StandInStore":
+        n_classes, students_per_class = FIXTURE_SIZES[size]
+        return cls(population_fixtures(generate_population(
+            n_classes=n_classes, students_per_class=students_per_class, seed=seed,
+        )))
+
+    def _with_galaxy(self, measurement: Dict[str, Any], sample: bool = False) -> Dict[str, Any]:
+        galaxy = self.sample_galaxy if sample else self.galaxies.get(measurement.get("galaxy_id"))
+        return dict(measurement, galaxy=galaxy)
+
+    def student_measurements(self, student_id: int) -> List[Dict[str, Any]]:
+        with self.lock:
+            return [m for (s, _), m in self.measurements.items() if s == student_id]
+
+    def put_measurement(self, measurement: Dict[str, Any]):
+        with self.lock:
+            key = (measurement["student_id"], measurement["galaxy_id"])
+            measurement.setdefault("class_id", self.student_classes.get(measurement["student_id"]))
+            self.measurements[key] = self._with_galaxy(measurement)
+
+    def delete_measurement(self, student_id: int, galaxy_id: int) -> bool:
+        with self.lock:
+            return self.measurements.pop((student_id, galaxy_id), None) is not None
+
+    def student_sample_measurements(self, student_id: int) -> List[Dict[str, Any]]:
+        with self.lock:
+            return [m for (s, _), m in self.sample_measurements.items() if s == student_id]
+
+    def put_sample_measurement(self, measurement: Dict[str, Any]):
+        with self.lock:
+            key = (measurement["student_id"], measurement["measurement_number"])
+            self.sample_measurements[key] = self._with_galaxy(measurement, sample=True)
+
+    def class_measurements(self, class_id: int, complete_only: bool) -> List[Dict[str, Any]]:
+        students = set(self.classes.get(class_id, []))
+        with self.lock:
+            measurements = [m for (s, _), m in self.measurements.items() if s in students]
+        if complete_only:
+            fields = ("obs_wave_value", "velocity_value", "ang_size_value", "est_dist_value")
+            measurements = [m for m in measurements if all(m.get(f) is not None for f in fields)]
+        return measurements
+
+    def all_data(self, minimal: bool) -> Dict[str, Any]:
+        with self.lock:
+            measurements = list(self.measurements.values())
+        if minimal:
+            keep = ("student_id", "class_id", "galaxy_id", "velocity_value", "est_dist_value")
+            measurements = [{k: m.get(k) for k in keep} for m in measurements]
+        return {
+            "measurements": measurements,
+            "studentData": self.student_summaries,
+            "classData": self.class_summaries,
+        }
+
+
+Route = Tuple[str, "re.Pattern[str]", str, Callable]
+
+
+class StandInAPI:
+    """
+    A local HTTP server implementing the CosmicDS API endpoints that
+    `hubbleds.remote.LocalAPI` uses, backed by a `StandInStore`.
+
+    The latency and error injection of every endpoint is set by ``faults``,
+    and can be overridden per endpoint name with ``endpoint_faults``. The
+    number of requests to each endpoint is counted in ``request_counts``,
+    and the bytes of their bodies as sent over the wire in
+    ``bytes_received`` and ``bytes_sent``.
+
+    Responses of at least ``compress_min_bytes`` are compressed in an
+    encoding that the request accepts (None never compresses them), and
+    request bodies may be compressed with one of ``request_encodings``;
+    other encodings are answered with 415 Unsupported Media Type.
+    Spectra are served from the FITS files in ``spectra_root``, such as
+    the sample spectra in the tests' data; without it, they aren't found.
+    Point an API at the server with ``api.API_URL = server.url``.
+    """
+
+    def __init__(
+        self,
+        store: Optional[StandInStore] = None,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        faults: FaultConfig = FaultConfig(),
+        endpoint_faults: Optional[Dict[str, FaultConfig]] = None,
+        seed: int = 0,
+        compress_min_bytes: Optional[int] = 1024,
+        request_encodings: Tuple[str, ...] = ENCODINGS,
+        spectra_root: Optional[Path] = None,
+    ):
+        self.store = store or StandInStore.synthetic()
+        self.spectra_root = spectra_root
+        self.compress_min_bytes = compress_min_bytes
+        self.request_encodings = request_encodings
+        self.bytes_received: Counter = Counter()
+        self.bytes_sent: Counter = Counter()
+        self.faults = faults
+        self.endpoint_faults = endpoint_faults or {}
+        self.request_counts: Counter = Counter()
+        self._random = random.Random(seed)
+        self._random_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._routes = self._make_routes()
+
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # The headers and body are written separately, which would
+            #  otherwise wait for the delayed ACK of the client
+            disable_nagle_algorithm = True
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                api._handle(self, "GET")
+
+            def do_PUT(self):
+                api._handle(self, "PUT")
+
+            def do_POST(self):
+                api._handle(self, "POST")
+
+            def do_DELETE(self):
+                api._handle(self, "DELETE")
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.httpd.daemon_threads = True
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "StandInAPI":
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        logger.info("Serving the stand-in API at %s.", self.url)
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self) -> "StandInAPI":
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
+
+    def _make_routes(self) -> List[Route]:
+        story = r"(?P<story>[^/]+)"
+        student = r"(?P<student>\d+)"
+        galaxy = r"(?P<galaxy>\d+)"
+        routes = [
+            ("GET", rf"/{story}/galaxies", "galaxies", self._galaxies),
+            ("GET", rf"/{story}/spectra/(?P<path>.+)", "spectrum", self._spectrum),
+            ("POST", rf"/{story}/spectra/bundle", "spectra_bundle", self._spectra_bundle),
+            ("GET", rf"/{story}/measurements/{student}", "measurements", self._measurements),
+            ("GET", rf"/{story}/measurements/{student}/{galaxy}", "measurement", self._measurement),
+            ("DELETE", rf"/{story}/measurements/{student}(?:/\d+)*/{galaxy}",
+             "delete_measurement", self._delete_measurement),
+            ("PUT", rf"/{story}/submit-measurement/?", "submit_measurement", self._submit_measurement),
+            ("GET", rf"/{story}/sample-measurements", "all_sample_measurements",
+             self._all_sample_measurements),
+            ("GET", rf"/{story}/sample-measurements/{student}", "sample_measurements",
+             self._sample_measurements),
+            ("GET", rf"/{story}/sample-measurements/{student}/{galaxy}", "sample_measurement",
+             self._sample_measurement),
+            ("PUT", rf"/{story}/sample-measurement/?", "submit_sample_measurement",
+             self._submit_sample_measurement),
+            ("GET", rf"/{story}/sample-galaxy", "sample_galaxy", self._sample_galaxy),
+            ("GET", rf"/{story}/class-measurements/{student}/(?P<class_id>\d+)",
+             "class_measurements", self._class_measurements),
+            ("GET", rf"/{story}/all-data", "all_data", self._all_data),
+            ("GET", rf"/story-state/{student}/{story}", "get_story_state", self._get_story_state),
+            ("PUT", rf"/story-state/{student}/{story}", "put_story_state", self._put_story_state),
+            ("GET", rf"/stage-state/{student}/{story}/(?P<stage>[^/]+)", "get_stage_state",
+             self._get_stage_state),
+            ("PUT", rf"/stage-state/{student}/{story}/(?P<stage>[^/]+)", "put_stage_state",
+             self._put_stage_state),
+        ]
+        return [(method, re.compile(pattern), name, handler) for method, pattern, name, handler in routes]
+
+    def _route(self, method: str, path: str):
+        for route_method, pattern, name, handler in self._routes:
+            if route_method != method:
+                continue
+            match = pattern.fullmatch(path)
+            if match is not None:
+                return name, handler, match.groupdict()
+        return None, None, {}
+
+    def _delay_and_fail(self, name: str) -> Optional[int]:
+        faults = self.endpoint_faults.get(name, self.faults)
+        with self._random_lock:
+            delay = faults.latency + faults.jitter * self._random.random()
+            fail = self._random.random() < faults.error_rate
+        if delay > 0:
+            time.sleep(delay)
+        return faults.error_status if fail else None
+
+    def _handle(self, request: BaseHTTPRequestHandler, method: str):
+        url = urlsplit(request.path)
+        name, handler, params = self._route(method, url.path)
+        self.request_counts[name or "unknown"] += 1
+
+        length = int(request.headers.get("Content-Length") or 0)
+        body = request.rfile.read(length) if length else b""
+        self.bytes_received[name or "unknown"] += len(body)
+
+        if handler is None:
+            self._send_json(request, 404, {"error": f"No endpoint for {method} {url.path}"})
+            return
+
+        error = self._delay_and_fail(name)
+        if error is not None:
+            self._send_json(request, error, {"error": "Injected error"}, name)
+            return
+
+        encoding = request.headers.get("Content-Encoding")
+        if body and encoding and encoding.lower() != "identity":
+            if encoding.lower() not in self.request_encodings:
+                self._send_json(request, 415, {"error": f"Unsupported encoding {encoding}"}, name)
+                return
+            body = decompress(body, encoding)
+
+        try:
+            query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+            payload = json.loads(body) if body else None
+            status, content = handler(params, query, payload)
+        except (KeyError, ValueError) as e:
+            self._send_json(request, 400, {"error": str(e)}, name)
+            return
+
+        if isinstance(content, bytes):
+            self._send(request, status, content, "application/octet-stream", name)
+        else:
+            self._send_json(request, status, content, name)
+
+    def _send(
+        self,
+        request: BaseHTTPRequestHandler,
+        status: int,
+        content: bytes,
+        content_type: str,
+        name: Optional[str] = None,
+    ):
+        encoding = None
+        if self.compress_min_bytes is not None and len(content) >= self.compress_min_bytes:
+            encoding = choose_encoding(request.headers.get("Accept-Encoding"))
+            if encoding is not None:
+                content = compress(content, encoding)
+        self.bytes_sent[name or "unknown"] += len(content)
+
+        request.send_response(status)
+        request.send_header("Content-Type", content_type)
+        if encoding is not None:
+            request.send_header("Content-Encoding", encoding)
+            request.send_header("Vary", "Accept-Encoding")
+        request.send_header("Content-Length", str(len(content)))
+        request.end_headers()
+        request.wfile.write(content)
+
+    def _send_json(self, request: BaseHTTPRequestHandler, status: int, content: Any, name: Optional[str] = None):
+        self._send(request, status, json.dumps(content).encode(), "application/json", name)
+
+    # Endpoints
+
+    def _galaxies(self, params, query, payload):
+        types = query.get("types")
+        types = set(types.split(",")) if types else None
+        galaxies = [g for g in self.store.galaxies.values() if types is None or g["type"] in types]
+        return 200, galaxies
+
+    def _spectrum_file(self, path: str) -> Optional[Path]:
+        # Synthetic galaxies don't have spectra, so every name is served one
+        #  of the spectra in `spectra_root`
+        if self.spectra_root is None:
+            return None
+        files = sorted(self.spectra_root.glob("*.fits"))
+        if not files:
+            return None
+        name = path.rsplit("/", 1)[-1]
+        exact = self.spectra_root / name
+        return exact if exact.exists() else files[sum(name.encode()) % len(files)]
+
+    def _spectrum(self, params, query, payload):
+        file = self._spectrum_file(params["path"])
+        if file is None:
+            return 404, {"error": "No spectra available"}
+        return 200, file.read_bytes()
+
+    def _spectra_bundle(self, params, query, payload):
+        buffer = io.BytesIO()
+        with tarfile.open(fileobj=buffer, mode="w:gz") as archive:
+            for path in payload["files"]:
+                file = self._spectrum_file(path)
+                if file is not None:
+                    archive.add(file, arcname=path)
+        return 200, buffer.getvalue()
+
+    def _measurements(self, params, query, payload):
+        student_id = int(params["student"])
+        return 200, {"measurements": self.store.student_measurements(student_id)}
+
+    def _measurement(self, params, query, payload):
+        key = (int(params["student"]), int(params["galaxy"]))
+        with self.store.lock:
+            measurement = self.store.measurements.get(key)
+        if measurement is None:
+            return 404, {"error": "Measurement not found"}
+        return 200, {"measurements": measurement}
+
+    def _delete_measurement(self, params, query, payload):
+        if self.store.delete_measurement(int(params["student"]), int(params["galaxy"])):
+            return 200, {"success": True}
+        return 404, {"error": "Measurement not found"}
+
+    def _submit_measurement(self, params, query, payload):
+        self.store.put_measurement(payload)
+        return 200, {"measurement": payload}
+
+    def _all_sample_measurements(self, params, query, payload):
+        with self.store.lock:
+            return 200, list(self.store.sample_measurements.values())
+
+    def _sample_measurements(self, params, query, payload):
+        student_id = int(params["student"])
+        return 200, {"measurements": self.store.student_sample_measurements(student_id)}
+
+    def _sample_measurement(self, params, query, payload):
+        student_id, galaxy_id = int(params["student"]), int(params["galaxy"])
+        for measurement in self.store.student_sample_measurements(student_id):
+            if measurement["galaxy_id"] == galaxy_id:
+                return 200, {"measurements": measurement}
+        return 404, {"error": "Sample measurement not found"}
+
+    def _submit_sample_measurement(self, params, query, payload):
+        self.store.put_sample_measurement(payload)
+        return 200, {"measurement": payload}
+
+    def _sample_galaxy(self, params, query, payload):
+        return 200, self.store.sample_galaxy
+
+    def _class_measurements(self, params, query, payload):
+        complete_only = query.get("complete_only", "false").lower() == "true"
+        measurements = self.store.class_measurements(int(params["class_id"]), complete_only)
+        return 200, {"measurements": measurements}
+
+    def _all_data(self, params, query, payload):
+        minimal = query.get("minimal", "false").lower() == "true"
+        return 200, self.store.all_data(minimal)
+
+    def _get_story_state(self, params, query, payload):
+        key = (int(params["student"]), params["story"])
+        state = self.store.story_states.get(key)
+        if state is None:
+            return 404, {"error": "Story state not found"}
+        return 200, {"student_id": key[0], "story_name": key[1], "state": state}
+
+    def _put_story_state(self, params, query, payload):
+        with self.store.lock:
+            self.store.story_states[(int(params["student"]), params["story"])] = payload
+        return 200, {"success": True}
+
+    def _get_stage_state(self, params, query, payload):
+        key = (int(params["student"]), params["story"], params["stage"])
+        state = self.store.stage_states.get(key)
+        if state is None:
+            return 404, {"error": "Stage state not found"}
+        return 200, {"student_id": key[0], "story_name": key[1], "stage_name": key[2], "state": state}
+
+    def _put_stage_state(self, params, query, payload):
+        key = (int(params["student"]), params["story"], params["stage"])
+        with self.store.lock:
+            self.store.stage_states[key] = payload
+        return 200, {"success": True}
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m hubbleds.stand_in_api",
+        description="Serve a local stand-in for the CosmicDS API, seeded with synthetic data.",
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--size", choices=list(FIXTURE_SIZES), default="class")
+    parser.add_argument("--fixtures", type=Path, help="Fixtures written by `hubbleds.synthetic`")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--latency", type=float, default=0, help="Seconds added to every response")
+    parser.add_argument("--jitter", type=float, default=0, help="Maximum random extra seconds")
+    parser.add_argument("--error-rate", type=float, default=0, help="Fraction of failed requests")
+    parser.add_argument("--compress-min-bytes", type=int, default=1024,
+                        help="Compress responses of at least this many bytes; -1 never compresses")
+    parser.add_argument("--spectra", type=Path, help="Directory of FITS spectra to serve, e.g. tests/data")
+    args = parser.parse_args(argv)
+
+    if args.fixtures is not None:
+        with open(args.fixtures) as f:
+            store = StandInStore(json.load(f))
+    else:
+        store = StandInStore.synthetic(args.size, seed=args.seed)
+
+    server = StandInAPI(
+        store,
+        host=args.host,
+        port=args.port,
+        faults=FaultConfig(args.latency, args.jitter, args.error_rate),
+        seed=args.seed,
+        compress_min_bytes=args.compress_min_bytes if args.compress_min_bytes >= 0 else None,
+        spectra_root=args.spectra,
+    )
+    print(f"Serving the stand-in API at {server.url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -4,16 +4,19 @@ from cosmicds.state import BaseState, GLOBAL_STATE, BaseLocalState
 from typing import Optional
 import solara
 import datetime
+import weakref
 from functools import cached_property
-from astropy.table import Table
 from pydantic import Field
 
 from solara.toestand import Ref
 
+from .dirty_tracking import EXAMPLE_MEASUREMENTS, MEASUREMENTS, STORY_STATE
 from .free_response import FreeResponses
+from .free_response_buffer import FREE_RESPONSE_BUFFER
+from .transaction import transaction
 from .mc_score import MCScoring
 
-from typing import Callable, Tuple
+from typing import Callable, ClassVar, Tuple
 
 ELEMENT_REST = {"H-α": 6562.79, "Mg-I": 5176.7}
 
@@ -46,6 +49,7 @@ class GalaxyData(BaseModel):
 
     @cached_property
     def spectrum_as_data_frame(self):
+        from astropy.table import Table
         from hubbleds.remote import LOCAL_API
 
         spec_data = LOCAL_API.load_spectrum_data(self, LOCAL_STATE)
@@ -115,6 +119,56 @@ class MCScore(BaseModel):
     tag: str = ""
 
 
+# The lists of measurements of `LocalState` that are indexed by galaxy
+MEASUREMENT_LISTS = (
+    "measurements",
+    "example_measurements",
+    "class_measurements",
+    "all_measurements",
+)
+
+
+class MeasurementIndex:
+    """
+    The positions of the measurements of a list by galaxy ID and by galaxy
+    ID and measurement number. Only the first position of a key is kept, as
+    the lookups return the first match.
+    """
+
+    __slots__ = ("measurements", "length", "by_galaxy", "by_number")
+
+    def __init__(self, measurements: list[StudentMeasurement]):
+        # Holding the list keeps its id from being reused by another list
+        self.measurements = measurements
+        self.length = len(measurements)
+        self.by_galaxy: dict[int, int] = {}
+        self.by_number: dict[tuple[int, Optional[str]], int] = {}
+        for i, measurement in enumerate(measurements):
+            galaxy_id = measurement.galaxy_id
+            self.by_galaxy.setdefault(galaxy_id, i)
+            self.by_number.setdefault((galaxy_id, measurement.measurement_number), i)
+
+    def is_current(self, measurements: list[StudentMeasurement]) -> bool:
+        return measurements is self.measurements and len(measurements) == self.length
+
+    def find(self, galaxy_id: int, measurement_number: Optional[str] = None) -> int | None:
+        if measurement_number is None:
+            return self.by_galaxy.get(galaxy_id)
+        return self.by_number.get((galaxy_id, measurement_number))
+
+    def matches(self, i: int, galaxy_id: int, measurement_number: Optional[str] = None) -> bool:
+        measurement = self.measurements[i]
+        return measurement.galaxy_id == galaxy_id and (
+            measurement_number is None or measurement.measurement_number == measurement_number
+        )
+
+
+# The indexes are kept outside of the states, since pydantic compares the
+#  private attributes of models and solara compares states to decide
+#  whether they changed. They are dropped with the state that they index.
+_MEASUREMENT_INDEXES: dict[int, dict[str, MeasurementIndex]] = {}
+
+
 class LocalState(BaseLocalState):
     title: str = "Hubble's Law"
     story_id: str = "hubbles_law"
@@ -140,6 +194,22 @@ class LocalState(BaseLocalState):
     stage_5_class_data_students: list[int] = []
     last_route: Optional[str] = None
 
+    # The data that each field is written with (see `hubbleds.dirty_tracking`).
+    #  The other lists are loaded from the database and never written back,
+    #  and the snackbar is only shown in the UI.
+    FIELD_CATEGORIES: ClassVar[dict[str, Optional[str]]] = {
+        "measurements": MEASUREMENTS,
+        "example_measurements": EXAMPLE_MEASUREMENTS,
+        "class_measurements": None,
+        "all_measurements": None,
+        "student_summaries": None,
+        "class_summaries": None,
+        "measurements_loaded": None,
+        "show_snackbar": None,
+        "snackbar_message": None,
+    }
+    DEFAULT_CATEGORY: ClassVar[str] = STORY_STATE
+
     @cached_property
     def galaxies(self) -> list[GalaxyData]:
         from hubbleds.remote import LOCAL_API
@@ -157,34 +227,59 @@ class LocalState(BaseLocalState):
             "class_summaries",
         })
 
+    def _measurement_index(self, field: str) -> MeasurementIndex:
+        measurements = getattr(self, field)
+        indexes = _MEASUREMENT_INDEXES.get(id(self))
+        if indexes is None:
+            indexes = _MEASUREMENT_INDEXES[id(self)] = {}
+            weakref.finalize(self, _MEASUREMENT_INDEXES.pop, id(self), None)
+        index = indexes.get(field)
+        if index is None or not index.is_current(measurements):
+            index = indexes[field] = MeasurementIndex(measurements)
+        return index
+
+    def find_measurement_index(
+        self,
+        field: str,
+        galaxy_id: int,
+        measurement_number: Optional[str] = None,
+    ) -> int | None:
+        """
+        The position of the first measurement of ``galaxy_id`` in the list
+        ``field`` (one of `MEASUREMENT_LISTS`), and with
+        ``measurement_number`` if it is given.
+
+        The positions are looked up in an index that is rebuilt when the
+        list is replaced or changes length, or when the position it gives no
+        longer holds a measurement of the galaxy. Measurements that are
+        moved within the list, or put in place of one of another galaxy, may
+        not be found where they are until the index is rebuilt, so change the
+        lists by replacing or extending them, or by replacing a measurement
+        with an updated copy of itself.
+        """
+        if field not in MEASUREMENT_LISTS:
+            raise ValueError(f"`{field}` is not a list of measurements.")
+        index = self._measurement_index(field)
+        i = index.find(galaxy_id, measurement_number)
+        if i is None or index.matches(i, galaxy_id, measurement_number):
+            return i
+        del _MEASUREMENT_INDEXES[id(self)][field]
+        return self._measurement_index(field).find(galaxy_id, measurement_number)
+
     def get_measurement(self, galaxy_id: int) -> StudentMeasurement | None:
-        return next((x for x in self.measurements if x.galaxy_id == galaxy_id), None)
+        index = self.get_measurement_index(galaxy_id)
+        return self.measurements[index] if index is not None else None
 
     def get_example_measurement(self, galaxy_id: int, measurement_number = 'first') -> StudentMeasurement | None:
-        def check_example_galaxy(x: StudentMeasurement):
-            return x.galaxy_id == galaxy_id and x.measurement_number == measurement_number
-        
-        return next(
-            (x for x in self.example_measurements if check_example_galaxy(x)), None
-        )
+        index = self.get_example_measurement_index(galaxy_id, measurement_number)
+        return self.example_measurements[index] if index is not None else None
 
     def get_measurement_index(self, galaxy_id: int) -> int | None:
-        return next(
-            (i for i, x in enumerate(self.measurements) if x.galaxy_id == galaxy_id),
-            None,
-        )
+        return self.find_measurement_index("measurements", galaxy_id)
 
     def get_example_measurement_index(self, galaxy_id: int, measurement_number = 'first') -> int | None:
-        def check_example_galaxy(x: StudentMeasurement):
-            return x.galaxy_id == galaxy_id and x.measurement_number == measurement_number
-        
-        return next(
-            (
-                i
-                for i, x in enumerate(self.example_measurements)
-                if check_example_galaxy(x)
-            ),
-            None,
+        return self.find_measurement_index(
+            "example_measurements", galaxy_id, measurement_number
         )
 
     def question_completed(self, tag: str) -> bool:
@@ -199,6 +294,33 @@ class LocalState(BaseLocalState):
 LOCAL_STATE = solara.reactive(LocalState())
 
 
+def update_measurement(
+    local_state: Reactive[LocalState],
+    galaxy_id: int,
+    example: bool = False,
+    measurement_number: str = "first",
+    **fields,
+) -> StudentMeasurement | None:
+    """
+    Set ``fields`` on the student's measurement of ``galaxy_id``, or on its
+    example measurement with ``measurement_number``, as one change of
+    ``local_state``. Joins the open transaction of ``local_state``, if any.
+
+    Returns
+    ----------
+    measurement: StudentMeasurement or None
+        The updated measurement, or None if there is no such measurement
+    """
+    field = "example_measurements" if example else "measurements"
+    with transaction(local_state) as local:
+        index = local.value.find_measurement_index(
+            field, galaxy_id, measurement_number if example else None
+        )
+        if index is None:
+            return None
+        return local.update_item(field, index, **fields)
+
+
 def get_free_response(local_state: Reactive[LocalState], tag: str):
     # get question as serializable dictionary
     # also initializes the question by using get_or_create method
@@ -275,9 +397,14 @@ def fr_callback(
     elif event[0] == "fr-update":
         free_responses.update(event[1]["tag"], response=event[1]["response"])
         LOCAL_STATE.set(local_state.value)
-        print(f"local state set")
+        # The answer is written once the student stops typing, rather than
+        #  on every keystroke (see `FreeResponseBuffer`)
         if callback is not None:
             if (len(event) > 1) and ("response" in event[1]):
-                callback()
+                FREE_RESPONSE_BUFFER.update(event[1]["tag"], callback)
+
+    elif event[0] == "fr-blur":
+        FREE_RESPONSE_BUFFER.flush()
+
     else:
         raise ValueError(f"Unknown event in fr_callback: <<{event}>> ")
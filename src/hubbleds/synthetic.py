@@ -0,0 +1,320 @@
+import argparse
+import datetime
+import json
+from pathlib import Path
+from typing import Any, Dict, List, NamedTuple, Optional
+
+import numpy as np
+
+from hubbleds.state import (
+    ELEMENT_REST,
+    ClassSummary,
+    GalaxyData,
+    StudentMeasurement,
+    StudentSummary,
+)
+from hubbleds.utils import (
+    DISTANCE_CONSTANT,
+    age_in_gyr_simple,
+    distance_from_angular_size,
+    velocity_from_wavelengths,
+)
+
+__all__ = [
+    "FIXTURE_SIZES",
+    "SyntheticPopulation",
+    "generate_population",
+    "population_fixtures",
+    "synthetic_galaxies",
+    "write_fixtures",
+]
+
+# Number of classes and students per class for the fixtures used by the
+#  benchmarks and the stand-in API. Each student measures five galaxies, so
+#  "production" is about 50,000 measurements.
+FIXTURE_SIZES = {
+    "student": (1, 1),
+    "class": (1, 30),
+    "school": (10, 30),
+    "production": (334, 30),
+}
+
+GALAXIES_PER_STUDENT = 5
+# The true distances of the synthetic galaxies use the exact speed of light;
+#  what students measure uses the rounded one of `hubbleds.utils`
+EXACT_SPEED_OF_LIGHT = 299792.458  # km/s
+
+# The Hubble constant of the synthetic universe, and the spread of galaxy
+#  sizes around the size of the Milky Way that the story assumes
+TRUE_HUBBLE_CONSTANT = 70  # km/s/Mpc
+GALAXY_SIZE_SCATTER = 0.3  # standard deviation of the log of the size
+
+# Measurement noise of students: the spectral line is marked to within a few
+#  Angstroms, and angular sizes are measured to within about 10%. A small
+#  fraction of students measure the angular size of a galaxy very badly
+#  (e.g. only measuring the bright core).
+WAVELENGTH_NOISE = 3  # Angstrom
+ANGULAR_SIZE_NOISE = 0.1
+OUTLIER_FRACTION = 0.02
+
+CLASS_ID_START = 1000
+STUDENT_ID_START = 10000
+SUMMARY_EPOCH = datetime.datetime(2024, 9, 1, tzinfo=datetime.timezone.utc)
+
+
+class SyntheticPopulation(NamedTuple):
+    galaxies: List[GalaxyData]
+    classes: Dict[int, List[int]]
+    measurements: List[StudentMeasurement]
+    sample_galaxy: GalaxyData
+    sample_measurements: List[StudentMeasurement]
+    student_summaries: List[StudentSummary]
+    class_summaries: List[ClassSummary]
+
+
+def synthetic_galaxies(
+    n: int,
+    rng: np.random.Generator,
+    first_id: int = 1,
+) -> List[GalaxyData]:
+    """
+    A catalog of ``n`` spiral galaxies with SDSS-like names, positions and
+    H-α redshifts out to about 12,000 km/s.
+    """
+    ids = np.arange(first_id, first_id + n)
+    plates = rng.integers(266, 2974, n)
+    mjds = rng.integers(51578, 54663, n)
+    fibers = rng.integers(1, 641, n)
+    ra = rng.uniform(110, 260, n)
+    decl = rng.uniform(-5, 65, n)
+    z = rng.uniform(0.005, 0.04, n)
+
+    return [
+        GalaxyData(
+            id=int(i),
+            name=f"spec-{p:04d}-{m}-{f:04d}",
+            ra=round(float(r), 4),
+            decl=round(float(d), 4),
+            z=round(float(zz), 7),
+            type="Sp",
+            element="H-α",
+        )
+        for i, p, m, f, r, d, zz in zip(ids, plates, mjds, fibers, ra, decl, z)
+    ]
+
+
+def _hubble_fits(distances: np.ndarray, velocities: np.ndarray, groups: np.ndarray):
+    # The least squares slope of a line through the origin for each group,
+    #  which is the fit that `create_single_summary` makes
+    _, inverse = np.unique(groups, return_inverse=True)
+    sxy = np.bincount(inverse, weights=distances * velocities)
+    sxx = np.bincount(inverse, weights=distances * distances)
+    return sxy / sxx
+
+
+def generate_population(
+    n_classes: int = 1,
+    students_per_class: int = 30,
+    n_galaxies: Optional[int] = None,
+    galaxies: Optional[List[GalaxyData]] = None,
+    galaxies_per_student: int = GALAXIES_PER_STUDENT,
+    seed: int = 0,
+) -> SyntheticPopulation:
+    """
+    Synthesize classes of students, their galaxy measurements, their example
+    galaxy measurements and the student and class summaries.
+
+    Each galaxy has a true distance from a Hubble flow with
+    `TRUE_HUBBLE_CONSTANT`, and a physical size scattered around the size of
+    the Milky Way. Students measure the H-α line and the angular size of
+    each galaxy with realistic noise, and derive velocities and distances the
+    same way the story does. The population only depends on the arguments,
+    so the same seed always gives the same population.
+
+    Parameters
+    ----------
+    n_classes: int
+        The number of classes
+    students_per_class: int
+        The number of students in each class
+    n_galaxies: int, optional
+        The size of the synthetic catalog that students choose galaxies
+        from. Defaults to enough galaxies for a class to rarely share one.
+    galaxies: list, optional
+        A galaxy catalog (e.g. from the API) to use instead of a synthetic
+        one
+    galaxies_per_student: int
+        The number of galaxies that each student measures
+    seed: int
+        The seed of the random number generator
+
+    Returns
+    ----------
+    population: SyntheticPopulation
+        The galaxies, classes (class ID to student IDs), measurements and
+        summaries
+    """
+    rng = np.random.default_rng(seed)
+    if galaxies is None:
+        n_galaxies = n_galaxies or max(students_per_class * galaxies_per_student, 100)
+        galaxies = synthetic_galaxies(n_galaxies, rng)
+    sample_galaxy = synthetic_galaxies(1, rng, first_id=0)[0]
+
+    n_students = n_classes * students_per_class
+    class_ids = np.repeat(np.arange(CLASS_ID_START, CLASS_ID_START + n_classes), students_per_class)
+    student_ids = np.arange(STUDENT_ID_START, STUDENT_ID_START + n_students)
+    classes = {
+        int(class_id): student_ids[class_ids == class_id].tolist()
+        for class_id in np.unique(class_ids)
+    }
+
+    # Every student measures a different set of galaxies
+    n_catalog = len(galaxies)
+    n_chosen = min(galaxies_per_student, n_catalog)
+    choices = np.array([
+        rng.choice(n_catalog, size=n_chosen, replace=False) for _ in range(n_students)
+    ]).reshape(n_students, n_chosen)
+    catalog_index = choices.ravel()
+    owners = np.repeat(np.arange(n_students), choices.shape[1])
+
+    z = np.array([g.z for g in galaxies])
+    rest = np.array([round(ELEMENT_REST[g.element]) for g in galaxies], dtype=float)
+    true_dist = EXACT_SPEED_OF_LIGHT * z / TRUE_HUBBLE_CONSTANT
+    sizes = np.exp(rng.normal(0, GALAXY_SIZE_SCATTER, n_catalog))
+    true_theta = DISTANCE_CONSTANT * sizes / true_dist
+
+    n = catalog_index.size
+    obs_wave = np.round(
+        rest[catalog_index] * (1 + z[catalog_index]) + rng.normal(0, WAVELENGTH_NOISE, n)
+    )
+    # Measured as the story measures them, one galaxy at a time
+    velocities = np.array([
+        velocity_from_wavelengths(w, r) for w, r in zip(obs_wave, rest[catalog_index])
+    ])
+
+    theta = true_theta[catalog_index] * (1 + rng.normal(0, ANGULAR_SIZE_NOISE, n))
+    outliers = rng.random(n) < OUTLIER_FRACTION
+    theta[outliers] *= rng.uniform(0.3, 0.6, outliers.sum())
+    theta = np.maximum(np.round(theta), 1)
+    distances = np.array([distance_from_angular_size(a) for a in theta])
+
+    measurements = [
+        StudentMeasurement(
+            student_id=int(student_ids[o]),
+            class_id=int(class_ids[o]),
+            obs_wave_value=float(w),
+            velocity_value=float(v),
+            ang_size_value=float(a),
+            est_dist_value=float(d),
+            galaxy=galaxies[g],
+        )
+        for o, g, w, v, a, d in zip(owners, catalog_index, obs_wave, velocities, theta, distances)
+    ]
+
+    sample_rest = round(ELEMENT_REST[sample_galaxy.element])
+    sample_theta = DISTANCE_CONSTANT / (EXACT_SPEED_OF_LIGHT * sample_galaxy.z / TRUE_HUBBLE_CONSTANT)
+    sample_measurements = []
+    for student_id, class_id in zip(student_ids, class_ids):
+        for number in ("first", "second"):
+            wave = round(sample_rest * (1 + sample_galaxy.z) + rng.normal(0, WAVELENGTH_NOISE))
+            ang_size = max(round(sample_theta * (1 + rng.normal(0, ANGULAR_SIZE_NOISE))), 1)
+            sample_measurements.append(StudentMeasurement(
+                student_id=int(student_id),
+                class_id=int(class_id),
+                obs_wave_value=float(wave),
+                velocity_value=float(velocity_from_wavelengths(wave, sample_rest)),
+                ang_size_value=float(ang_size),
+                est_dist_value=float(distance_from_angular_size(ang_size)),
+                measurement_number=number,
+                galaxy=sample_galaxy,
+            ))
+
+    updates = [
+        SUMMARY_EPOCH + datetime.timedelta(minutes=int(m))
+        for m in rng.integers(0, 60 * 24 * 180, n_classes)
+    ]
+    student_fits = _hubble_fits(distances, velocities, owners)
+    student_summaries = [
+        StudentSummary(
+            student_id=int(student_id),
+            hubble_fit_value=float(h0),
+            age_value=age_in_gyr_simple(h0),
+            last_data_update=updates[i // students_per_class],
+        )
+        for i, (student_id, h0) in enumerate(zip(student_ids, student_fits))
+    ]
+    class_fits = _hubble_fits(distances, velocities, class_ids[owners])
+    class_summaries = [
+        ClassSummary(
+            class_id=class_id,
+            hubble_fit_value=float(h0),
+            age_value=age_in_gyr_simple(h0),
+            last_data_update=updates[i],
+        )
+        for i, (class_id, h0) in enumerate(zip(classes, class_fits))
+    ]
+
+    return SyntheticPopulation(
+        galaxies=list(galaxies),
+        classes=classes,
+        measurements=measurements,
+        sample_galaxy=sample_galaxy,
+        sample_measurements=sample_measurements,
+        student_summaries=student_summaries,
+        class_summaries=class_summaries,
+    )
+
+
+def population_fixtures(population: SyntheticPopulation) -> Dict[str, Any]:
+    """
+    The population as JSON-serializable fixtures, with the measurements and
+    summaries in the shapes that the API returns them.
+    """
+    def _dump(models):
+        return [model.model_dump(mode="json") for model in models]
+
+    return {
+        "galaxies": _dump(population.galaxies),
+        "sample_galaxy": population.sample_galaxy.model_dump(mode="json"),
+        "classes": {str(class_id): ids for class_id, ids in population.classes.items()},
+        "measurements": _dump(population.measurements),
+        "sample_measurements": _dump(population.sample_measurements),
+        "studentData": _dump(population.student_summaries),
+        "classData": _dump(population.class_summaries),
+    }
+
+
+def write_fixtures(population: SyntheticPopulation, path: Path):
+    with open(path, "w") as f:
+        json.dump(population_fixtures(population), f)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m hubbleds.synthetic",
+        description="Write synthetic classes, measurements and summaries as JSON fixtures.",
+    )
+    parser.add_argument("output", type=Path)
+    parser.add_argument("--size", choices=list(FIXTURE_SIZES), default="class")
+    parser.add_argument("--classes", type=int, help="Overrides the number of classes of --size")
+    parser.add_argument("--students", type=int, help="Overrides the students per class of --size")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    n_classes, students_per_class = FIXTURE_SIZES[args.size]
+    population = generate_population(
+        n_classes=args.classes or n_classes,
+        students_per_class=args.students or students_per_class,
+        seed=args.seed,
+    )
+    write_fixtures(population, args.output)
+    print(
+        f"Wrote {len(population.measurements)} measurements from "
+        f"{len(population.student_summaries)} students in "
+        f"{len(population.class_summaries)} classes to {args.output}."
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
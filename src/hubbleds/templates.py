@@ -0,0 +1,194 @@
+import os
+import re
+import sys
+import threading
+from pathlib import Path
+from typing import Dict, List, Tuple, Union
+
+import ipyvue  # noqa: F401 (imports the ipyvue modules used below)
+
+from cosmicds.logger import setup_logger
+
+logger = setup_logger("TEMPLATES")
+
+__all__ = [
+    "TEMPLATES",
+    "TemplateRegistry",
+]
+
+PACKAGE_ROOT = Path(__file__).parent
+
+# The templates that are read when the registry is loaded: the guidelines
+#  of each stage and the templates of the components and widgets
+TEMPLATE_PATTERNS = (
+    "pages/*/guidelines/*.vue",
+    "components/*/*.vue",
+    "widgets/*/*.vue",
+)
+
+# The guidelines that a stage shows, e.g. `GUIDELINE_ROOT / "GuidelineIntro.vue"`
+GUIDELINE_REFERENCE = re.compile(r'^[^#\n]*GUIDELINE_ROOT\s*/\s*"([^"]+\.vue)"', re.MULTILINE)
+
+
+def _normalize(path: Union[str, Path]) -> str:
+    return os.path.normpath(os.path.abspath(path))
+
+
+def validate_template(path: str, text: str):
+    """
+    Raise a `ValueError` if ``text`` isn't a usable Vue template: it must
+    have a root ``<template>`` element, and its ``<template>`` tags must be
+    closed.
+    """
+    if not text.strip():
+        raise ValueError(f"Template `{path}` is empty.")
+    opened = len(re.findall(r"<template[\s>]", text))
+    closed = text.count("</template>")
+    if opened == 0:
+        raise ValueError(f"Template `{path}` has no <template> element.")
+    if opened != closed:
+        raise ValueError(
+            f"Template `{path}` opens {opened} <template> tags and closes {closed}."
+        )
+
+
+class TemplateRegistry:
+    """
+    The text of the app's Vue templates, read and validated once per process.
+
+    ipyvue reads a template file again every time a widget that uses it is
+    created, so every render of a guideline or a `solara.component_vue`
+    component opens its ``.vue`` file. Once installed, the registry answers
+    these lookups from memory instead. The ``ipyvue.Template`` widgets are
+    still created per session, since a widget belongs to the kernel of its
+    session, but they all share the text held here.
+
+    Templates outside of ``patterns`` (e.g. those of cosmicds) are read the
+    first time they are used, and a template that doesn't exist raises a
+    `FileNotFoundError` when it is looked up rather than when the browser
+    fails to render it.
+    """
+
+    def __init__(self, root: Path = PACKAGE_ROOT, patterns: Tuple[str, ...] = TEMPLATE_PATTERNS):
+        self.root = Path(root)
+        self.patterns = patterns
+        self.loaded = False
+        self.installed = False
+        self.reads = 0
+        self._texts: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        self._original_get_template = None
+
+    def __len__(self) -> int:
+        return len(self._texts)
+
+    def __contains__(self, path: Union[str, Path]) -> bool:
+        return _normalize(path) in self._texts
+
+    def _read(self, path: str) -> str:
+        if not os.path.isfile(path):
+            raise FileNotFoundError(f"Template `{path}` does not exist.")
+        with open(path, encoding="utf-8") as f:
+            text = f.read()
+        self.reads += 1
+        validate_template(path, text)
+        return text
+
+    def load(self) -> int:
+        """
+        Read and validate every template under ``patterns``, and check that
+        the guidelines referenced by the stages exist. Raises on the first
+        invalid or missing template; loading again does nothing.
+
+        Returns
+        ----------
+        count: int
+            The number of templates in the registry
+        """
+        with self._lock:
+            if self.loaded:
+                return len(self._texts)
+            for pattern in self.patterns:
+                for path in sorted(self.root.glob(pattern)):
+                    path = _normalize(path)
+                    self._texts[path] = self._read(path)
+
+            missing = self.missing_references()
+            if missing:
+                raise FileNotFoundError(
+                    "Missing guideline templates: " + ", ".join(missing)
+                )
+            self.loaded = True
+        logger.info("Loaded %d templates.", len(self._texts))
+        return len(self._texts)
+
+    def missing_references(self) -> List[str]:
+        """The guideline templates that the stages use but that don't exist."""
+        missing = []
+        for page in sorted(self.root.glob("pages/*/__init__.py")):
+            guidelines = page.parent / "guidelines"
+            for name in GUIDELINE_REFERENCE.findall(page.read_text(encoding="utf-8")):
+                if _normalize(guidelines / name) not in self._texts:
+                    missing.append(f"{page.parent.name}/guidelines/{name}")
+        return missing
+
+    def text(self, path: Union[str, Path]) -> str:
+        """The text of the template at ``path``, read only the first time."""
+        path = _normalize(path)
+        text = self._texts.get(path)
+        if text is None:
+            with self._lock:
+                text = self._texts.get(path)
+                if text is None:
+                    text = self._texts[path] = self._read(path)
+        return text
+
+    def get_template(self, abs_path: str):
+        """
+        A replacement for ``ipyvue.Template.get_template``: the template
+        widget of ``abs_path`` in the current session, with the cached text.
+        """
+        # solara makes the registry of template widgets per kernel, so it is
+        #  looked up on each call
+        template_module = sys.modules["ipyvue.Template"]
+        abs_path = os.path.normpath(abs_path)
+        text = self.text(abs_path)
+        template = template_module.template_registry.get(abs_path)
+        if template is None:
+            template = template_module.Template(template=text)
+            template_module.template_registry[abs_path] = template
+        elif template.template != text:
+            template.template = text
+        return template
+
+    def install(self):
+        """
+        Load the templates, and answer ipyvue's template lookups from the
+        registry. Not installed when solara runs in development mode, where
+        solara reloads templates when their files change.
+        """
+        if self.installed:
+            return
+        self.load()
+
+        from solara.server import settings
+
+        if settings.main.mode == "development":
+            logger.info("Not caching templates in development mode.")
+            return
+
+        # ipyvue's widget module imports get_template by name
+        widget_module = sys.modules["ipyvue.VueTemplateWidget"]
+        self._original_get_template = widget_module.get_template
+        widget_module.get_template = self.get_template
+        self.installed = True
+
+    def uninstall(self):
+        if not self.installed:
+            return
+        sys.modules["ipyvue.VueTemplateWidget"].get_template = self._original_get_template
+        self._original_get_template = None
+        self.installed = False
+
+
+TEMPLATES = TemplateRegistry()
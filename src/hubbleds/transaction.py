@@ -0,0 +1,114 @@
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Generic, Iterator, Set, TypeVar
+
+from pydantic import BaseModel
+from solara import Reactive
+
+from cosmicds.logger import setup_logger
+
+logger = setup_logger("TRANSACTION")
+
+__all__ = [
+    "StateTransaction",
+    "transaction",
+]
+
+S = TypeVar("S", bound=BaseModel)
+
+
+class StateTransaction(Generic[S]):
+    """
+    A set of changes to the value of a reactive state, such as `LOCAL_STATE`
+    or a stage's `COMPONENT_STATE`, that is set as one new value when the
+    transaction commits. Listeners of the state, such as the layout's
+    database writes and the components that use the state, are notified
+    once instead of once per change.
+
+    ``value`` is the state with the changes made so far, so lookups made
+    during the transaction see them. The state itself keeps its old value
+    until the commit. Fields that were set directly on the state during the
+    transaction are kept, unless the transaction changed them too.
+    """
+
+    def __init__(self, state: Reactive[S]):
+        self.state = state
+        self.value: S = state.value
+        self.fields: Dict[str, Any] = {}
+        self._owned_lists: Set[str] = set()
+
+    @property
+    def changed(self) -> bool:
+        return bool(self.fields)
+
+    def update(self, **fields) -> S:
+        """Set top-level fields of the state."""
+        self.value = self.value.model_copy(update=fields)
+        self.fields.update(fields)
+        self._owned_lists.difference_update(fields)
+        return self.value
+
+    def update_nested(self, field: str, **fields) -> BaseModel:
+        """Set fields of a model in the state, e.g. ``doppler_state``."""
+        nested = getattr(self.value, field).model_copy(update=fields)
+        self.update(**{field: nested})
+        return nested
+
+    def update_item(self, field: str, index: int, **fields) -> BaseModel:
+        """
+        Replace the model at ``index`` in the list ``field`` with a copy of
+        it that has ``fields`` set. The list is copied once per transaction.
+        """
+        items = getattr(self.value, field)
+        if field not in self._owned_lists:
+            items = list(items)
+        items[index] = items[index].model_copy(update=fields)
+        if field not in self._owned_lists:
+            self.update(**{field: items})
+            self._owned_lists.add(field)
+        return items[index]
+
+    def commit(self):
+        if not self.changed:
+            return
+        current = self.state.peek()
+        self.state.set(current.model_copy(update=self.fields))
+        self.fields = {}
+        self._owned_lists.clear()
+
+
+_local = threading.local()
+
+
+@contextmanager
+def transaction(state: Reactive[S]) -> Iterator[StateTransaction[S]]:
+    """
+    Make changes to ``state`` in a `StateTransaction` that commits when the
+    block ends, or is dropped if the block raises. A transaction on a state
+    that already has one open in this thread joins it, so helpers that use
+    a transaction can be called from a larger one.
+
+    Examples
+    ----------
+    with transaction(LOCAL_STATE) as local, transaction(COMPONENT_STATE) as component:
+        local.update_item("measurements", index, velocity_value=velocity)
+        component.update(velocities_total=component.value.velocities_total + 1)
+    """
+    open_transactions = getattr(_local, "open", None)
+    if open_transactions is None:
+        open_transactions = _local.open = {}
+
+    current = open_transactions.get(id(state))
+    if current is not None:
+        yield current
+        return
+
+    current = open_transactions[id(state)] = StateTransaction(state)
+    try:
+        yield current
+    except BaseException:
+        logger.debug("Dropped the changes of a transaction that raised.")
+        raise
+    finally:
+        del open_transactions[id(state)]
+    current.commit()
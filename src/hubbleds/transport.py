@@ -0,0 +1,272 @@
+import json
+import re
+import threading
+import time
+from contextlib import contextmanager
+from os import getenv
+from typing import Any, Dict, NamedTuple, Optional, Tuple
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from cosmicds.logger import setup_logger
+from hubbleds.compression import accept_encoding, compress
+
+logger = setup_logger("TRANSPORT")
+
+__all__ = [
+    "ALL_DATA",
+    "ENDPOINT_CLASSES",
+    "SMALL_JSON",
+    "SPECTRA",
+    "PooledTransport",
+    "QueueTimeout",
+    "TransportConfig",
+    "endpoint_class",
+]
+
+# The classes of API endpoints, which have their own timeouts and limits
+#  on concurrent requests
+SMALL_JSON = "small_json"
+SPECTRA = "spectra"
+ALL_DATA = "all_data"
+ENDPOINT_CLASSES = (SMALL_JSON, SPECTRA, ALL_DATA)
+
+_SPECTRA_PATH = re.compile(r"/spectra/")
+# The data of every class, and every student's example measurements
+_ALL_DATA_PATH = re.compile(r"/(all-data|sample-measurements)/?$")
+
+# Settings of the transport of each worker, as `class=value` lists for
+#  the timeouts and concurrency, e.g. `small_json=4,spectra=30,all_data=120`
+POOL_SIZE_ENV = "HUBBLEDS_API_POOL_SIZE"
+CONCURRENCY_ENV = "HUBBLEDS_API_CONCURRENCY"
+TIMEOUTS_ENV = "HUBBLEDS_API_TIMEOUTS"
+QUEUE_TIMEOUT_ENV = "HUBBLEDS_API_QUEUE_TIMEOUT"
+# Request bodies of at least this many bytes are compressed; `off` turns
+#  the compression of request bodies off
+COMPRESS_MIN_BYTES_ENV = "HUBBLEDS_API_COMPRESS_MIN_BYTES"
+
+CONNECT_TIMEOUT = 5.0
+DEFAULT_TIMEOUTS = {SMALL_JSON: 30.0, SPECTRA: 60.0, ALL_DATA: 300.0}
+DEFAULT_CONCURRENCY = {SMALL_JSON: 16, SPECTRA: 6, ALL_DATA: 2}
+DEFAULT_QUEUE_TIMEOUT = 60.0
+DEFAULT_COMPRESS_MIN_BYTES = 16 * 1024
+REQUEST_ENCODING = "gzip"
+
+
+def endpoint_class(url: str) -> str:
+    """The endpoint class of a request to ``url``."""
+    path = urlsplit(url).path
+    if _SPECTRA_PATH.search(path):
+        return SPECTRA
+    if _ALL_DATA_PATH.search(path):
+        return ALL_DATA
+    return SMALL_JSON
+
+
+def _parse_classes(setting: Optional[str], defaults: Dict[str, float]) -> Dict[str, float]:
+    values = dict(defaults)
+    for item in filter(None, (setting or "").split(",")):
+        name, _, value = item.partition("=")
+        name = name.strip()
+        if name not in ENDPOINT_CLASSES:
+            raise ValueError(f"Unknown endpoint class `{name}`; expected one of {ENDPOINT_CLASSES}.")
+        values[name] = float(value)
+    return values
+
+
+class TransportConfig(NamedTuple):
+    """
+    The connection pool and limits of a `PooledTransport`. ``timeouts`` are
+    the read timeouts of each endpoint class, and ``concurrency`` the number
+    of requests of each class that are sent at once; more requests wait up
+    to ``queue_timeout`` seconds for their turn. The pool holds a connection
+    for every request that can be in flight unless ``pool_size`` is given.
+    Request bodies of at least ``compress_min_bytes`` are sent compressed
+    with ``request_encoding``; None sends every body uncompressed.
+    """
+    timeouts: Dict[str, float] = DEFAULT_TIMEOUTS
+    concurrency: Dict[str, int] = DEFAULT_CONCURRENCY
+    connect_timeout: float = CONNECT_TIMEOUT
+    queue_timeout: float = DEFAULT_QUEUE_TIMEOUT
+    pool_size: Optional[int] = None
+    compress_min_bytes: Optional[int] = DEFAULT_COMPRESS_MIN_BYTES
+    request_encoding: str = REQUEST_ENCODING
+
+    @classmethod
+    def from_env(cls) -> "TransportConfig":
+        concurrency = _parse_classes(getenv(CONCURRENCY_ENV), DEFAULT_CONCURRENCY)
+        pool_size = getenv(POOL_SIZE_ENV)
+        compress_min_bytes = getenv(COMPRESS_MIN_BYTES_ENV) or str(DEFAULT_COMPRESS_MIN_BYTES)
+        return cls(
+            timeouts=_parse_classes(getenv(TIMEOUTS_ENV), DEFAULT_TIMEOUTS),
+            concurrency={name: int(value) for name, value in concurrency.items()},
+            queue_timeout=float(getenv(QUEUE_TIMEOUT_ENV) or DEFAULT_QUEUE_TIMEOUT),
+            pool_size=int(pool_size) if pool_size else None,
+            compress_min_bytes=None if compress_min_bytes == "off" else int(compress_min_bytes),
+        )
+
+    def timeout(self, endpoint: str) -> Tuple[float, float]:
+        return self.connect_timeout, self.timeouts[endpoint]
+
+    @property
+    def connections(self) -> int:
+        return self.pool_size or sum(self.concurrency.values())
+
+
+class QueueTimeout(requests.exceptions.Timeout):
+    """A request waited longer than the queue timeout to be sent."""
+
+
+class _Limiter:
+    """The concurrency limit and queueing metrics of an endpoint class."""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self._condition = threading.Condition()
+        self.in_flight = 0
+        self.queued = 0
+        self.max_in_flight = 0
+        self.max_queued = 0
+        self.requests = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    @contextmanager
+    def slot(self, queue_timeout: float):
+        start = time.perf_counter()
+        with self._condition:
+            self.queued += 1
+            self.max_queued = max(self.max_queued, self.queued)
+            try:
+                ready = self._condition.wait_for(lambda: self.in_flight < self.limit, queue_timeout)
+            finally:
+                self.queued -= 1
+            if not ready:
+                self.timeouts += 1
+                raise QueueTimeout(
+                    f"Waited {queue_timeout} s for one of {self.limit} request slots."
+                )
+            waited = time.perf_counter() - start
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            self.requests += 1
+            self.wait_total += waited
+            self.wait_max = max(self.wait_max, waited)
+        try:
+            yield
+        finally:
+            with self._condition:
+                self.in_flight -= 1
+                self._condition.notify()
+
+    def as_dict(self) -> Dict[str, Any]:
+        with self._condition:
+            return {
+                "limit": self.limit,
+                "in_flight": self.in_flight,
+                "queued": self.queued,
+                "max_in_flight": self.max_in_flight,
+                "max_queued": self.max_queued,
+                "requests": self.requests,
+                "queue_timeouts": self.timeouts,
+                "wait_seconds_total": self.wait_total,
+                "wait_seconds_max": self.wait_max,
+            }
+
+
+class PooledTransport:
+    """
+    Sends the requests of `LocalAPI`, which every session of a worker
+    shares, through a bounded connection pool.
+
+    Each request gets the timeout of its endpoint class (see
+    `endpoint_class`) unless it sets its own, and each class has its own
+    limit on concurrent requests, so that a few slow all-data or spectra
+    requests can't hold the connections that the small reads and writes of
+    other students need. Requests over a limit queue for their turn, and
+    the queueing of each class is reported by `metrics`.
+
+    Responses are requested in any encoding that urllib3 can decode (zstd
+    where available, gzip or deflate), and large request bodies are compressed
+    (see `TransportConfig`). If the API answers a compressed body with 415
+    Unsupported Media Type, the request is sent again uncompressed and
+    later bodies aren't compressed.
+
+    The transport wraps a `requests.Session`, such as the one that the
+    base API authenticates, and can be used from any thread.
+    """
+
+    def __init__(self, session: requests.Session, config: Optional[TransportConfig] = None):
+        self.session = session
+        self.config = config or TransportConfig.from_env()
+        self._limiters = {
+            name: _Limiter(self.config.concurrency[name]) for name in ENDPOINT_CLASSES
+        }
+        adapter = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=self.config.connections,
+            pool_block=True,
+        )
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        session.headers["Accept-Encoding"] = accept_encoding()
+        self.compress_requests = self.config.compress_min_bytes is not None
+
+    def __getattr__(self, name):
+        return getattr(self.session, name)
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        endpoint = endpoint_class(url)
+        kwargs.setdefault("timeout", self.config.timeout(endpoint))
+        with self._limiters[endpoint].slot(self.config.queue_timeout):
+            if not self.compress_requests:
+                return self.session.request(method, url, **kwargs)
+
+            compressed = self._compressed(kwargs)
+            if compressed is None:
+                return self.session.request(method, url, **kwargs)
+            response = self.session.request(method, url, **compressed)
+            if response.status_code == 415:
+                logger.warning("The API doesn't accept compressed requests; sending them uncompressed.")
+                self.compress_requests = False
+                response = self.session.request(method, url, **kwargs)
+            return response
+
+    def _compressed(self, kwargs: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        # The arguments of a request with its body compressed, or None if
+        #  the body is too small or isn't text or bytes
+        headers = dict(kwargs.get("headers") or {})
+        if "json" in kwargs and kwargs["json"] is not None:
+            body = json.dumps(kwargs["json"], allow_nan=False)
+            headers.setdefault("Content-Type", "application/json")
+        else:
+            body = kwargs.get("data")
+        if isinstance(body, str):
+            body = body.encode()
+        if not isinstance(body, bytes) or len(body) < self.config.compress_min_bytes:
+            return None
+
+        headers["Content-Encoding"] = self.config.request_encoding
+        compressed = {k: v for k, v in kwargs.items() if k != "json"}
+        compressed["data"] = compress(body, self.config.request_encoding)
+        compressed["headers"] = headers
+        return compressed
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def put(self, url, **kwargs):
+        return self.request("PUT", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    def delete(self, url, **kwargs):
+        return self.request("DELETE", url, **kwargs)
+
+    def metrics(self) -> Dict[str, Dict[str, Any]]:
+        """The concurrency and queueing of each endpoint class."""
+        return {name: limiter.as_dict() for name, limiter in self._limiters.items()}
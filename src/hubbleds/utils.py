@@ -1,26 +1,25 @@
 from collections import defaultdict
+from functools import lru_cache
 from astropy import units as u
-from astropy.modeling import models, fitting
 from numpy import argsort, array, pi
 
 from cosmicds.utils import component_type_for_field, mode, percent_around_center_indices
 from pydantic import BaseModel
 
-from glue.core import Data
-from glue_jupyter.app import JupyterApplication
 from numbers import Number
-from typing import List, Set, Tuple, TypeVar, Optional, cast, Any
+from typing import TYPE_CHECKING, List, Set, Tuple, TypeVar, Optional, cast, Any
 from collections.abc import Callable
 from solara.toestand import Reactive
 
 from hubbleds.state import StudentMeasurement
-from glue.core import Data
 from numpy import asarray
 
-try:
-    from astropy.cosmology import Planck18 as planck
-except ImportError:
-    from astropy.cosmology import Planck15 as planck
+# glue, glue-jupyter, astropy.modeling and astropy.cosmology take seconds to
+#  import, and most pages only need them once they build their viewers, so
+#  they are imported by the functions that use them
+if TYPE_CHECKING:
+    from glue.core import Data
+    from glue_jupyter.app import JupyterApplication
 
 __all__ = [
     "HUBBLE_ROUTE_PATH",
@@ -68,6 +67,15 @@ def angle_from_json(jsn, _widget):
     return jsn["value"] * u.Unit(jsn["unit"])
 
 
+@lru_cache
+def _planck():
+    try:
+        from astropy.cosmology import Planck18 as planck
+    except ImportError:
+        from astropy.cosmology import Planck15 as planck
+    return planck
+
+
 def age_in_gyr(H0):
     """
     Given a value for the Hubble constant, computes the age of the universe
@@ -83,7 +91,7 @@ def age_in_gyr(H0):
     age: numpy.float64
         The age of the universe, in Gyr
     """
-    age = planck.clone(H0=H0).age(0)
+    age = _planck().clone(H0=H0).age(0)
     unit = age.unit
     return age.value * unit.to(u.Gyr)
 
@@ -96,6 +104,8 @@ def age_in_gyr_simple(H0):
 
 
 def fit_line(x, y):
+    from astropy.modeling import models, fitting
+
     try:
         fit = fitting.LinearLSQFitter()
         line_init = models.Linear1D(intercept=0, fixed={"intercept": True})
@@ -149,6 +159,8 @@ def data_summary_for_component(data, component_id):
     return summary
 
 def measurement_list_to_glue_data(measurements: list[StudentMeasurement] | list[dict], label = ""):
+    from glue.core import Data
+
     x = []
     for measurement in measurements:
         if isinstance(measurement, StudentMeasurement):
@@ -162,7 +174,9 @@ M = TypeVar("M", bound=BaseModel)
 def models_to_glue_data(items: List[M],
                         label: str | None=None,
                         ignore_components: list[str] | None=None
-) -> Data:
+) -> "Data":
+    from glue.core import Data
+
     data_dict = {}
     if items:
         t = type(items[0])
@@ -183,11 +197,13 @@ def create_single_summary(distances: List[Number], velocities: List[Number]) ->
     return h0, age
 
 
-def make_summary_data(measurement_data: Data,
+def make_summary_data(measurement_data: "Data",
                       input_id_field: str="id",
                       output_id_field: str | None=None,
                       label: str | None=None
-) -> Data:
+) -> "Data":
+    from glue.core import Data
+
     dists = defaultdict(list)
     vels = defaultdict(list)
     d = measurement_data["est_dist_value"]
@@ -289,7 +305,7 @@ def sync_reactives(a: Reactive[A],
     b.subscribe(on_b_changed)
 
 
-def _add_or_update_data(gjapp: JupyterApplication, data: Data):
+def _add_or_update_data(gjapp: "JupyterApplication", data: "Data"):
     if data.label in gjapp.data_collection:
         existing = gjapp.data_collection[data.label]
         existing.update_values_from_data(data)
@@ -299,6 +315,8 @@ def _add_or_update_data(gjapp: JupyterApplication, data: Data):
         return data
     
 def _add_link(gjapp, from_dc_name, from_att, to_dc_name, to_att):
+    from glue.core import Data
+
     if isinstance(from_dc_name, Data):
         from_dc = from_dc_name
     else:
@@ -1,4 +1,7 @@
 from cosmicds.viewers import PlotlyDotPlotView, cds_viewer
+from cosmicds.viewers.dotplot.viewer import DotplotScatterLayerArtist
+from glue.core.exceptions import IncompatibleAttribute
+from hubbleds.binning import DotStacker
 from .tools import WavelengthZoom  # noqa
 
 __all__ = ["HubbleDotPlotView"]
@@ -20,3 +23,59 @@ HubbleDotPlotView = cds_viewer(
     ],
     label="Dot Plot",
 )
+
+
+class HubbleDotplotLayerArtist(DotplotScatterLayerArtist):
+
+    def __init__(self, *args, **kwargs):
+        self.dot_stacker = DotStacker()
+        self._data_version = 0
+        super().__init__(*args, **kwargs)
+
+    def update(self):
+        # Called by the viewer whenever the layer's data or subset changes
+        self._data_version += 1
+        super().update()
+
+    def _dots_trace(self):
+        return next(
+            (t for t in self.traces() if "markers" in (getattr(t, "mode", None) or "")),
+            None
+        )
+
+    def _update_dots(self) -> bool:
+        state = self._viewer_state
+        if None in (state.x_att, state.hist_x_min, state.hist_x_max, state.hist_n_bin) \
+                or getattr(state, "x_log", False):
+            return False
+
+        dots = self._dots_trace()
+        if dots is None:
+            return False
+
+        try:
+            values = self.layer[state.x_att]
+            stack = self.dot_stacker.stack(
+                values,
+                state.hist_x_min,
+                state.hist_x_max,
+                state.hist_n_bin,
+                version=(self._data_version, state.x_att),
+            )
+        except (IncompatibleAttribute, ValueError):
+            return False
+
+        dots.update(x=stack.x, y=stack.y)
+        return True
+
+    def _update_data(self):
+        # Batch the trace updates within this layer's own figure, and
+        #  disable hover on the dots
+        with self.view.figure.batch_update():
+            if not self._update_dots():
+                super()._update_data()
+            for trace in self.traces():
+                trace.update(hoverinfo="skip", hovertemplate=None)
+
+HubbleDotPlotView._data_artist_cls = HubbleDotplotLayerArtist
+HubbleDotPlotView._subset_artist_cls = HubbleDotplotLayerArtist
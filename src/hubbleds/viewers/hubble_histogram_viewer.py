@@ -1,7 +1,10 @@
 from echo import delay_callback
 from cosmicds.viewers import CDSHistogramViewerState, PlotlyHistogramView
 from cosmicds.viewers import cds_viewer
+from glue.core.exceptions import IncompatibleAttribute
+from glue.viewers.histogram.state import HistogramLayerState
 from glue_plotly.viewers.histogram import PlotlyHistogramLayerArtist
+from hubbleds.binning import HistogramBinner, HistogramBins
 
 
 __all__ = [
@@ -30,8 +33,51 @@ HubbleHistogramView = cds_viewer(
 )
 
 
+class HubbleHistogramLayerState(HistogramLayerState):
+
+    data_version = 0
+
+    def __init__(self, *args, **kwargs):
+        self.binner = HistogramBinner()
+        super().__init__(*args, **kwargs)
+
+    def update_histogram(self):
+        # Compute the counts with numpy, collecting any values outside of the
+        #  bins into the end bins, and cache them per data version
+        viewer_state = self.viewer_state
+        if viewer_state is None or viewer_state.x_log or None in (
+            viewer_state.x_att, viewer_state.hist_x_min,
+            viewer_state.hist_x_max, viewer_state.hist_n_bin
+        ):
+            return super().update_histogram()
+
+        x_min, x_max = sorted((viewer_state.hist_x_min, viewer_state.hist_x_max))
+        bins = HistogramBins(x_min, x_max, viewer_state.hist_n_bin)
+        settings = (id(viewer_state.x_att), False, *bins)
+        if self._histogram_cache is not None and self._histogram_cache[0] == settings:
+            return self._histogram_cache[1]
+
+        try:
+            values = self.layer[viewer_state.x_att]
+            result = self.binner.counts(
+                values, bins, version=(self.data_version, viewer_state.x_att)
+            )
+        except (IncompatibleAttribute, ValueError):
+            return super().update_histogram()
+
+        self._histogram_cache = settings, result
+        return result
+
+
 class HubbleHistogramLayerArtist(PlotlyHistogramLayerArtist):
 
+    _layer_state_cls = HubbleHistogramLayerState
+
+    def update(self):
+        # Called by the viewer whenever the layer's data or subset changes
+        self.state.data_version += 1
+        super().update()
+
     def _update_data(self):
         super()._update_data()
         for bar in self.traces():
@@ -1 +1,7 @@
-from .selection_tool_widget import SelectionToolWidget
\ No newline at end of file
+from hubbleds.lazy import lazy_attributes
+
+__all__ = ["SelectionToolWidget"]
+
+__getattr__, __dir__ = lazy_attributes(__name__, {
+    "SelectionToolWidget": ".selection_tool_widget",
+})
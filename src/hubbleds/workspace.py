@@ -0,0 +1,289 @@
+from collections import OrderedDict
+from threading import RLock
+from typing import TYPE_CHECKING, Callable, Dict, Hashable, Iterable, List, NamedTuple, Optional, Tuple, Type, TypeVar
+
+from glue.core import DataCollection, Session
+from glue.viewers.common.viewer import Viewer
+from ipywidgets import Widget
+
+from cosmicds.logger import setup_logger
+from hubbleds.base_marker import BaseMarker
+
+if TYPE_CHECKING:
+    from glue_jupyter import JupyterApplication
+
+logger = setup_logger("WORKSPACE")
+
+__all__ = [
+    "VIEWER_RETENTION_DISTANCE",
+    "GlueWorkspace",
+    "LazyViewer",
+    "MarkerViewers",
+    "close_viewer",
+    "find_workspace",
+    "get_workspace",
+    "reachable_stages",
+]
+
+# Stages within this many routes of the current route keep their viewers, so
+#  that stepping back and forth between neighbouring stages reuses them
+VIEWER_RETENTION_DISTANCE = 1
+
+V = TypeVar("V", bound=Viewer)
+
+
+def close_viewer(viewer: Viewer):
+    """
+    Disconnect a viewer from the glue hub and close its widgets, so that
+    neither the viewer nor its figure is kept alive by the session.
+
+    Open widgets are held by the widget registry until they are closed, so
+    all of the viewer's widgets (figure, toolbar, option panels and layout)
+    are closed, not only the ones that are displayed.
+    """
+    viewer.cleanup()
+    for value in list(vars(viewer).values()):
+        if isinstance(value, Widget):
+            value.close()
+
+
+class GlueWorkspace:
+    """
+    The glue application and the viewers of a single session.
+
+    Every stage page shares the one `JupyterApplication` of the workspace,
+    and acquires its viewers by ``(stage, key)`` with `viewer`. A viewer is
+    created (and set up) the first time it is acquired, and the same viewer
+    is returned when the stage is mounted again. Viewers are only closed when
+    their stage is released with `release` or `retain`.
+    """
+
+    def __init__(self, data_collection: DataCollection, session: Optional[Session] = None):
+        self.data_collection = data_collection
+        self.session = session
+        self._app: Optional["JupyterApplication"] = None
+        self._viewers: OrderedDict[Tuple[Hashable, Hashable], Viewer] = OrderedDict()
+        self._lock = RLock()
+
+    @property
+    def app(self) -> "JupyterApplication":
+        with self._lock:
+            if self._app is None:
+                # glue-jupyter is slow to import, and only needed once a
+                #  page makes its first viewer
+                from glue_jupyter import JupyterApplication
+                self._app = JupyterApplication(self.data_collection, self.session)
+            return self._app
+
+    def viewer(
+        self,
+        stage: Hashable,
+        key: Hashable,
+        viewer_cls: Type[V],
+        setup: Optional[Callable[[V], None]] = None,
+    ) -> V:
+        """
+        Acquire the viewer named ``key`` for ``stage``.
+
+        Parameters
+        ----------
+        stage: hashable
+            The stage that the viewer belongs to
+        key: hashable
+            The name of the viewer within the stage
+        viewer_cls: type
+            The class of viewer to create if the viewer doesn't exist yet
+        setup: callable, optional
+            Called with the viewer only when it is created, to add its data
+            and configure it
+
+        Returns
+        ----------
+        viewer: Viewer
+            The existing viewer for this key, or a newly created one
+        """
+        with self._lock:
+            viewer = self._viewers.get((stage, key))
+            if viewer is not None:
+                if not isinstance(viewer, viewer_cls):
+                    raise ValueError(
+                        f"Viewer `{key}` for stage `{stage}` is a "
+                        f"{type(viewer).__name__}, not a {viewer_cls.__name__}."
+                    )
+                return viewer
+
+            logger.info("Creating viewer `%s` for stage `%s`.", key, stage)
+            viewer = self.app.new_data_viewer(viewer_cls, show=False)
+            try:
+                if setup is not None:
+                    setup(viewer)
+            except Exception:
+                close_viewer(viewer)
+                raise
+            self._viewers[(stage, key)] = viewer
+            return viewer
+
+    def has_viewer(self, stage: Hashable, key: Hashable) -> bool:
+        return (stage, key) in self._viewers
+
+    def viewers(self, stage: Hashable) -> Dict[Hashable, Viewer]:
+        """The viewers that currently exist for ``stage``, by key."""
+        with self._lock:
+            return {k: v for (s, k), v in self._viewers.items() if s == stage}
+
+    @property
+    def live_viewers(self) -> List[Viewer]:
+        """Every open viewer of the workspace, including ones made by the app."""
+        with self._lock:
+            viewers = {id(v): v for v in self._viewers.values()}
+            if self._app is not None:
+                viewers.update((id(v), v) for v in self._app.viewers)
+            return list(viewers.values())
+
+    @property
+    def stages(self) -> set:
+        return {stage for stage, _ in self._viewers}
+
+    def release(self, stage: Hashable, key: Optional[Hashable] = None):
+        """
+        Close and forget the viewers of ``stage`` (or only the viewer named
+        ``key``). They will be created again if they are acquired later.
+        """
+        with self._lock:
+            keys = [k for k in self._viewers
+                    if k[0] == stage and (key is None or k[1] == key)]
+            for k in keys:
+                logger.info("Releasing viewer `%s` for stage `%s`.", k[1], k[0])
+                close_viewer(self._viewers.pop(k))
+
+    def retain(self, stages: Iterable[Hashable]):
+        """Release the viewers of every stage not in ``stages``."""
+        stages = set(stages)
+        for stage in self.stages - stages:
+            self.release(stage)
+
+    def close(self):
+        with self._lock:
+            for stage in list(self.stages):
+                self.release(stage)
+
+    def memory_stats(self) -> Dict[str, int]:
+        """
+        Counts of the objects held by this session's glue workspace, and the
+        approximate size of the data arrays in its data collection.
+        """
+        nbytes = 0
+        for data in self.data_collection:
+            for cid in data.main_components:
+                try:
+                    nbytes += data.get_component(cid).data.nbytes
+                except (AttributeError, TypeError):
+                    pass
+
+        app_viewers = self._app.viewers if self._app is not None else []
+        return {
+            "viewers": len(self._viewers),
+            "app_viewers": len(app_viewers),
+            "data": len(self.data_collection),
+            "subsets": sum(len(data.subsets) for data in self.data_collection),
+            "data_bytes": nbytes,
+        }
+
+
+class LazyViewer(NamedTuple):
+    """
+    A viewer that is created the first time the story reaches one of the
+    marker ranges in which it is shown. A range with no end marker runs to
+    the end of the stage.
+    """
+    viewer_cls: Type[Viewer]
+    ranges: Tuple[Tuple[BaseMarker, Optional[BaseMarker]], ...]
+    setup: Optional[Callable[[Viewer], None]] = None
+
+    def shown_at(self, marker: BaseMarker) -> bool:
+        return any(
+            BaseMarker.is_between(marker, start, end or marker.last())
+            for start, end in self.ranges
+        )
+
+
+class MarkerViewers:
+    """
+    The viewers of a stage, created lazily as the story reaches the markers
+    at which they are shown.
+
+    Indexing creates a viewer (through the workspace, so that it is reused
+    when the stage is mounted again) if it doesn't exist yet. `prepare`
+    creates the viewers shown at a given marker, and can be used to build
+    the viewers for the next marker ahead of time.
+    """
+
+    def __init__(
+        self,
+        workspace: GlueWorkspace,
+        stage: Hashable,
+        viewers: Dict[str, LazyViewer],
+    ):
+        self.workspace = workspace
+        self.stage = stage
+        self.specs = viewers
+
+    def __getitem__(self, key: str) -> Viewer:
+        spec = self.specs[key]
+        return self.workspace.viewer(self.stage, key, spec.viewer_cls, setup=spec.setup)
+
+    def __contains__(self, key: str) -> bool:
+        return self.workspace.has_viewer(self.stage, key)
+
+    def get(self, key: str) -> Optional[Viewer]:
+        """The viewer named ``key`` if it has been created, otherwise None."""
+        return self[key] if key in self else None
+
+    def keys_for(self, marker: BaseMarker) -> List[str]:
+        return [key for key, spec in self.specs.items() if spec.shown_at(marker)]
+
+    def prepare(self, marker: BaseMarker) -> Dict[str, Viewer]:
+        """Create (or retrieve) the viewers that are shown at ``marker``."""
+        return {key: self[key] for key in self.keys_for(marker)}
+
+
+# The workspace is stored on the session's data collection rather than in a
+#  module-level mapping, so that it is collected along with the session
+_WORKSPACE_ATTRIBUTE = "_hubbleds_workspace"
+_WORKSPACES_LOCK = RLock()
+
+
+def get_workspace(global_state) -> GlueWorkspace:
+    """
+    The glue workspace for the session that owns ``global_state``. The
+    workspace lives as long as the session's glue data collection.
+    """
+    state = global_state.value
+    data_collection = state.glue_data_collection
+    with _WORKSPACES_LOCK:
+        workspace = getattr(data_collection, _WORKSPACE_ATTRIBUTE, None)
+        if workspace is None:
+            workspace = GlueWorkspace(data_collection, state.glue_session)
+            setattr(data_collection, _WORKSPACE_ATTRIBUTE, workspace)
+        return workspace
+
+
+def find_workspace(data_collection: DataCollection) -> Optional[GlueWorkspace]:
+    """The workspace of a session's data collection, if it has one yet."""
+    return getattr(data_collection, _WORKSPACE_ATTRIBUTE, None)
+
+
+def reachable_stages(
+    routes: Iterable,
+    index: Optional[int],
+    distance: int = VIEWER_RETENTION_DISTANCE,
+) -> set:
+    """
+    The stage keys within ``distance`` routes of the route at ``index``. The
+    key of a stage is its route path without slashes, as in
+    ``router.path.strip("/")``.
+    """
+    paths = [route.path.strip("/") for route in routes]
+    if index is None:
+        return set(paths)
+    return set(paths[max(index - distance, 0):index + distance + 1])
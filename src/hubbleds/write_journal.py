@@ -0,0 +1,227 @@
+import json
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Callable, Dict, List, NamedTuple, Optional, Union
+
+from cosmicds.logger import setup_logger
+
+logger = setup_logger("WRITE_JOURNAL")
+
+__all__ = [
+    "WRITE_JOURNAL_ENV",
+    "JournalEntry",
+    "WriteJournal",
+]
+
+# The SQLite file of the write journal of this worker. The writes of
+#  `LocalAPI` are sent to the API directly when this isn't set.
+WRITE_JOURNAL_ENV = "HUBBLEDS_WRITE_JOURNAL"
+
+# The flusher retries a failed write after this many seconds, doubling
+#  the wait after each further failure
+RETRY_SECONDS = 1.0
+MAX_RETRY_SECONDS = 60.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS writes (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    key TEXT NOT NULL,
+    method TEXT NOT NULL,
+    url TEXT NOT NULL,
+    body BLOB NOT NULL,
+    headers TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS writes_key ON writes (key);
+"""
+
+
+class JournalEntry(NamedTuple):
+    id: int
+    key: str
+    method: str
+    url: str
+    body: bytes
+    headers: Dict[str, str]
+    attempts: int
+
+
+class WriteJournal:
+    """
+    An append-only journal of the writes that `LocalAPI` makes to the API,
+    kept in a SQLite file so that writes which weren't sent survive a
+    restart of the worker.
+
+    A write is acknowledged as soon as it is in the journal, and a flusher
+    thread sends the writes in the order they were made. Each write has a
+    key, such as the URL of a story state or the galaxy of a measurement;
+    writing a key again replaces its unsent write, since every write holds
+    the whole document. If a write fails with a server or connection error,
+    the flusher stops and retries it later, so that later writes aren't
+    sent before it. A write that the API rejects (a 4xx status) would never
+    succeed, so it is logged and dropped.
+
+    Each worker process should have its own journal file, since every
+    journal that is started sends all of the writes in its file.
+    """
+
+    def __init__(
+        self,
+        path: Union[str, Path],
+        retry: float = RETRY_SECONDS,
+        max_retry: float = MAX_RETRY_SECONDS,
+    ):
+        self.path = Path(path)
+        self.retry = retry
+        self.max_retry = max_retry
+        self.sent = 0
+        self.dropped = 0
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._connection = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+        self._replay_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._connection.execute("SELECT COUNT(*) FROM writes").fetchone()[0]
+
+    def append(
+        self,
+        key: str,
+        method: str,
+        url: str,
+        body: bytes,
+        headers: Optional[Dict[str, str]] = None,
+    ) -> int:
+        """
+        Add a write to the journal, replacing the unsent write of ``key``.
+
+        Returns
+        ----------
+        id: int
+            The position of the write in the journal
+        """
+        with self._lock:
+            self._connection.execute("BEGIN IMMEDIATE")
+            try:
+                self._connection.execute("DELETE FROM writes WHERE key = ?", (key,))
+                cursor = self._connection.execute(
+                    "INSERT INTO writes (key, method, url, body, headers) VALUES (?, ?, ?, ?, ?)",
+                    (key, method, url, body, json.dumps(headers or {})),
+                )
+                self._connection.execute("COMMIT")
+            except BaseException:
+                self._connection.execute("ROLLBACK")
+                raise
+        self._wake.set()
+        return cursor.lastrowid
+
+    def pending(self) -> List[JournalEntry]:
+        """The writes that weren't sent yet, in the order they are sent."""
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT id, key, method, url, body, headers, attempts FROM writes ORDER BY id"
+            ).fetchall()
+        return [
+            JournalEntry(id, key, method, url, bytes(body), json.loads(headers), attempts)
+            for id, key, method, url, body, headers, attempts in rows
+        ]
+
+    def _remove(self, entry: JournalEntry):
+        with self._lock:
+            self._connection.execute("DELETE FROM writes WHERE id = ?", (entry.id,))
+
+    def _failed(self, entry: JournalEntry):
+        with self._lock:
+            self._connection.execute(
+                "UPDATE writes SET attempts = attempts + 1 WHERE id = ?", (entry.id,)
+            )
+
+    def replay(
+        self,
+        send: Callable[[JournalEntry], int],
+        where: Optional[Callable[[JournalEntry], bool]] = None,
+    ) -> bool:
+        """
+        Send the pending writes in order with ``send``, which returns the
+        status code of the response, until one of them fails. If ``where``
+        is given, only the writes for which it is true are sent, e.g. those
+        of a student whose state is about to be read.
+
+        Returns
+        ----------
+        done: bool
+            Whether every pending write was sent or dropped
+        """
+        # The flusher and the reads that send a student's writes first
+        #  mustn't send the same write twice
+        with self._replay_lock:
+            for entry in self.pending():
+                if where is not None and not where(entry):
+                    continue
+                try:
+                    status = send(entry)
+                except Exception as e:
+                    logger.warning("Could not send %s %s: %s", entry.method, entry.url, e)
+                    self._failed(entry)
+                    return False
+
+                if 200 <= status < 300:
+                    self.sent += 1
+                elif 400 <= status < 500:
+                    logger.error("The API rejected %s %s with status %d.", entry.method, entry.url, status)
+                    self.dropped += 1
+                else:
+                    logger.warning("Failed to send %s %s: status %d.", entry.method, entry.url, status)
+                    self._failed(entry)
+                    return False
+                self._remove(entry)
+        return True
+
+    def start(self, send: Callable[[JournalEntry], int]) -> threading.Thread:
+        """
+        Send the journal's writes with ``send`` from a daemon thread,
+        starting with those left over from a previous run.
+        """
+        if self._thread is not None:
+            return self._thread
+
+        def _flush():
+            wait = None
+            while not self._stopped.is_set():
+                # New writes don't cut a retry wait short
+                if wait is None:
+                    self._wake.wait()
+                    self._wake.clear()
+                elif self._stopped.wait(wait):
+                    break
+                if self._stopped.is_set():
+                    break
+                if self.replay(send):
+                    wait = None
+                else:
+                    wait = self.retry if wait is None else min(2 * wait, self.max_retry)
+
+        left_over = len(self)
+        if left_over:
+            logger.info("Replaying %d writes left in `%s`.", left_over, self.path)
+        self._thread = threading.Thread(target=_flush, name="write-journal", daemon=True)
+        self._thread.start()
+        self._wake.set()
+        return self._thread
+
+    def close(self):
+        """Stop the flusher; writes that weren't sent stay in the journal."""
+        self._stopped.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        with self._lock:
+            self._connection.close()
@@ -7,4 +7,26 @@
     - https://docs.pytest.org/en/stable/writing_plugins.html
 """
 
-# import pytest
+import pytest
+
+
+def _make_measurement(galaxy_id, measurement_number=None, student_id=1):
+    from hubbleds.state import GalaxyData, StudentMeasurement
+
+    galaxy = None
+    if galaxy_id:
+        galaxy = GalaxyData(
+            id=galaxy_id, name=f"{galaxy_id}.fits", ra=0, decl=0, z=0.01, type="Sp", element="H-α",
+        )
+    return StudentMeasurement(
+        student_id=student_id, galaxy=galaxy, measurement_number=measurement_number,
+    )
+
+
+@pytest.fixture
+def make_measurement():
+    """
+    A factory of `StudentMeasurement`s of the galaxy ``galaxy_id`` (no
+    galaxy if it is 0), for the tests of the state and its updates.
+    """
+    return _make_measurement
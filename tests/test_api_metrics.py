@@ -0,0 +1,120 @@
+import time
+from pathlib import Path
+from types import SimpleNamespace
+from urllib.request import urlopen
+
+import pytest
+
+pytest.importorskip("cosmicds")
+
+import solara
+
+from hubbleds.api_metrics import API_METRICS, APIMetrics, Histogram
+from hubbleds.remote import LocalAPI
+from hubbleds.stand_in_api import FaultConfig, StandInAPI, StandInStore
+from hubbleds.state import LocalState
+
+SPECTRA_ROOT = Path(__file__).parent / "data"
+
+
+@pytest.fixture(scope="module")
+def store():
+    return StandInStore.synthetic("class", seed=2)
+
+
+@pytest.fixture
+def api(store):
+    with StandInAPI(store, faults=FaultConfig(latency=0.02), spectra_root=SPECTRA_ROOT) as server:
+        api = LocalAPI()
+        api.API_URL = server.url
+        API_METRICS.reset()
+        API_METRICS.enable()
+        yield api
+        API_METRICS.disable()
+        API_METRICS.reset()
+
+
+def test_histogram():
+    histogram = Histogram((1, 10))
+    for value in (0.5, 1, 5, 50):
+        histogram.observe(value)
+    assert histogram.cumulative() == [("1", 2), ("10", 3), ("+Inf", 4)]
+    assert histogram.sum == 56.5
+    assert histogram.count == 4
+
+
+def test_endpoint_metrics(api, store):
+    local_state = solara.reactive(LocalState())
+    galaxies = api.get_galaxies(local_state)
+    api.load_spectrum_data(galaxies[0], local_state)
+    api.load_spectrum_data(galaxies[0], local_state)
+    api.get_all_data(local_state)
+
+    metrics = API_METRICS.snapshot()
+    assert set(metrics) == {"get_all_data", "get_galaxies", "load_spectrum_data"}
+
+    galaxy_metrics = metrics["get_galaxies"]
+    assert galaxy_metrics["status"] == {"200": 1}
+    assert galaxy_metrics["rows"]["sum"] == len(store.galaxies)
+    assert galaxy_metrics["bytes"]["sum"] > 0
+    seconds = galaxy_metrics["seconds"]
+    assert seconds["network"]["sum"] >= 0.02
+    assert seconds["total"]["sum"] == pytest.approx(
+        seconds["network"]["sum"] + seconds["decode"]["sum"]
+    )
+
+    spectrum_metrics = metrics["load_spectrum_data"]
+    assert spectrum_metrics["cache"] == {"miss": 1, "hit": 1}
+    assert spectrum_metrics["seconds"]["total"]["count"] == 2
+    assert spectrum_metrics["bytes"]["count"] == 1
+
+    assert metrics["get_all_data"]["rows"]["sum"] == (
+        len(store.measurements) + len(store.student_summaries) + len(store.classes)
+    )
+
+
+def test_nested_calls():
+    metrics = APIMetrics(enabled=True)
+
+    def send():
+        time.sleep(0.02)
+        return SimpleNamespace(content=b"{}", status_code=200)
+
+    def outer():
+        metrics.request(send)
+        return metrics.call("inner", lambda: metrics.request(send), (), {})
+
+    metrics.call("outer", outer, (), {})
+    snapshot = metrics.snapshot()
+    assert snapshot["outer"]["bytes"]["sum"] == 4
+    assert snapshot["inner"]["bytes"]["sum"] == 2
+    assert snapshot["outer"]["seconds"]["network"]["sum"] >= 0.04
+    assert snapshot["outer"]["status"] == {"200": 1}
+
+
+def test_disabled(api):
+    API_METRICS.disable()
+    api.get_galaxies(solara.reactive(LocalState()))
+    assert API_METRICS.snapshot() == {}
+
+
+def test_prometheus_export(tmp_path):
+    metrics = APIMetrics(enabled=True)
+    metrics.call("get_galaxies", lambda: [1, 2, 3], (), {})
+    text = metrics.prometheus()
+    assert '# TYPE hubbleds_api_seconds histogram' in text
+    assert 'hubbleds_api_seconds_count{endpoint="get_galaxies",phase="total"} 1' in text
+    assert 'hubbleds_api_rows_bucket{endpoint="get_galaxies",le="10"} 1' in text
+
+    metrics.dump(tmp_path / "metrics.prom")
+    assert (tmp_path / "metrics.prom").read_text() == text
+    metrics.dump(tmp_path / "metrics.json")
+    assert "get_galaxies" in (tmp_path / "metrics.json").read_text()
+
+    server = metrics.serve()
+    try:
+        host, port = server.server_address[:2]
+        with urlopen(f"http://{host}:{port}/metrics") as response:
+            assert response.read().decode() == text
+    finally:
+        metrics.stop_serving()
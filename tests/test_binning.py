@@ -0,0 +1,121 @@
+import numpy as np
+import pytest
+
+from hubbleds.binning import (
+    MAX_HISTOGRAM_BINS,
+    DotStacker,
+    HistogramBinner,
+    histogram_bins,
+    histogram_counts,
+    stack_dots,
+)
+
+
+def reference_dot_positions(values, x_min, x_max, nbin):
+    counts, edges = np.histogram(values, range=(x_min, x_max), bins=nbin)
+    x, y = [], []
+    for i in range(nbin):
+        x.extend([(edges[i] + edges[i + 1]) / 2] * counts[i])
+        y.extend(range(1, counts[i] + 1))
+    return counts, np.array(x), np.array(y)
+
+
+def sorted_positions(x, y):
+    order = np.lexsort((y, x))
+    return x[order], y[order]
+
+
+@pytest.mark.parametrize("size", [0, 1, 100, 10_000])
+def test_stack_dots_matches_histogram(size):
+    """Dot positions match a histogram of the same values"""
+    rng = np.random.default_rng(size)
+    values = rng.normal(5000, 3000, size)
+    values[::17] = np.nan
+    counts, x, y = reference_dot_positions(values[np.isfinite(values)], 0, 10000, 74)
+
+    stack = stack_dots(values, 0, 10000, 74)
+    np.testing.assert_array_equal(stack.counts, counts)
+    np.testing.assert_allclose(stack.x, x)
+    np.testing.assert_array_equal(stack.y, y)
+
+
+def test_stack_dots_edges():
+    """Values on bin edges are assigned like numpy.histogram"""
+    values = np.linspace(-1, 1, 201)
+    counts, _, _ = reference_dot_positions(values, -1, 1, 7)
+    np.testing.assert_array_equal(stack_dots(values, -1, 1, 7).counts, counts)
+
+    with pytest.raises(ValueError):
+        stack_dots(values, 1, 1, 7)
+
+
+def test_stacker_cache():
+    """Results are cached per version and bin range"""
+    values = np.random.default_rng(1).uniform(0, 100, 500)
+    stacker = DotStacker()
+    first = stacker.stack(values, 0, 100, 20, version=1)
+    zoomed = stacker.stack(values, 20, 60, 20, version=1)
+    assert stacker.stack(values, 0, 100, 20, version=1) is first
+    assert stacker.stack(values, 20, 60, 20, version=1) is zoomed
+    assert stacker.stack(values, 0, 100, 20) is not first
+
+
+def test_stacker_append():
+    """Appending measurements matches restacking from scratch"""
+    rng = np.random.default_rng(2)
+    values = rng.uniform(0, 100, 1000)
+    stacker = DotStacker()
+    stacker.stack(values, 0, 100, 20, version=1)
+
+    for version, new in enumerate([[50.0], [50.1, 50.2, 150.0], []], start=2):
+        values = np.concatenate([values, new])
+        stack = stacker.stack(values, 0, 100, 20, version=version)
+        expected = stack_dots(values, 0, 100, 20)
+        np.testing.assert_array_equal(stack.counts, expected.counts)
+        for actual, wanted in zip(sorted_positions(stack.x, stack.y),
+                                  sorted_positions(expected.x, expected.y)):
+            np.testing.assert_allclose(actual, wanted)
+
+
+def test_histogram_bins():
+    """Bins cover typical ages with 1 Gyr bins, as before"""
+    ages = np.random.default_rng(3).normal(13, 2, 30)
+    bins = histogram_bins([ages[:10], ages[10:]])
+    assert bins.x_min == round(ages.min()) - 2.5
+    assert bins.x_max == round(ages.max()) + 2.5
+    assert bins.nbin == int(bins.x_max - bins.x_min)
+
+    assert histogram_bins([]) is None
+    assert histogram_bins([np.array([np.nan])]) is None
+
+
+def test_histogram_bins_outliers():
+    """A bogus age doesn't blow up the number of bins"""
+    ages = np.append(np.random.default_rng(4).normal(13, 2, 1000), 10_000)
+    bins = histogram_bins([ages])
+    assert bins.x_max < 50
+    assert bins.nbin <= MAX_HISTOGRAM_BINS
+
+    wide = np.random.default_rng(5).uniform(0, 5000, 1000)
+    assert histogram_bins([wide]).nbin == MAX_HISTOGRAM_BINS
+
+
+def test_histogram_counts_overflow():
+    """Values outside of the range are counted in the end bins"""
+    values = np.array([-100, 0.5, 1.5, 1.5, 9.5, 10, 1e6, np.nan])
+    edges, counts = histogram_counts(values, 0, 10, 10)
+    np.testing.assert_array_equal(edges, np.arange(11))
+    np.testing.assert_array_equal(counts, [2, 2, 0, 0, 0, 0, 0, 0, 0, 3])
+
+
+def test_histogram_binner_cache():
+    """Bins and counts are cached per data version"""
+    ages = np.random.default_rng(6).normal(13, 2, 100)
+    binner = HistogramBinner()
+    bins = binner.bins([ages])
+    assert binner.bins([ages.copy()]) is bins
+    assert binner.bins([ages + 100]) != bins
+
+    counts = binner.counts(ages, bins, version=1)
+    assert binner.counts(ages, bins, version=1) is counts
+    assert binner.counts(ages, bins, version=2) is not counts
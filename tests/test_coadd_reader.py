@@ -0,0 +1,48 @@
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from hubbleds.coadd_reader import (
+    read_coadd_columns,
+    read_coadd_spectrum,
+    read_coadd_spectrum_astropy,
+)
+
+SPECTRA_ROOT = Path(__file__).parent / "data"
+SPECTRA = sorted(SPECTRA_ROOT.glob("*.fits"))
+
+
+@pytest.mark.parametrize("path", SPECTRA, ids=lambda p: p.stem)
+def test_matches_astropy(path):
+    """The fast reader returns the same values as the astropy reader"""
+    content = path.read_bytes()
+    fast = read_coadd_spectrum(content)
+    slow = read_coadd_spectrum_astropy(content, name=path.name)
+
+    for fast_arr, slow_arr in zip(fast, slow):
+        assert fast_arr.dtype.isnative
+        np.testing.assert_array_equal(fast_arr, slow_arr)
+
+
+def test_selected_columns():
+    """Only the requested columns are returned"""
+    columns = read_coadd_columns(SPECTRA[0].read_bytes(), columns=("FLUX", "and_mask"))
+    assert list(columns) == ["flux", "and_mask"]
+    assert columns["and_mask"].dtype == np.int32
+
+
+def test_missing():
+    """Missing extensions and columns raise a KeyError"""
+    content = SPECTRA[0].read_bytes()
+    with pytest.raises(KeyError):
+        read_coadd_columns(content, columns=("not_a_column",))
+    with pytest.raises(KeyError):
+        read_coadd_columns(content, extname="NOT_AN_EXTENSION")
+
+
+def test_truncated():
+    """Truncated files raise a ValueError so callers can fall back"""
+    content = SPECTRA[0].read_bytes()
+    with pytest.raises(ValueError):
+        read_coadd_spectrum(content[:2880 * 3])
@@ -0,0 +1,70 @@
+import importlib.util
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("cosmicds")
+
+import solara
+
+from hubbleds.dirty_tracking import (
+    EXAMPLE_MEASUREMENTS,
+    MEASUREMENTS,
+    STAGE_STATE,
+    STORY_STATE,
+    DirtyTracker,
+)
+from hubbleds.state import LocalState, update_measurement
+
+STAGE_3 = Path(__file__).parents[1] / "src" / "hubbleds" / "pages" / "03-distance-measurements"
+
+
+def test_local_state_categories(make_measurement):
+    local_state = solara.reactive(LocalState(
+        measurements=[make_measurement(g) for g in (1, 2)],
+        example_measurements=[make_measurement(9, "first")],
+    ))
+    tracker = DirtyTracker.for_state(local_state.value)
+    assert tracker.dirty(local_state.value) == {STORY_STATE, MEASUREMENTS, EXAMPLE_MEASUREMENTS}
+    tracker.flushed(local_state.value)
+    assert tracker.dirty(local_state.value) == set()
+
+    # Fields that aren't written, or only matter to the UI
+    local_state.set(local_state.value.model_copy(update={
+        "show_snackbar": True,
+        "snackbar_message": "Saved",
+        "class_measurements": [make_measurement(3)],
+        "measurements_loaded": True,
+    }))
+    assert tracker.dirty(local_state.value) == set()
+
+    update_measurement(local_state, 2, velocity_value=1000)
+    assert tracker.dirty_fields(local_state.value) == {"measurements"}
+    assert tracker.dirty(local_state.value) == {MEASUREMENTS}
+
+    # A model changed in place is seen through its JSON
+    local_state.value.free_responses.add("galaxy_motion")
+    assert tracker.dirty(local_state.value) == {MEASUREMENTS, STORY_STATE}
+
+    # Flushing one category leaves the others dirty
+    tracker.flushed(local_state.value, [MEASUREMENTS])
+    assert tracker.dirty(local_state.value) == {STORY_STATE}
+    tracker.flushed(local_state.value, [STORY_STATE])
+    assert tracker.dirty(local_state.value) == set()
+
+    update_measurement(local_state, 9, example=True, obs_wave_value=6600)
+    assert tracker.dirty(local_state.value) == {EXAMPLE_MEASUREMENTS}
+
+
+def test_stage_state_categories():
+    spec = importlib.util.spec_from_file_location("stage_3_component_state", STAGE_3 / "component_state.py")
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+
+    state = module.ComponentState()
+    tracker = DirtyTracker.for_state(state)
+    tracker.flushed(state)
+
+    # The selected galaxies aren't written with the stage state
+    assert tracker.dirty(state.model_copy(update={"selected_galaxy": 3})) == set()
+    assert tracker.dirty(state.model_copy(update={"n_meas": 3})) == {STAGE_STATE}
@@ -0,0 +1,56 @@
+import pytest
+
+pytest.importorskip("cosmicds")
+
+import numpy as np
+from cosmicds.viewers.dotplot.viewer import DotplotScatterLayerArtist
+from glue.core import Data, DataCollection
+from glue_jupyter import JupyterApplication
+
+from hubbleds.viewers.hubble_dotplot import HubbleDotPlotView, HubbleDotplotLayerArtist
+
+ORIGINAL_UPDATE_DATA = DotplotScatterLayerArtist._update_data
+
+
+def _new_session_viewer():
+    app = JupyterApplication(DataCollection())
+    data = Data(label="velocities", x=np.random.default_rng(0).normal(size=50))
+    app.data_collection.append(data)
+    viewer = app.new_data_viewer(HubbleDotPlotView, data=data, show=False)
+    return viewer, data
+
+
+def _count_batch_updates(viewers):
+    counts = {}
+    for viewer in viewers:
+        figure = viewer.figure
+        original = figure.batch_update
+
+        def counting(figure=figure, original=original):
+            counts[id(figure)] = counts.get(id(figure), 0) + 1
+            return original()
+
+        figure.batch_update = counting
+    return counts
+
+
+def test_layer_artist():
+    """Dotplot layers use the hover-free artist and have no hover"""
+    viewer, _ = _new_session_viewer()
+    assert all(isinstance(layer, HubbleDotplotLayerArtist) for layer in viewer.layers)
+    for layer in viewer.layers:
+        for trace in layer.traces():
+            assert trace.hoverinfo == "skip"
+
+
+@pytest.mark.parametrize("nviewers", [1, 5, 20])
+def test_update_cost_constant(nviewers):
+    """Updating a layer only touches its own figure, however many viewers exist"""
+    viewers = [_new_session_viewer() for _ in range(nviewers)]
+    assert DotplotScatterLayerArtist._update_data is ORIGINAL_UPDATE_DATA
+
+    counts = _count_batch_updates([v for v, _ in viewers])
+    viewer, data = viewers[0]
+    viewer.layers[0]._update_data()
+
+    assert counts == {id(viewer.figure): 1}
@@ -0,0 +1,76 @@
+import json
+
+import numpy as np
+import pytest
+from numpy.random import Generator, PCG64, SeedSequence
+
+from hubbleds.example_seed import (
+    EXAMPLE_SEED_PREFIX,
+    example_seed_artifact,
+    example_seed_indices,
+    load_example_seed_artifact,
+    verify_example_seed_artifact,
+)
+
+
+def reference_indices(velocities):
+    # The selection as originally written in `LocalAPI.get_example_seed_measurement`
+    good = [(vel is not None and vel > 0) for vel in velocities]
+    gen = Generator(PCG64(SeedSequence(42)))
+    indices = np.arange(len(good))
+    indices = indices[1::2][:85]
+    random_subset = gen.choice(indices[good[1::2][:85]], size=40, replace=False)
+    return np.ravel(np.column_stack((random_subset, random_subset + 1)))
+
+
+def make_records(n, seed=0):
+    rng = np.random.default_rng(seed)
+    velocities = rng.normal(10000, 5000, n)
+    return [
+        {
+            "galaxy_id": i // 2,
+            "measurement_number": "first" if i % 2 == 0 else "second",
+            "velocity_value": None if rng.random() < 0.05 else float(v),
+        }
+        for i, v in enumerate(velocities)
+    ]
+
+
+@pytest.mark.parametrize("n,seed", [(171, 0), (172, 1), (400, 2), (2000, 3)])
+def test_matches_original_selection(n, seed):
+    velocities = [r["velocity_value"] for r in make_records(n, seed)]
+    np.testing.assert_array_equal(example_seed_indices(velocities), reference_indices(velocities))
+
+
+def test_bounded_prefix():
+    """Sample measurements after the prefix never change the selection"""
+    records = make_records(EXAMPLE_SEED_PREFIX + 500)
+    velocities = [r["velocity_value"] for r in records]
+    selected = example_seed_indices(velocities)
+    assert selected.max() < EXAMPLE_SEED_PREFIX
+    np.testing.assert_array_equal(selected, example_seed_indices(velocities[:EXAMPLE_SEED_PREFIX]))
+
+
+def test_artifact(tmp_path):
+    records = make_records(1000)
+    artifact = example_seed_artifact("hubbles_law", records)
+    assert len(artifact["velocities"]) == EXAMPLE_SEED_PREFIX
+    assert len(artifact["measurements"]) == 80
+    assert verify_example_seed_artifact(artifact, records) == []
+
+    # A student submitting another measurement doesn't invalidate it
+    assert verify_example_seed_artifact(artifact, records + make_records(10, seed=5)) == []
+
+    path = tmp_path / "seed.json"
+    path.write_text(json.dumps(artifact))
+    assert load_example_seed_artifact("hubbles_law", path) == artifact["measurements"]
+    assert load_example_seed_artifact("other_story", path) is None
+    assert load_example_seed_artifact("hubbles_law", tmp_path / "missing.json") is None
+
+    tampered = dict(artifact, indices=artifact["indices"][::-1])
+    assert verify_example_seed_artifact(tampered)
+    path.write_text(json.dumps(tampered))
+    assert load_example_seed_artifact("hubbles_law", path) is None
+
+    stale = dict(artifact, version=0)
+    assert verify_example_seed_artifact(stale)
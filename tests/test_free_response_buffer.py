@@ -0,0 +1,81 @@
+import pytest
+
+pytest.importorskip("cosmicds")
+
+import solara
+
+from hubbleds.free_response_buffer import FREE_RESPONSE_BUFFER, FreeResponseBuffer
+from hubbleds.state import LocalState, fr_callback
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_writes_on_idle_and_max_interval():
+    clock = Clock()
+    buffer = FreeResponseBuffer(idle=2, max_interval=15, clock=clock, background=False)
+    writes = []
+
+    # Typing an answer of 20 characters, one every half second
+    for i in range(20):
+        clock.now = i * 0.5
+        buffer.update("reflect", lambda: writes.append(clock.now))
+        buffer.flush_due()
+    assert writes == [] and buffer.pending() == {"reflect"}
+
+    clock.now = 11.4
+    assert buffer.flush_due() == 0
+    clock.now = 11.5
+    assert buffer.flush_due() == 1
+    assert writes == [11.5] and buffer.pending() == set()
+
+    # Typing without a pause is still written every `max_interval` seconds
+    for i in range(62):
+        clock.now = 20 + i * 0.5
+        buffer.update("reflect", lambda: writes.append(clock.now))
+        buffer.flush_due()
+    assert writes == [11.5, 35.0, 50.5]
+    assert buffer.writes == 3
+
+
+def test_fr_callback_defers_writes():
+    local_state = solara.reactive(LocalState())
+    writes = []
+    callback = lambda: writes.append(local_state.value.free_responses.get_or_create("q1").response)
+
+    fr_callback(("fr-initialize", {"tag": "q1"}), local_state, callback)
+    assert len(writes) == 1
+
+    for text in ("H", "Hu", "Hub"):
+        fr_callback(("fr-update", {"tag": "q1", "response": text}), local_state, callback)
+    assert local_state.value.free_responses.get_or_create("q1").response == "Hub"
+    assert len(writes) == 1
+
+    fr_callback(("fr-blur", {"tag": "q1"}), local_state, callback)
+    assert writes == [writes[0], "Hub"]
+    assert not FREE_RESPONSE_BUFFER.flush()
+
+
+def test_watch_writes():
+    buffer = FreeResponseBuffer(background=False)
+    written = []
+    unwatch = buffer.watch(lambda: written.append(True))
+
+    # Answers that weren't written aren't reported as written
+    buffer.update("q1", lambda: False)
+    assert buffer.flush()
+    assert written == []
+
+    buffer.update("q1", lambda: True)
+    assert buffer.flush()
+    assert written == [True]
+
+    unwatch()
+    buffer.update("q1", lambda: True)
+    assert buffer.flush()
+    assert written == [True]
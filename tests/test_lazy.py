@@ -0,0 +1,40 @@
+import subprocess
+import sys
+
+import pytest
+
+pytest.importorskip("cosmicds")
+
+
+def _imported_modules(statement):
+    result = subprocess.run(
+        [sys.executable, "-c", f"{statement}; import sys; print(' '.join(sys.modules))"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return set(result.stdout.split())
+
+
+def test_components_are_imported_when_used():
+    modules = _imported_modules("import hubbleds.components")
+    assert "hubbleds.components.id_slider" not in modules
+    assert "glue_jupyter" not in modules
+
+    modules = _imported_modules("from hubbleds.components import IdSlider")
+    assert "hubbleds.components.id_slider" in modules
+    assert "hubbleds.components.spectrum_viewer" not in modules
+
+
+def test_unknown_attribute():
+    import hubbleds.components
+
+    assert "IdSlider" in dir(hubbleds.components)
+    with pytest.raises(AttributeError):
+        hubbleds.components.NotAComponent
+
+
+def test_utils_imports_without_glue():
+    modules = _imported_modules("import hubbleds.utils")
+    assert "glue.core" not in modules
+    assert "astropy.modeling" not in modules
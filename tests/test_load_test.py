@@ -0,0 +1,42 @@
+import pytest
+
+pytest.importorskip("cosmicds")
+
+from hubbleds.load_test import LATENCY_PERCENTILES, LoadReport, SessionReport
+
+
+def _report():
+    sessions = [
+        SessionReport(0, 10000, {"mount": [0.1, 0.2], "transition": [0.01] * 10}, []),
+        SessionReport(1, 10001, {"mount": [0.3], "transition": [0.02] * 10},
+                      ["transition: stuck at 02-distance-introduction intro_1"]),
+    ]
+    return LoadReport(
+        sessions=sessions,
+        wall_time=2.0,
+        cpu_time=1.0,
+        rss_start=100 * 2**20,
+        rss_end=150 * 2**20,
+        request_counts={"galaxies": 2, "spectrum": 10},
+    )
+
+
+def test_latency_percentiles():
+    report = _report()
+    percentiles = report.latency_percentiles()
+    assert list(percentiles) == ["mount", "transition"]
+    assert list(percentiles["mount"]) == list(LATENCY_PERCENTILES)
+    assert percentiles["mount"][50] == pytest.approx(0.2)
+    assert percentiles["transition"][50] == pytest.approx(0.015)
+
+    per_session = report.session_percentiles()
+    assert per_session[0][50] == pytest.approx(0.01)
+    assert per_session[1][50] == pytest.approx(0.02)
+
+
+def test_format():
+    text = _report().format()
+    assert "2 sessions in 2.0 s, 1.0 s CPU (50%)" in text
+    assert "(+50 MiB)" in text
+    assert "spectrum" in text.split("API requests")[1].splitlines()[1]
+    assert "1 errors" in text
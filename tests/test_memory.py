@@ -0,0 +1,85 @@
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("cosmicds")
+
+import numpy as np
+from glue.core import Data, DataCollection, Session
+from glue_plotly.viewers.scatter.viewer import PlotlyScatterView
+
+from hubbleds.memory import data_nbytes, deep_sizeof, memory_report, session_memory
+from hubbleds.reference_data import clear_reference_data, get_reference_data
+from hubbleds.state import LocalState, SpectrumData
+from hubbleds.synthetic import generate_population
+from hubbleds.workspace import get_workspace
+
+
+def test_deep_sizeof():
+    array = np.zeros(1000)
+    assert deep_sizeof(array) == 8000
+    # Shared objects are counted once
+    assert deep_sizeof([array, array]) < 8000 + 200
+    assert deep_sizeof({"a": [array], "b": "x" * 1000}) > 9000
+
+
+def test_data_nbytes():
+    data = Data(label="owned", x=np.zeros(100), y=np.zeros(100, dtype=np.int32))
+    assert data_nbytes(data) == (1200, 0)
+
+    reference = get_reference_data("memory-test", lambda: Data(label="shared", x=np.zeros(100)))
+    assert data_nbytes(reference.to_data()) == (0, 800)
+    clear_reference_data()
+
+
+def test_session_memory():
+    population = generate_population(1, 30, seed=5)
+    student_id = population.measurements[0].student_id
+    measurements = [m for m in population.measurements if m.student_id == student_id]
+    measurements[0].galaxy.__dict__["spectrum"] = SpectrumData(
+        name="spectrum", wave=list(range(4000)), flux=list(range(4000)), ivar=list(range(4000)),
+    )
+    local_state = LocalState(
+        measurements=measurements,
+        class_measurements=population.measurements,
+        student_summaries=population.student_summaries,
+    )
+
+    data_collection = DataCollection([Data(label="measurements", x=np.zeros(5000))])
+    reference = get_reference_data("memory-test", lambda: Data(label="reference", x=np.zeros(1000)))
+    data_collection.append(reference.to_data())
+    global_state = SimpleNamespace(
+        student=SimpleNamespace(id=student_id),
+        glue_data_collection=data_collection,
+        glue_session=Session(data_collection=data_collection),
+    )
+    viewer = get_workspace(SimpleNamespace(value=global_state)).viewer(
+        "stage", "scatter", PlotlyScatterView,
+        setup=lambda v: v.add_data(data_collection["measurements"]),
+    )
+
+    memory = session_memory(global_state, local_state, session="session")
+    assert memory.student_id == student_id
+    assert memory.data == {"measurements": 40000, "reference": 0}
+    assert memory.shared_data == 8000
+    assert memory.viewers == 1
+    assert memory.viewer_bytes > 0
+    assert memory.spectra > 3 * 4000 * 32
+
+    # The class measurements are estimated from a sample, and they don't
+    #  include the cached spectrum
+    lists = memory.local_state
+    assert lists["all_measurements"] < 100
+    assert lists["measurements"] < 3 * 4000 * 32
+    assert 25 < lists["class_measurements"] / lists["measurements"] < 35
+    assert memory.total == (
+        40000 + memory.spectra + sum(lists.values()) + memory.viewer_bytes
+    )
+    assert "session (student" in memory.format()
+    viewer.cleanup()
+    clear_reference_data()
+
+
+def test_memory_report():
+    # Outside of the solara server there are no sessions
+    assert memory_report().startswith("0 sessions")
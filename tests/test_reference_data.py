@@ -0,0 +1,95 @@
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("cosmicds")
+
+import numpy as np
+from glue.core import DataCollection
+
+from hubbleds import reference_data
+from hubbleds.data_management import EXAMPLE_GALAXY_SEED_DATA, HUBBLE_KEY_DATA_LABEL
+from hubbleds.reference_data import (
+    add_example_seed_data,
+    add_hubble_reference_data,
+    add_reference_data,
+    clear_reference_data,
+    load_reference_csv,
+    seed_data_from_records,
+)
+
+
+@pytest.fixture(autouse=True)
+def clear_registry():
+    clear_reference_data()
+    yield
+    clear_reference_data()
+
+
+def test_shared_arrays():
+    """Sessions get their own data, backed by the same read-only arrays"""
+    loads = []
+
+    def _loader():
+        loads.append(HUBBLE_KEY_DATA_LABEL)
+        return load_reference_csv(HUBBLE_KEY_DATA_LABEL)
+
+    one = add_reference_data(DataCollection(), HUBBLE_KEY_DATA_LABEL, _loader)
+    two = add_reference_data(DataCollection(), HUBBLE_KEY_DATA_LABEL, _loader)
+    assert len(loads) == 1
+    assert one is not two
+    assert one.label == two.label == HUBBLE_KEY_DATA_LABEL
+
+    for name in ("Galaxy", "Distance (Mpc)", "Velocity (km/s)"):
+        a, b = one.get_component(name).data, two.get_component(name).data
+        assert np.shares_memory(a, b)
+        assert not a.flags.writeable
+
+    one.style.color = "#FF0000"
+    assert two.style.color != "#FF0000"
+
+
+def test_hubble_reference_data():
+    data_collection = DataCollection()
+    key, hubble = add_hubble_reference_data(data_collection)
+    assert len(data_collection) == 2
+    assert add_hubble_reference_data(data_collection) == (key, hubble)
+    assert len(data_collection) == 2
+    assert hubble.get_component("Tweaked Velocity (km/s)").data.size == hubble.size
+
+
+RECORDS = [
+    {"galaxy_id": i // 2, "measurement_number": "first" if i % 2 == 0 else "second",
+     "velocity_value": 1000.0 + i}
+    for i in range(6)
+]
+
+
+def test_seed_data_from_records():
+    data = seed_data_from_records(RECORDS)
+    first = data[f"{EXAMPLE_GALAXY_SEED_DATA}_first"]
+    second = data[f"{EXAMPLE_GALAXY_SEED_DATA}_second"]
+    assert data[EXAMPLE_GALAXY_SEED_DATA].size == 6
+    assert list(first["velocity_value"]) == [1000, 1002, 1004]
+    assert list(second["galaxy_id"]) == [0, 1, 2]
+
+
+def test_example_seed_data_fetched_once(monkeypatch):
+    calls = []
+
+    def _fetch(local_state, which="both"):
+        calls.append(which)
+        return RECORDS
+
+    monkeypatch.setattr(reference_data.LOCAL_API, "get_example_seed_measurement", _fetch)
+    local_state = SimpleNamespace(value=SimpleNamespace(story_id="hubbles_law"))
+
+    sessions = [add_example_seed_data(DataCollection(), local_state) for _ in range(3)]
+    assert calls == ["both"]
+    assert [d.label for d in sessions[0]] == [
+        EXAMPLE_GALAXY_SEED_DATA,
+        f"{EXAMPLE_GALAXY_SEED_DATA}_first",
+        f"{EXAMPLE_GALAXY_SEED_DATA}_second",
+    ]
+    assert sessions[0][1] is not sessions[1][1]
+    assert np.shares_memory(sessions[0][1]["velocity_value"], sessions[2][1]["velocity_value"])
@@ -0,0 +1,130 @@
+import io
+import json
+import tarfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("cosmicds")
+
+import solara
+
+from hubbleds.remote import LocalAPI
+from hubbleds.state import GalaxyData, LocalState
+
+SPECTRA_ROOT = Path(__file__).parent / "data"
+
+GALAXIES = [
+    GalaxyData(id=355, name="spec-2022-53827-0286", ra=190.436, decl=35.0628,
+               z=0.023094, type="Sp", element="H-α"),
+    GalaxyData(id=1639, name="spec-1769-53502-0234", ra=189.645, decl=14.3524,
+               z=0.0306357, type="Sp", element="H-α"),
+]
+
+
+class SpectrumHandler(BaseHTTPRequestHandler):
+    bundle = True
+    requests = []
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        self.requests.append(("GET", self.path))
+        name = self.path.rsplit("/", 1)[-1]
+        path = SPECTRA_ROOT / name
+        if "/spectra/spiral/" not in self.path or not path.exists():
+            self.send_error(404)
+            return
+        content = path.read_bytes()
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def do_POST(self):
+        self.requests.append(("POST", self.path))
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        if not self.bundle or not self.path.endswith("/spectra/bundle"):
+            self.send_error(404)
+            return
+
+        buffer = io.BytesIO()
+        with tarfile.open(fileobj=buffer, mode="w:gz") as archive:
+            for file in body["files"]:
+                archive.add(SPECTRA_ROOT / file.rsplit("/", 1)[-1], arcname=file)
+        content = buffer.getvalue()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-tar")
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+
+@pytest.fixture
+def server(monkeypatch):
+    SpectrumHandler.requests = []
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), SpectrumHandler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    monkeypatch.setattr(LocalAPI, "API_URL", f"http://127.0.0.1:{httpd.server_port}")
+    yield SpectrumHandler
+    httpd.shutdown()
+    SpectrumHandler.bundle = True
+
+
+def test_load_spectra_bundle(server):
+    """All missing spectra are fetched with a single bundle request"""
+    api = LocalAPI()
+    spectra = api.load_spectra(GALAXIES, solara.reactive(LocalState()))
+
+    assert set(spectra) == {g.id for g in GALAXIES}
+    assert [r[0] for r in server.requests] == ["POST"]
+
+    # Cached spectra are not requested again
+    for galaxy in GALAXIES:
+        assert api.load_spectrum_data(galaxy, solara.reactive(LocalState())) is spectra[galaxy.id]
+    assert len(server.requests) == 1
+
+
+def test_load_spectra_fallback(server):
+    """Without the bundle endpoint, spectra are fetched individually"""
+    server.bundle = False
+    api = LocalAPI()
+    spectra = api.load_spectra(GALAXIES, solara.reactive(LocalState()))
+
+    assert set(spectra) == {g.id for g in GALAXIES}
+    methods = [r[0] for r in server.requests]
+    assert methods.count("POST") == 1
+    assert methods.count("GET") == len(GALAXIES)
+
+    # The missing endpoint is remembered
+    api.spectrum_cache.clear()
+    api.load_spectra(GALAXIES, solara.reactive(LocalState()))
+    assert [r[0] for r in server.requests].count("POST") == 1
+
+
+def test_example_seed_cached(monkeypatch):
+    """The seed measurements are selected once per process"""
+    records = [
+        {"measurement_number": "first" if i % 2 == 0 else "second", "velocity_value": 100.0 + i}
+        for i in range(300)
+    ]
+    calls = []
+
+    def _get(self, story_id):
+        calls.append(story_id)
+        return records
+
+    monkeypatch.setattr(LocalAPI, "_example_seed_cache", {})
+    monkeypatch.setattr(LocalAPI, "get_sample_measurements_json", _get)
+    monkeypatch.setattr("hubbleds.remote.load_example_seed_artifact", lambda story_id: None)
+
+    local_state = solara.reactive(LocalState())
+    both = LocalAPI().get_example_seed_measurement(local_state, which="both")
+    second = LocalAPI().get_example_seed_measurement(local_state, which="second")
+    assert len(both) == 80
+    assert second == [m for m in both if m["measurement_number"] == "second"]
+    assert calls == ["hubbles_law"]
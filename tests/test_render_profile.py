@@ -0,0 +1,67 @@
+import pytest
+
+pytest.importorskip("cosmicds")
+
+import solara
+from solara.toestand import Ref
+
+from hubbleds.render_profile import NO_TRIGGER, RenderProfiler
+from hubbleds.state import LOCAL_STATE, LocalState, StudentMeasurement
+
+COUNT = solara.reactive(0)
+
+
+@solara.component
+def Child(n):
+    solara.Text(str(n))
+
+
+@solara.component
+def Page():
+    solara.Text(str(len(LOCAL_STATE.value.measurements)))
+    Child(COUNT.value)
+
+
+@pytest.fixture
+def profiler():
+    profiler = RenderProfiler(packages=(__name__.split(".")[0], "hubbleds"))
+    profiler.install()
+    yield profiler
+    profiler.uninstall()
+    LOCAL_STATE.set(LocalState())
+    COUNT.set(0)
+
+
+def test_render_counts(profiler):
+    name = __name__.rsplit(".", 1)[-1]
+    _, rc = solara.render(Page(), handle_error=False)
+    COUNT.set(1)
+    Ref(LOCAL_STATE.fields.measurements).set([StudentMeasurement(student_id=1)])
+    rc.close()
+
+    components = profiler.stats(by=("component",))
+    assert components[(f"{name}.Page",)].count == 3
+    assert components[(f"{name}.Child",)].count == 2
+
+    by_trigger = profiler.stats(by=("component", "trigger"))
+    assert by_trigger[(f"{name}.Page", NO_TRIGGER)].count == 1
+    assert by_trigger[(f"{name}.Page", f"{name}.COUNT")].count == 1
+    assert by_trigger[(f"{name}.Child", f"{name}.COUNT")].count == 1
+    assert by_trigger[(f"{name}.Page", "LOCAL_STATE.measurements")].count == 1
+    # The child's props didn't change, so the measurements didn't render it
+    assert (f"{name}.Child", "LOCAL_STATE.measurements") not in by_trigger
+
+    report = profiler.report()
+    assert report.startswith("5 renders")
+    assert f"{name}.Page <- {name}.COUNT" in report
+
+    profiler.reset()
+    assert profiler.stats() == {}
+
+
+def test_uninstall(profiler):
+    profiler.uninstall()
+    _, rc = solara.render(Page(), handle_error=False)
+    rc.close()
+    assert profiler.stats() == {}
+    assert Page.f is Page.__dict__["f"]
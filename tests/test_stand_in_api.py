@@ -0,0 +1,103 @@
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("cosmicds")
+
+import solara
+
+from hubbleds.remote import LocalAPI
+from hubbleds.stand_in_api import FaultConfig, StandInAPI, StandInStore
+from hubbleds.state import LocalState
+
+SPECTRA_ROOT = Path(__file__).parent / "data"
+
+
+@pytest.fixture(scope="module")
+def store():
+    return StandInStore.synthetic("school", seed=1)
+
+
+@pytest.fixture
+def server(store):
+    with StandInAPI(store, spectra_root=SPECTRA_ROOT) as server:
+        yield server
+
+
+@pytest.fixture
+def api(server):
+    api = LocalAPI()
+    api.API_URL = server.url
+    return api
+
+
+def _global_state(store, class_id):
+    student_id = store.classes[class_id][0]
+    return SimpleNamespace(value=SimpleNamespace(
+        student=SimpleNamespace(id=student_id),
+        classroom=SimpleNamespace(class_info={"id": class_id}),
+    ))
+
+
+def test_reads(api, server, store):
+    local_state = solara.reactive(LocalState())
+    class_id = next(iter(store.classes))
+    global_state = _global_state(store, class_id)
+
+    galaxies = api.get_galaxies(local_state)
+    assert len(galaxies) == len(store.galaxies)
+
+    measurements = api.get_measurements(global_state, local_state)
+    assert len(measurements) == 5
+    assert all(m.galaxy is not None for m in measurements)
+
+    class_measurements = api.get_class_measurements(global_state, local_state)
+    assert len(class_measurements) == 5 * len(store.classes[class_id])
+
+    all_measurements, students, classes = api.get_all_data(local_state)
+    assert len(all_measurements) == len(store.measurements)
+    assert len(students) == len(store.student_summaries)
+    assert len(classes) == len(store.classes)
+
+    assert len(api.get_example_seed_measurement(local_state)) == 80
+
+    spectra = api.load_spectra(galaxies[:3], local_state)
+    assert len(spectra) == 3
+
+    assert server.request_counts["galaxies"] == 1
+    assert server.request_counts["spectra_bundle"] == 1
+    assert server.request_counts["unknown"] == 0
+
+
+def test_writes(api, server):
+    session = api.request_session
+    url = f"{server.url}/hubbles_law/submit-measurement/"
+    measurement = {"student_id": 1, "galaxy_id": next(iter(server.store.galaxies)),
+                   "velocity_value": 1234.0, "measurement_number": "first"}
+    assert session.put(url, json=measurement).status_code == 200
+
+    r = session.get(f"{server.url}/hubbles_law/measurements/1")
+    measurements = r.json()["measurements"]
+    assert [m["velocity_value"] for m in measurements] == [1234.0]
+    assert measurements[0]["galaxy"]["id"] == measurement["galaxy_id"]
+
+    state_url = f"{server.url}/stage-state/1/hubbles_law/spectra_velocity"
+    assert session.get(state_url).status_code == 404
+    assert session.put(state_url, json={"current_step": 3}).status_code == 200
+    assert session.get(state_url).json()["state"] == {"current_step": 3}
+
+
+def test_faults(store):
+    faults = FaultConfig(latency=0.05, jitter=0.02)
+    with StandInAPI(store, faults=faults, endpoint_faults={"sample_galaxy": FaultConfig(error_rate=1)}) as server:
+        api = LocalAPI()
+        api.API_URL = server.url
+        session = api.request_session
+
+        start = time.perf_counter()
+        assert session.get(f"{server.url}/hubbles_law/galaxies").status_code == 200
+        assert time.perf_counter() - start >= 0.05
+
+        assert session.get(f"{server.url}/hubbles_law/sample-galaxy").status_code == 503
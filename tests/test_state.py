@@ -0,0 +1,90 @@
+import gc
+import random
+
+import pytest
+
+pytest.importorskip("cosmicds")
+
+from hubbleds.state import (
+    MEASUREMENT_LISTS,
+    _MEASUREMENT_INDEXES,
+    LocalState,
+)
+
+
+def _scan(measurements, galaxy_id, measurement_number=None):
+    return next(
+        (i for i, m in enumerate(measurements)
+         if m.galaxy_id == galaxy_id
+         and (measurement_number is None or m.measurement_number == measurement_number)),
+        None,
+    )
+
+
+def test_measurement_lookups(make_measurement):
+    state = LocalState(
+        measurements=[make_measurement(g) for g in (5, 3, 8)],
+        example_measurements=[
+            make_measurement(7, measurement_number="first"),
+            make_measurement(7, measurement_number="second"),
+        ],
+        class_measurements=[make_measurement(g, student_id=s) for s in (1, 2) for g in (5, 3)],
+    )
+    assert state.get_measurement_index(3) == 1
+    assert state.get_measurement(8) is state.measurements[2]
+    assert state.get_measurement_index(4) is None
+    assert state.get_measurement(4) is None
+
+    assert state.get_example_measurement_index(7) == 0
+    assert state.get_example_measurement_index(7, measurement_number="second") == 1
+    assert state.get_example_measurement(7, "second") is state.example_measurements[1]
+    assert state.get_example_measurement(7, "third") is None
+
+    # The first measurement of a galaxy measured by several students
+    assert state.find_measurement_index("class_measurements", 3) == 1
+    assert state.find_measurement_index("all_measurements", 3) is None
+    with pytest.raises(ValueError):
+        state.find_measurement_index("student_summaries", 3)
+
+
+def test_lookups_after_updates(make_measurement):
+    rng = random.Random(7)
+    state = LocalState(measurements=[make_measurement(g) for g in rng.sample(range(1, 50), 10)])
+
+    for step in range(200):
+        measurements = state.measurements
+        action = rng.choice(["append", "replace", "update", "swap", "new_state"])
+        if action == "append":
+            new = set(range(1, 61)) - {m.galaxy_id for m in measurements}
+            measurements.append(make_measurement(rng.choice(sorted(new))))
+        elif action == "replace" and measurements:
+            # The way the stages save an edited measurement
+            i = rng.randrange(len(measurements))
+            measurements[i] = measurements[i].model_copy(update={"velocity_value": step})
+        elif action == "update" and measurements:
+            i = rng.randrange(len(measurements))
+            state = state.model_copy(update={
+                "measurements": measurements[:i] + measurements[i + 1:],
+            })
+        elif action == "swap" and len(measurements) > 1:
+            i, j = rng.sample(range(len(measurements)), 2)
+            measurements[i], measurements[j] = measurements[j], measurements[i]
+        elif action == "new_state":
+            state = LocalState(**state.model_dump(include=set(MEASUREMENT_LISTS)))
+
+        for galaxy_id in range(0, 61):
+            assert state.get_measurement_index(galaxy_id) == _scan(state.measurements, galaxy_id)
+
+
+def test_indexes_dont_change_state_equality(make_measurement):
+    measurements = [make_measurement(g) for g in (1, 2)]
+    state = LocalState(measurements=measurements)
+    other = LocalState(measurements=measurements)
+    state.get_measurement_index(2)
+    assert state == other
+
+    key = id(state)
+    assert key in _MEASUREMENT_INDEXES
+    del state
+    gc.collect()
+    assert key not in _MEASUREMENT_INDEXES
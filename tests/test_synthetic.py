@@ -0,0 +1,61 @@
+import json
+
+import pytest
+
+pytest.importorskip("cosmicds")
+
+import numpy as np
+
+from hubbleds.state import ClassSummary, StudentMeasurement, StudentSummary
+from hubbleds.synthetic import generate_population, population_fixtures, write_fixtures
+from hubbleds.utils import create_single_summary
+
+
+def test_reproducible():
+    one = population_fixtures(generate_population(2, 10, seed=3))
+    two = population_fixtures(generate_population(2, 10, seed=3))
+    other = population_fixtures(generate_population(2, 10, seed=4))
+    assert one == two
+    assert one["measurements"] != other["measurements"]
+
+
+def test_population_shape():
+    population = generate_population(n_classes=3, students_per_class=4, galaxies_per_student=5)
+    assert len(population.classes) == 3
+    assert all(len(ids) == 4 for ids in population.classes.values())
+    assert len(population.measurements) == 3 * 4 * 5
+    assert len(population.sample_measurements) == 3 * 4 * 2
+    assert len(population.student_summaries) == 12
+    assert len(population.class_summaries) == 3
+
+    for student_id in population.classes[population.class_summaries[0].class_id]:
+        galaxies = [m.galaxy_id for m in population.measurements if m.student_id == student_id]
+        assert len(set(galaxies)) == 5
+
+    velocities = np.array([m.velocity_value for m in population.measurements])
+    assert velocities.min() > 0
+    ages = np.array([s.age_value for s in population.student_summaries])
+    assert 8 < np.median(ages) < 25
+
+
+def test_summaries_match_story_fits():
+    population = generate_population(1, 5, seed=1)
+    for summary in population.student_summaries:
+        measurements = [m for m in population.measurements if m.student_id == summary.student_id]
+        h0, age = create_single_summary(
+            [m.est_dist_value for m in measurements],
+            [m.velocity_value for m in measurements],
+        )
+        assert summary.hubble_fit_value == pytest.approx(h0)
+        assert summary.age_value == pytest.approx(age)
+
+
+def test_fixtures_round_trip(tmp_path):
+    path = tmp_path / "fixtures.json"
+    write_fixtures(generate_population(1, 3), path)
+    with open(path) as f:
+        fixtures = json.load(f)
+
+    assert [StudentMeasurement(**m) for m in fixtures["measurements"]]
+    assert [StudentSummary(**s) for s in fixtures["studentData"]]
+    assert [ClassSummary(**s) for s in fixtures["classData"]]
@@ -0,0 +1,61 @@
+import builtins
+
+import pytest
+
+pytest.importorskip("cosmicds")
+
+from hubbleds.templates import PACKAGE_ROOT, TEMPLATE_PATTERNS, TemplateRegistry
+
+
+def _registry(root):
+    (root / "pages" / "01-stage" / "guidelines").mkdir(parents=True)
+    (root / "pages" / "01-stage" / "guidelines" / "GuidelineIntro.vue").write_text(
+        "<template><v-alert>Hi</v-alert></template>"
+    )
+    (root / "pages" / "01-stage" / "__init__.py").write_text(
+        'ScaffoldAlert(GUIDELINE_ROOT / "GuidelineIntro.vue")\n'
+        '# ScaffoldAlert(GUIDELINE_ROOT / "GuidelineRemoved.vue")\n'
+    )
+    return TemplateRegistry(root)
+
+
+def test_app_templates():
+    registry = TemplateRegistry()
+    count = registry.load()
+    assert count == sum(len(list(PACKAGE_ROOT.glob(p))) for p in TEMPLATE_PATTERNS)
+    assert count > 100
+    assert registry.missing_references() == []
+
+
+def test_lookups_are_cached(tmp_path, monkeypatch):
+    registry = _registry(tmp_path)
+    assert registry.load() == 1
+    path = tmp_path / "pages" / "01-stage" / "guidelines" / "GuidelineIntro.vue"
+
+    def no_open(*args, **kwargs):
+        raise AssertionError("A cached template was read again")
+
+    monkeypatch.setattr(builtins, "open", no_open)
+    first = registry.get_template(str(path))
+    assert registry.get_template(str(path)) is first
+    assert first.template == "<template><v-alert>Hi</v-alert></template>"
+    assert registry.reads == 1
+
+
+def test_missing_template(tmp_path):
+    registry = _registry(tmp_path)
+    with open(tmp_path / "pages" / "01-stage" / "__init__.py", "a") as f:
+        f.write('ScaffoldAlert(GUIDELINE_ROOT / "GuidelineMissing.vue")\n')
+    with pytest.raises(FileNotFoundError, match="01-stage/guidelines/GuidelineMissing.vue"):
+        registry.load()
+    with pytest.raises(FileNotFoundError):
+        registry.text(tmp_path / "Missing.vue")
+
+
+def test_invalid_template(tmp_path):
+    registry = _registry(tmp_path)
+    (tmp_path / "pages" / "01-stage" / "guidelines" / "GuidelineBroken.vue").write_text(
+        "<template><v-alert>Hi</v-alert>"
+    )
+    with pytest.raises(ValueError, match="opens 1 <template> tags and closes 0"):
+        registry.load()
@@ -0,0 +1,94 @@
+import pytest
+
+pytest.importorskip("cosmicds")
+
+import solara
+from pydantic import BaseModel
+
+from hubbleds.state import LocalState, update_measurement
+from hubbleds.transaction import transaction
+
+
+class Doppler(BaseModel):
+    step: int = 0
+
+
+class Component(BaseModel):
+    obs_wave: float = 0
+    velocities_total: int = 0
+    doppler_state: Doppler = Doppler()
+
+
+def _counted(value):
+    state = solara.reactive(value)
+    notifications = []
+    state.subscribe(notifications.append)
+    return state, notifications
+
+
+def test_measurement_edit_notifies_once(make_measurement):
+    local_state, notifications = _counted(LocalState(
+        measurements=[make_measurement(g) for g in (1, 2, 3)],
+        example_measurements=[make_measurement(9, "first"), make_measurement(9, "second")],
+    ))
+    before = local_state.value.measurements
+
+    measurement = update_measurement(local_state, 2, ang_size_value=30, brightness=0.5)
+    assert len(notifications) == 1
+    assert measurement.ang_size_value == 30
+    assert local_state.value.measurements[1] is measurement
+    assert local_state.value.get_measurement(2).brightness == 0.5
+    # The previous value of the state is left as it was
+    assert before[1].ang_size_value is None
+
+    update_measurement(local_state, 9, example=True, measurement_number="second", est_dist_value=100)
+    assert len(notifications) == 2
+    assert [m.est_dist_value for m in local_state.value.example_measurements] == [None, 100]
+
+    assert update_measurement(local_state, 4, est_dist_value=100) is None
+    assert len(notifications) == 2
+
+
+def test_batched_edits(make_measurement):
+    local_state, local_notifications = _counted(LocalState(measurements=[make_measurement(g) for g in (1, 2, 3)]))
+    component_state, component_notifications = _counted(Component())
+
+    with transaction(local_state) as local, transaction(component_state) as component:
+        for i, measurement in enumerate(local.value.measurements):
+            local.update_item("measurements", i, velocity_value=1000 * measurement.galaxy_id)
+            component.update(velocities_total=component.value.velocities_total + 1)
+        # Helpers join the open transaction
+        update_measurement(local_state, 3, obs_wave_value=6600)
+        component.update_nested("doppler_state", step=2)
+        assert local_notifications == component_notifications == []
+        assert local_state.value.measurements[0].velocity_value is None
+
+    assert len(local_notifications) == 1
+    assert len(component_notifications) == 1
+    assert [m.velocity_value for m in local_state.value.measurements] == [1000, 2000, 3000]
+    assert local_state.value.measurements[2].obs_wave_value == 6600
+    assert component_state.value.velocities_total == 3
+    assert component_state.value.doppler_state.step == 2
+
+
+def test_direct_changes_and_errors():
+    component_state, notifications = _counted(Component())
+
+    with transaction(component_state) as component:
+        component.update(velocities_total=5)
+        # A field set directly on the state during the transaction is kept
+        component_state.set(component_state.value.model_copy(update={"obs_wave": 6500}))
+    assert component_state.value.velocities_total == 5
+    assert component_state.value.obs_wave == 6500
+    assert len(notifications) == 2
+
+    with pytest.raises(RuntimeError):
+        with transaction(component_state) as component:
+            component.update(velocities_total=6)
+            raise RuntimeError
+    assert component_state.value.velocities_total == 5
+    assert len(notifications) == 2
+
+    with transaction(component_state):
+        pass
+    assert len(notifications) == 2
@@ -0,0 +1,130 @@
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+pytest.importorskip("cosmicds")
+
+import requests
+
+from urllib3.util.request import ACCEPT_ENCODING
+
+from hubbleds.compression import accept_encoding, choose_encoding
+from hubbleds.stand_in_api import FaultConfig, StandInAPI, StandInStore
+from hubbleds.transport import (
+    ALL_DATA, SMALL_JSON, SPECTRA, PooledTransport, QueueTimeout, TransportConfig, endpoint_class,
+)
+
+
+@pytest.fixture(scope="module")
+def store():
+    return StandInStore.synthetic("class", seed=3)
+
+
+def test_endpoint_classes():
+    assert endpoint_class("http://api/hubbles_law/spectra/spiral/a.fits") == SPECTRA
+    assert endpoint_class("http://api/hubbles_law/spectra/bundle") == SPECTRA
+    assert endpoint_class("http://api/hubbles_law/all-data?minimal=True") == ALL_DATA
+    assert endpoint_class("http://api/hubbles_law/sample-measurements") == ALL_DATA
+    assert endpoint_class("http://api/hubbles_law/sample-measurements/12") == SMALL_JSON
+    assert endpoint_class("http://api/story-state/12/hubbles_law") == SMALL_JSON
+
+
+def test_slow_requests_do_not_starve_small_ones(store):
+    slow = {"all_data": FaultConfig(latency=0.3)}
+    config = TransportConfig(concurrency={SMALL_JSON: 4, SPECTRA: 2, ALL_DATA: 1})
+    with StandInAPI(store, endpoint_faults=slow) as server:
+        transport = PooledTransport(requests.Session(), config)
+        all_data_url = f"{server.url}/hubbles_law/all-data?minimal=true"
+        state_url = f"{server.url}/story-state/{{}}/hubbles_law"
+
+        def small(i):
+            start = time.perf_counter()
+            assert transport.put(state_url.format(i), json={"i": i}).status_code == 200
+            assert transport.get(state_url.format(i)).json()["state"] == {"i": i}
+            return time.perf_counter() - start
+
+        with ThreadPoolExecutor(12) as executor:
+            slow_calls = [executor.submit(transport.get, all_data_url) for _ in range(3)]
+            time.sleep(0.05)
+            small_times = list(executor.map(small, range(40)))
+            assert all(f.result().status_code == 200 for f in slow_calls)
+
+        # The all-data requests were sent one at a time, while the small
+        #  requests didn't wait for them
+        metrics = transport.metrics()
+        assert metrics[ALL_DATA]["max_in_flight"] == 1
+        assert metrics[ALL_DATA]["max_queued"] >= 2
+        assert metrics[SMALL_JSON]["max_in_flight"] <= 4
+        assert metrics[SMALL_JSON]["requests"] == 80
+        assert max(small_times) < 0.3
+        assert all(m["in_flight"] == 0 and m["queued"] == 0 for m in metrics.values())
+        assert len(store.story_states) >= 40
+
+
+def test_timeouts(store):
+    slow = {"galaxies": FaultConfig(latency=0.5)}
+    config = TransportConfig(
+        timeouts={SMALL_JSON: 0.1, SPECTRA: 1, ALL_DATA: 1},
+        concurrency={SMALL_JSON: 1, SPECTRA: 1, ALL_DATA: 1},
+        queue_timeout=0.1,
+    )
+    with StandInAPI(store, endpoint_faults=slow) as server:
+        transport = PooledTransport(requests.Session(), config)
+        url = f"{server.url}/hubbles_law/galaxies"
+        with pytest.raises(requests.exceptions.Timeout):
+            transport.get(url)
+
+        # A request that can't get a slot in time isn't sent
+        with ThreadPoolExecutor(2) as executor:
+            first = executor.submit(transport.get, url, timeout=1)
+            time.sleep(0.05)
+            with pytest.raises(QueueTimeout):
+                transport.get(url)
+            assert first.result().status_code == 200
+        assert transport.metrics()[SMALL_JSON]["queue_timeouts"] == 1
+
+
+def test_choose_encoding():
+    assert choose_encoding("gzip, deflate") == "gzip"
+    assert choose_encoding("gzip;q=0, deflate;q=0.5") == "deflate"
+    assert choose_encoding("br") is None
+    assert choose_encoding(None) is None
+
+    # Only the encodings that urllib3 decodes are requested
+    assert set(accept_encoding().split(", ")) == set(ACCEPT_ENCODING.split(","))
+
+
+def test_compression(store):
+    state = {"answers": [f"The galaxies that are farther away move faster {i}" for i in range(1000)]}
+    size = len(json.dumps(state))
+    with StandInAPI(store, compress_min_bytes=1024) as server:
+        transport = PooledTransport(requests.Session(), TransportConfig(compress_min_bytes=1024))
+        url = f"{server.url}/story-state/1/hubbles_law"
+
+        assert transport.put(url, json=state).status_code == 200
+        assert server.bytes_received["put_story_state"] < size / 5
+        assert store.story_states[(1, "hubbles_law")] == state
+
+        r = transport.get(url)
+        assert r.headers["Content-Encoding"] == "gzip"
+        assert r.json()["state"] == state
+        assert server.bytes_sent["get_story_state"] < size / 5
+
+        # Small bodies aren't compressed
+        assert transport.put(url, json={"answers": []}).status_code == 200
+        assert server.bytes_received["put_story_state"] < size / 5 + 20
+
+
+def test_uncompressed_fallback(store):
+    state = {"answers": ["A response."] * 1000}
+    with StandInAPI(store, request_encodings=()) as server:
+        transport = PooledTransport(requests.Session(), TransportConfig(compress_min_bytes=1024))
+        url = f"{server.url}/story-state/2/hubbles_law"
+        assert transport.put(url, json=state).status_code == 200
+        assert not transport.compress_requests
+        assert store.story_states[(2, "hubbles_law")] == state
+
+        assert transport.put(url, json=state).status_code == 200
+        assert server.request_counts["put_story_state"] == 3
@@ -0,0 +1,119 @@
+import enum
+import gc
+import weakref
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("cosmicds")
+
+import numpy as np
+from glue.core import Data, DataCollection, Session
+from glue_plotly.viewers.scatter.viewer import PlotlyScatterView
+
+from hubbleds.base_marker import BaseMarker
+from hubbleds.workspace import GlueWorkspace, LazyViewer, MarkerViewers, get_workspace, reachable_stages
+
+
+class OtherScatterView(PlotlyScatterView):
+    pass
+
+
+@pytest.fixture
+def workspace():
+    data_collection = DataCollection()
+    data_collection.append(Data(label="data", x=np.arange(10), y=np.arange(10)))
+    return GlueWorkspace(data_collection, Session(data_collection=data_collection))
+
+
+def test_viewer_reuse(workspace):
+    """Acquiring a viewer again returns the same viewer without setting it up"""
+    calls = []
+    viewer = workspace.viewer("stage", "scatter", PlotlyScatterView, setup=calls.append)
+    assert workspace.viewer("stage", "scatter", PlotlyScatterView, setup=calls.append) is viewer
+    assert calls == [viewer]
+    assert workspace.app.viewers == [viewer]
+
+    with pytest.raises(ValueError):
+        workspace.viewer("stage", "scatter", OtherScatterView)
+
+
+def test_release(workspace):
+    """Released viewers are closed and disconnected from the hub"""
+    data = workspace.data_collection[0]
+    viewer = workspace.viewer("one", "scatter", PlotlyScatterView,
+                              setup=lambda v: v.add_data(data))
+    workspace.viewer("two", "scatter", PlotlyScatterView)
+    assert viewer in workspace.data_collection.hub._subscriptions
+    ref = weakref.ref(viewer)
+
+    workspace.retain({"two"})
+    assert workspace.stages == {"two"}
+    assert viewer not in workspace.data_collection.hub._subscriptions
+
+    del viewer
+    gc.collect()
+    assert ref() is None
+
+    # A released viewer is created again when it is acquired
+    assert workspace.viewer("one", "scatter", PlotlyScatterView) is not None
+    assert workspace.memory_stats()["viewers"] == 2
+
+
+def test_get_workspace():
+    """Each session has a single workspace"""
+    data_collection = DataCollection()
+    state = SimpleNamespace(value=SimpleNamespace(
+        glue_data_collection=data_collection,
+        glue_session=Session(data_collection=data_collection),
+    ))
+    assert get_workspace(state) is get_workspace(state)
+
+    other = SimpleNamespace(value=SimpleNamespace(
+        glue_data_collection=DataCollection(), glue_session=None,
+    ))
+    assert get_workspace(other) is not get_workspace(state)
+
+
+def test_reachable_stages():
+    routes = [SimpleNamespace(path=p) for p in ("/", "01-a", "02-b", "03-c", "04-d")]
+    assert reachable_stages(routes, 2) == {"01-a", "02-b", "03-c"}
+    assert reachable_stages(routes, 0) == {"", "01-a"}
+    assert reachable_stages(routes, None) == {"", "01-a", "02-b", "03-c", "04-d"}
+
+
+class Marker(enum.Enum, BaseMarker):
+    one = enum.auto()
+    two = enum.auto()
+    three = enum.auto()
+    four = enum.auto()
+
+
+def test_marker_viewers(workspace):
+    """Viewers are only created once the story reaches a step that shows them"""
+    created = []
+    viewers = MarkerViewers(workspace, "stage", {
+        "early": LazyViewer(PlotlyScatterView, ((Marker.one, Marker.two),), created.append),
+        "late": LazyViewer(PlotlyScatterView, ((Marker.three, None),), created.append),
+        "both": LazyViewer(PlotlyScatterView, ((Marker.one, Marker.one), (Marker.four, None)),
+                           created.append),
+    })
+
+    assert viewers.keys_for(Marker.one) == ["early", "both"]
+    assert viewers.keys_for(Marker.two) == ["early"]
+    assert viewers.keys_for(Marker.four) == ["late", "both"]
+
+    prepared = viewers.prepare(Marker.two)
+    assert list(prepared) == ["early"]
+    assert "late" not in viewers
+    assert viewers.get("late") is None
+    assert len(created) == 1
+
+    # Preparing again, or indexing, reuses the existing viewer
+    assert viewers.prepare(Marker.one)["early"] is prepared["early"]
+    assert viewers["early"] is prepared["early"]
+    assert len(created) == 2
+
+    late = viewers["late"]
+    assert viewers.get("late") is late
+    assert workspace.viewers("stage") == {"early": prepared["early"], "both": viewers["both"], "late": late}
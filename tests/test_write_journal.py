@@ -0,0 +1,103 @@
+import json
+import time
+
+import pytest
+
+pytest.importorskip("cosmicds")
+
+import solara
+from cosmicds.state import GlobalState
+
+from hubbleds.remote import LocalAPI
+from hubbleds.stand_in_api import FaultConfig, StandInAPI, StandInStore
+from hubbleds.state import LocalState
+from hubbleds.write_journal import WriteJournal
+
+
+def test_compaction_and_order(tmp_path):
+    journal = WriteJournal(tmp_path / "writes.sqlite")
+    journal.append("story", "PUT", "/story-state/1/hubbles_law", b'{"v": 1}')
+    journal.append("measurement/1", "PUT", "/submit-measurement/", b'{"galaxy_id": 1}')
+    journal.append("story", "PUT", "/story-state/1/hubbles_law", b'{"v": 2}')
+    journal.append("measurement/2", "PUT", "/submit-measurement/", b'{"galaxy_id": 2}')
+
+    # The first story state was replaced by the second
+    assert [(e.key, e.body) for e in journal.pending()] == [
+        ("measurement/1", b'{"galaxy_id": 1}'),
+        ("story", b'{"v": 2}'),
+        ("measurement/2", b'{"galaxy_id": 2}'),
+    ]
+
+    # A failed write stops the replay, so that later writes wait for it
+    statuses = iter([200, 503])
+    assert not journal.replay(lambda entry: next(statuses))
+    assert [(e.key, e.attempts) for e in journal.pending()] == [("story", 1), ("measurement/2", 0)]
+
+    # A rejected write is dropped
+    statuses = iter([200, 400])
+    assert journal.replay(lambda entry: next(statuses))
+    assert len(journal) == 0
+    assert (journal.sent, journal.dropped) == (2, 1)
+    journal.close()
+
+
+def _wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+def test_replay_after_restart(tmp_path, monkeypatch):
+    path = tmp_path / "writes.sqlite"
+    monkeypatch.setenv("HUBBLEDS_WRITE_JOURNAL", str(path))
+    store = StandInStore.synthetic("class", seed=2)
+    down = FaultConfig(error_rate=1)
+    with StandInAPI(store, endpoint_faults={"put_story_state": down}) as server:
+        api = LocalAPI()
+        api.API_URL = server.url
+        url = f"{server.url}/story-state/1/hubbles_law"
+
+        # Writes are acknowledged while the API fails them
+        for version in range(3):
+            assert api._put(url, data=json.dumps({"version": version}))
+        assert [e.body for e in api.write_journal.pending()][-1] == b'{"version": 2}'
+        api.write_journal.close()
+        assert len(WriteJournal(path)) == 1
+
+        # A new worker sends the writes left by the previous one as soon
+        #  as it starts, without waiting for a write of its own
+        server.endpoint_faults = {}
+        restarted = LocalAPI()
+        restarted.API_URL = server.url
+        journal = restarted.start_write_journal()
+        assert restarted.start_write_journal() is journal
+        _wait_for(lambda: store.story_states.get((1, "hubbles_law")) == {"version": 2})
+        _wait_for(lambda: len(journal) == 0)
+        journal.close()
+
+
+def test_reload_while_pending(tmp_path, monkeypatch, make_measurement):
+    monkeypatch.setenv("HUBBLEDS_WRITE_JOURNAL", str(tmp_path / "writes.sqlite"))
+    store = StandInStore.synthetic("class", seed=2)
+    student_id, galaxy_id = next(iter(store.measurements))
+    down = FaultConfig(error_rate=1)
+    with StandInAPI(store, endpoint_faults={"submit_measurement": down}) as server:
+        api = LocalAPI()
+        api.API_URL = server.url
+        global_state = solara.reactive(GlobalState(student={"id": student_id}))
+        measurement = make_measurement(galaxy_id, student_id=student_id)
+        measurement.est_dist_value = 123.0
+        local_state = solara.reactive(LocalState(measurements=[measurement]))
+        assert api.put_measurements(global_state, local_state)
+        _wait_for(lambda: server.request_counts["submit_measurement"] >= 1)
+        assert len(api.write_journal) == 1
+
+        # Reloading the student's state sends their pending writes first,
+        #  rather than reading what the API had before them
+        server.endpoint_faults = {}
+        reloaded = solara.reactive(LocalState())
+        measurements = api.get_measurements(global_state, reloaded)
+        assert {m.galaxy_id: m.est_dist_value for m in measurements}[galaxy_id] == 123.0
+        assert len(api.write_journal) == 0
+        api.write_journal.close()